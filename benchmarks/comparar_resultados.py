@@ -0,0 +1,65 @@
+"""
+Compara dos ficheros de resultados de ejecutar_benchmarks.py
+
+Uso:
+    python benchmarks/comparar_resultados.py base.json nuevo.json [--umbral 0.10]
+
+Sale con código 1 si algún caso empeora (tiempo mediano o memoria pico) más
+que el umbral relativo indicado.
+"""
+import argparse
+import json
+import sys
+
+
+def comparar(base, nuevo, umbral):
+    """
+    Compara los casos comunes de dos informes.
+
+    Args:
+        base: Informe de referencia (dict)
+        nuevo: Informe a comparar (dict)
+        umbral: Empeoramiento relativo tolerado (0.10 = 10 %)
+
+    Returns:
+        tuple: (filas, regresiones) con una fila por caso común
+    """
+    filas = []
+    regresiones = []
+    for caso in sorted(set(base["resultados"]) & set(nuevo["resultados"])):
+        a = base["resultados"][caso]
+        b = nuevo["resultados"][caso]
+        ratio_tiempo = b["mediana_s"] / a["mediana_s"] if a["mediana_s"] else float("inf")
+        ratio_memoria = (b["memoria_pico_kb"] / a["memoria_pico_kb"]) if a["memoria_pico_kb"] else 1.0
+        fila = (caso, a["mediana_s"], b["mediana_s"], ratio_tiempo, ratio_memoria)
+        filas.append(fila)
+        if ratio_tiempo > 1 + umbral or ratio_memoria > 1 + umbral:
+            regresiones.append(fila)
+    return filas, regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.nuevo, encoding="utf-8") as f:
+        nuevo = json.load(f)
+
+    filas, regresiones = comparar(base, nuevo, args.umbral)
+    ancho = max((len(f[0]) for f in filas), default=10)
+    print(f"{base['commit']} -> {nuevo['commit']}")
+    print(f"{'caso':<{ancho}}  {'base ms':>10}  {'nuevo ms':>10}  {'tiempo':>8}  {'memoria':>8}")
+    for caso, a, b, rt, rm in filas:
+        marca = "  <-- regresión" if (caso, a, b, rt, rm) in regresiones else ""
+        print(f"{caso:<{ancho}}  {a * 1000:>10.2f}  {b * 1000:>10.2f}  {rt:>7.2f}x  {rm:>7.2f}x{marca}")
+
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,814 @@
+"""
+Benchmarks reproducibles del pipeline de corrección
+
+Mide tiempo (mediana, p95, operaciones/s) y memoria pico (tracemalloc) de las
+funciones principales sobre notebooks sintéticos, con un LLM simulado y un
+remoto git local (bare). Los resultados se guardan en JSON para comparar
+entre commits con comparar_resultados.py.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/ejecutar_benchmarks.py                # todos los escenarios
+    python benchmarks/ejecutar_benchmarks.py --rapido       # escenarios pequeños
+    python benchmarks/ejecutar_benchmarks.py --solo originalidad --salida r.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(RAIZ, "src"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from generador_notebooks import generar_notebook_oficial, generar_notebook_alumno  # noqa: E402
+from mock_llm import ServidorLLMSimulado  # noqa: E402
+
+# (nombre, celdas, bytes de salida por celda, ratio de copia, máx. repeticiones de evaluar_originalidad)
+# evaluar_originalidad es cuadrática con el tamaño: en los escenarios grandes se limita
+ESCENARIOS = [
+    ("pequeno", 40, 300, 0.2, None),
+    ("mediano", 120, 1000, 0.4, 3),
+    ("grande", 200, 1500, 0.6, 1),
+]
+ESCENARIOS_RAPIDOS = ESCENARIOS[:1]
+
+FILAS_EVALUACIONES = 300
+ALUMNOS_ANILLOS = 300
+LATENCIA_LLM = 0.05
+LATENCIA_LLM_ESPECULATIVA = 0.5
+NOTEBOOKS_LOTE = 8
+# Modelo del tiempo de respuesta del LLM: latencia fija + tiempo por token generado
+SEGUNDOS_POR_TOKEN_LLM = 0.004
+TASA_JSON_INVALIDO = 0.2
+# Streaming: generación detenida en una de cada PAUSA_CADA peticiones (representa el timeout de 60 s)
+PAUSA_GENERACION = 2.0
+PAUSA_CADA = 5
+TIMEOUT_ENTRE_TOKENS_BENCH = 0.5
+# Peticiones cubiertas: cada backend tarda LENTITUD_BACKEND s de más en una de cada LENTA_CADA peticiones
+LENTITUD_BACKEND = 1.5
+LENTA_CADA = 25
+EVALUACIONES_COBERTURA = 100
+NOTEBOOKS_PREDICTOR = 200
+# Reevaluación de un capítulo: peticiones síncronas frente a la API de lotes
+ENTREGAS_CAPITULO = 40
+# Caída del proveedor: cada petición tarda LATENCIA_CAIDA s y responde 500
+LATENCIA_CAIDA = 1.0
+# Verificación por ejecución: notebooks distintos y filas del housing.csv sintético
+NOTEBOOKS_EJECUCION = 8
+FILAS_HOUSING = 20000
+
+
+def medir(funcion, repeticiones, preparar=None):
+    """
+    Ejecuta `funcion` varias veces y devuelve estadísticas de tiempo y memoria.
+
+    Args:
+        funcion: Función a medir; recibe lo que devuelva `preparar`
+        repeticiones: Número de ejecuciones cronometradas
+        preparar: Función opcional que se ejecuta (sin cronometrar) antes de cada llamada
+
+    Returns:
+        dict: mediana_s, p95_s, p99_s, ops_por_segundo, memoria_pico_kb, repeticiones
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        argumento = preparar() if preparar else None
+        inicio = time.perf_counter()
+        funcion(argumento)
+        tiempos.append(time.perf_counter() - inicio)
+
+    # Memoria en una ejecución aparte: tracemalloc ralentiza y falsearía los tiempos
+    argumento = preparar() if preparar else None
+    tracemalloc.start()
+    funcion(argumento)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tiempos.sort()
+    mediana = statistics.median(tiempos)
+    return {
+        "repeticiones": repeticiones,
+        "mediana_s": round(mediana, 6),
+        "p95_s": round(tiempos[min(len(tiempos) - 1, int(0.95 * len(tiempos)))], 6),
+        "p99_s": round(tiempos[min(len(tiempos) - 1, int(0.99 * len(tiempos)))], 6),
+        "ops_por_segundo": round(1 / mediana, 3) if mediana > 0 else None,
+        "memoria_pico_kb": round(pico / 1024, 1),
+    }
+
+
+def _zip_en_memoria(notebook):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("practica.ipynb", json.dumps(notebook))
+    return buffer.getvalue()
+
+
+def _evaluacion_sintetica(i):
+    return {
+        "nota_total": round(3 + (i % 7), 1),
+        "exploracion": 1.0 + (i % 3) * 0.3,
+        "preprocesamiento": 1.0,
+        "modelos": 1.5 + (i % 4) * 0.3,
+        "evaluacion": 1.0,
+        "documentacion": (i % 10) / 10,
+        "comentario": "Evaluación sintética",
+    }
+
+
+def bench_notebooks(resultados, escenarios, repeticiones):
+    from utils.notebook_utils import extraer_codigo_ejecutable
+    from evaluacion.evaluacion_originalidad import evaluar_originalidad
+    from evaluacion.validador_estricto import analizar_completitud_notebook
+    from core.file_processor import procesar_archivo_zip
+
+    for nombre, celdas, salida, copia, max_repeticiones in escenarios:
+        oficial = generar_notebook_oficial(celdas, salida, semilla=0)
+        alumno = generar_notebook_alumno(oficial, celdas, salida, ratio_copia=copia, semilla=1)
+        tamano = len(json.dumps(alumno))
+        etiqueta = f"{nombre}[celdas={celdas},salida={salida},copia={copia}]"
+
+        r = medir(lambda _: evaluar_originalidad(alumno, oficial), min(repeticiones, max_repeticiones or repeticiones))
+        r["bytes_notebook"] = tamano
+        resultados[f"evaluar_originalidad/{etiqueta}"] = r
+
+        resultados[f"extraer_codigo_ejecutable/{etiqueta}"] = medir(
+            lambda _: extraer_codigo_ejecutable(alumno), repeticiones * 5)
+
+        resultados[f"analizar_completitud_notebook/{etiqueta}"] = medir(
+            lambda _: analizar_completitud_notebook(alumno), repeticiones * 5)
+
+        datos_zip = _zip_en_memoria(alumno)
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta_zip = os.path.join(tmp, "cap2-alumno.zip")
+            with open(ruta_zip, "wb") as f:
+                f.write(datos_zip)
+            r = medir(lambda _: procesar_archivo_zip(ruta_zip, os.path.join(tmp, "soluciones"), "alumno", "2025-01-01"),
+                      repeticiones)
+            r["bytes_zip"] = len(datos_zip)
+            resultados[f"procesar_archivo_zip/{etiqueta}"] = r
+
+
+def bench_cascada(resultados):
+    """
+    Compara la cascada de cotas con el cálculo exacto: mismos veredictos,
+    fracción resuelta en cada nivel y tiempo total de ambos caminos.
+    """
+    from evaluacion.evaluacion_originalidad import (
+        analizar_originalidad, resumen_cascada, reiniciar_estadisticas_cascada
+    )
+
+    oficial = generar_notebook_oficial(40, 300, semilla=0)
+    casos = []
+    for celdas in (12, 25, 40, 60):
+        for copia in (0.0, 0.5, 0.9, 1.0):
+            for semilla in range(3):
+                casos.append(generar_notebook_alumno(oficial, celdas, 300, ratio_copia=copia, semilla=semilla))
+    casos.append(oficial)
+
+    reiniciar_estadisticas_cascada()
+    t_exacto = t_cascada = 0.0
+    discrepancias = 0
+    for alumno in casos:
+        inicio = time.perf_counter()
+        exacto = analizar_originalidad(alumno, oficial, exacto=True)
+        t_exacto += time.perf_counter() - inicio
+        inicio = time.perf_counter()
+        cascada = analizar_originalidad(alumno, oficial)
+        t_cascada += time.perf_counter() - inicio
+        discrepancias += exacto["originalidad"] != cascada["originalidad"]
+
+    niveles = resumen_cascada()
+    # resumen_cascada también cuenta las llamadas exacto=True: se descuentan
+    niveles["exacto"]["n"] -= len(casos)
+    resultados["cascada_originalidad/veredictos"] = {
+        "repeticiones": len(casos),
+        "mediana_s": round(t_cascada / len(casos), 6),
+        "p95_s": round(t_cascada / len(casos), 6),
+        "p99_s": round(t_cascada / len(casos), 6),
+        "ops_por_segundo": round(len(casos) / t_cascada, 3) if t_cascada else None,
+        "memoria_pico_kb": 0.0,
+        "segundos_exacto_total": round(t_exacto, 4),
+        "segundos_cascada_total": round(t_cascada, 4),
+        "discrepancias": discrepancias,
+        "fraccion_por_nivel": {
+            nivel: round(v["n"] / len(casos), 3) for nivel, v in niveles.items()
+        },
+    }
+
+
+def bench_alineacion(resultados, repeticiones):
+    from evaluacion.alineacion_celdas import alinear_celdas
+
+    oficial = generar_notebook_oficial(500, 300, semilla=0)
+    for copia in (0.0, 0.5, 1.0):
+        alumno = generar_notebook_alumno(oficial, 500, 300, ratio_copia=copia, semilla=1)
+        resultados[f"alinear_celdas/celdas=500,copia={copia}"] = medir(
+            lambda _: alinear_celdas(alumno, oficial), repeticiones)
+
+
+def bench_corpus(resultados, repeticiones):
+    """Una consulta al índice de huellas frente a comparar con cada documento del corpus."""
+    from evaluacion.corpus_referencia import CorpusReferencia
+    from evaluacion.evaluacion_originalidad import evaluar_originalidad
+
+    documentos = [generar_notebook_oficial(40, 300, semilla=s) for s in range(30)]
+    corpus = CorpusReferencia()
+    for i, notebook in enumerate(documentos):
+        corpus.agregar(f"doc_{i}.ipynb", "oficial" if i < 5 else "cohorte", notebook)
+    alumno = generar_notebook_alumno(documentos[17], 40, 300, ratio_copia=0.6, semilla=1)
+
+    etiqueta = f"documentos={len(documentos)}"
+    resultados[f"corpus_consulta/{etiqueta}"] = medir(lambda _: corpus.consultar(alumno), repeticiones * 5)
+    resultados[f"corpus_pares/{etiqueta}"] = medir(
+        lambda _: max(evaluar_originalidad(alumno, d)[1] for d in documentos), 1)
+
+
+def bench_anillos(resultados, repeticiones):
+    """Todos los pares de entregas de un capítulo al cerrarlo (con algunos anillos de copia)."""
+    from evaluacion.anillos_copia import analizar_copias_capitulo
+
+    oficial = generar_notebook_oficial(40, 300, semilla=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        carpeta = os.path.join(tmp, "soluciones_alumnos", "capitulo_bench")
+        os.makedirs(carpeta)
+        for i in range(ALUMNOS_ANILLOS):
+            # Cada 10 alumnos, 3 parten de la misma entrega (semilla compartida)
+            semilla = i - i % 10 if i % 10 < 3 else i
+            alumno = generar_notebook_alumno(oficial, 40, 300, ratio_copia=0.3, semilla=semilla)
+            with open(os.path.join(carpeta, f"alumno_{i}_2025-11-10.ipynb"), "w", encoding="utf-8") as f:
+                json.dump(alumno, f)
+
+        r = medir(lambda _: analizar_copias_capitulo("capitulo_bench", tmp, oficial), repeticiones)
+        r["anillos"] = len(analizar_copias_capitulo("capitulo_bench", tmp, oficial)["anillos"])
+        resultados[f"analizar_copias_capitulo/alumnos={ALUMNOS_ANILLOS}"] = r
+
+
+def bench_evaluaciones(resultados, repeticiones):
+    import pandas as pd
+    from data.data_manager import guardar_evaluacion, generar_hall_of_fame
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "evaluaciones", "evaluacion_originalidad.csv")
+        os.makedirs(os.path.dirname(csv_path))
+        filas = []
+        for i in range(FILAS_EVALUACIONES):
+            ev = _evaluacion_sintetica(i)
+            filas.append({
+                "Nombre": f"alumno_{i}", "Capítulo": "Capítulo 2", "Originalidad": "Original",
+                "Similitud": (i % 50) / 100, "Nota_Total": ev["nota_total"], "Exploracion": ev["exploracion"],
+                "Preprocesamiento": ev["preprocesamiento"], "Modelos": ev["modelos"],
+                "Evaluacion": ev["evaluacion"], "Documentacion": ev["documentacion"],
+                "Comentario": ev["comentario"], "Fecha": "2025-11-10",
+            })
+        base = pd.DataFrame(filas)
+
+        def reiniciar():
+            base.to_csv(csv_path, index=False, encoding="utf-8")
+
+        etiqueta = f"filas={FILAS_EVALUACIONES}"
+        resultados[f"guardar_evaluacion/{etiqueta}"] = medir(
+            lambda _: guardar_evaluacion("nuevo", "Capítulo 2", "2025-11-11", "Original", 0.2,
+                                         _evaluacion_sintetica(1), tmp),
+            repeticiones * 2, preparar=reiniciar)
+
+        reiniciar()
+        resultados[f"generar_hall_of_fame/{etiqueta}"] = medir(
+            lambda _: generar_hall_of_fame("Capítulo 2", tmp), repeticiones * 2)
+
+
+def bench_llm(resultados, servidor, repeticiones):
+    from evaluacion.evaluacion_ia import evaluar_respuestas_ia
+
+    oficial = generar_notebook_oficial(120, 1000, semilla=0)
+    alumno = generar_notebook_alumno(oficial, 120, 1000, ratio_copia=0.3, semilla=1)
+    antes = len(servidor.peticiones)
+    r = medir(lambda _: evaluar_respuestas_ia(alumno), repeticiones)
+    r["latencia_simulada_s"] = servidor.latencia
+    r["peticiones"] = len(servidor.peticiones) - antes
+    resultados["evaluar_respuestas_ia/llm_simulado"] = r
+
+
+def bench_especulativa(resultados, servidor, repeticiones):
+    """Originalidad seguida de la IA frente a la IA lanzada en paralelo (latencia del LLM simulada)."""
+    from evaluacion.evaluacion_originalidad import analizar_originalidad
+    from evaluacion.evaluacion_ia import evaluar_respuestas_ia, evaluar_respuestas_ia_async
+    from evaluacion.evaluacion_especulativa import EvaluacionEspeculativa
+
+    oficial = generar_notebook_oficial(60, 500, semilla=0)
+    alumno = generar_notebook_alumno(oficial, 60, 500, ratio_copia=0.3, semilla=1)
+    copia = generar_notebook_alumno(oficial, 60, 500, ratio_copia=1.0, semilla=1)
+
+    def secuencial(notebook):
+        if analizar_originalidad(notebook, oficial)["originalidad"] != "Copia directa":
+            return evaluar_respuestas_ia(notebook)
+
+    def especulativa(notebook):
+        llm = EvaluacionEspeculativa(evaluar_respuestas_ia_async, notebook)
+        if analizar_originalidad(notebook, oficial)["originalidad"] == "Copia directa":
+            llm.cancelar()
+            return None
+        return llm.resultado()
+
+    latencia = servidor.latencia
+    servidor.latencia = LATENCIA_LLM_ESPECULATIVA
+    try:
+        etiqueta = f"latencia_llm={LATENCIA_LLM_ESPECULATIVA}"
+        resultados[f"entrega_secuencial/{etiqueta}"] = medir(lambda _: secuencial(alumno), repeticiones)
+        resultados[f"entrega_especulativa/{etiqueta}"] = medir(lambda _: especulativa(alumno), repeticiones)
+        resultados[f"entrega_especulativa_copia/{etiqueta}"] = medir(lambda _: especulativa(copia), repeticiones)
+    finally:
+        servidor.latencia = latencia
+
+
+def bench_lote(resultados, servidor, repeticiones):
+    """Evaluación de un lote de notebooks uno a uno frente a evaluar_lote() con concurrencia acotada."""
+    from evaluacion.evaluacion_ia import evaluar_respuestas_ia, evaluar_lote
+
+    oficial = generar_notebook_oficial(40, 300, semilla=0)
+    notebooks = [generar_notebook_alumno(oficial, 40, 300, semilla=s) for s in range(NOTEBOOKS_LOTE)]
+
+    latencia = servidor.latencia
+    servidor.latencia = LATENCIA_LLM_ESPECULATIVA
+    try:
+        etiqueta = f"notebooks={NOTEBOOKS_LOTE},latencia_llm={LATENCIA_LLM_ESPECULATIVA}"
+        resultados[f"lote_secuencial/{etiqueta}"] = medir(
+            lambda _: [evaluar_respuestas_ia(n) for n in notebooks], max(1, repeticiones // 2))
+        antes = len(servidor.peticiones)
+        r = medir(lambda _: evaluar_lote(notebooks), max(1, repeticiones // 2))
+        r["peticiones"] = len(servidor.peticiones) - antes
+        resultados[f"evaluar_lote/{etiqueta}"] = r
+    finally:
+        servidor.latencia = latencia
+
+
+def _respuesta_por_componentes(tasa_invalido):
+    """Contenido del LLM simulado: solo los componentes que pide el prompt; una de cada 1/tasa truncada."""
+    import itertools
+    from evaluacion.evaluacion_ia import COMPONENTES
+
+    contador = itertools.count(1)
+    cada = round(1 / tasa_invalido) if tasa_invalido else 0
+
+    def contenido(cuerpo):
+        prompt = cuerpo["messages"][-1]["content"]
+        if '"nota_total"' in prompt:
+            pedidos = list(COMPONENTES)
+        else:
+            pedidos = [c for c in COMPONENTES if f'"{c}": 0.0' in prompt]
+        respuesta = {c: 1.0 for c in pedidos}
+        respuesta["comentario"] = " ".join(
+            f"En {c} el trabajo cubre lo básico pero falta profundizar en el análisis y justificar las decisiones."
+            for c in pedidos)
+        respuesta["puntos_fuertes"] = [f"{c}: código ordenado y reproducible" for c in pedidos]
+        respuesta["areas_mejora"] = [f"{c}: comparar más alternativas" for c in pedidos]
+        texto = json.dumps(respuesta, ensure_ascii=False, indent=4)
+        if cada and next(contador) % cada == 0:
+            return texto[:len(texto) // 2]
+        return texto
+    return contenido
+
+
+def bench_criterios(resultados, servidor, repeticiones):
+    """Un prompt con los 5 criterios frente a una petición concurrente por criterio."""
+    from evaluacion.evaluacion_ia import evaluar_respuestas_ia
+    from evaluacion.evaluacion_criterios import evaluar_respuestas_criterios
+
+    oficial = generar_notebook_oficial(60, 500, semilla=0)
+    alumno = generar_notebook_alumno(oficial, 60, 500, ratio_copia=0.3, semilla=1)
+
+    configuracion = servidor.latencia, servidor.contenido, servidor.segundos_por_token
+    servidor.latencia = LATENCIA_LLM
+    servidor.segundos_por_token = SEGUNDOS_POR_TOKEN_LLM
+    try:
+        for tasa in (0.0, TASA_JSON_INVALIDO):
+            for modo, evaluar in (("monolitica", evaluar_respuestas_ia), ("criterios", evaluar_respuestas_criterios)):
+                servidor.contenido = _respuesta_por_componentes(tasa)
+                antes = len(servidor.peticiones)
+                r = medir(lambda _: evaluar(alumno), repeticiones * 2)
+                r["peticiones"] = len(servidor.peticiones) - antes
+                resultados[f"evaluacion_{modo}/json_invalido={tasa}"] = r
+    finally:
+        servidor.latencia, servidor.contenido, servidor.segundos_por_token = configuracion
+
+
+def bench_streaming(resultados, servidor, repeticiones):
+    """Respuesta entera frente a streaming con corte al cerrarse el JSON y timeout entre tokens."""
+    from evaluacion import evaluacion_ia
+    from mock_llm import EVALUACION_SIMULADA
+
+    oficial = generar_notebook_oficial(20, 200, semilla=0)
+    alumno = generar_notebook_alumno(oficial, 20, 200, semilla=1)
+    # El modelo suele añadir una despedida después del JSON
+    contenido = json.dumps(EVALUACION_SIMULADA, ensure_ascii=False, indent=4) + (
+        "\n\nEspero que esta evaluación te resulte útil. Revisa las áreas de mejora antes de la próxima entrega."
+        * 4
+    )
+
+    configuracion = (servidor.latencia, servidor.contenido, servidor.segundos_por_token, servidor.pausa,
+                     servidor.pausa_cada, evaluacion_ia.LLM_STREAMING, evaluacion_ia.TIMEOUT_ENTRE_TOKENS)
+    servidor.latencia = LATENCIA_LLM
+    servidor.contenido = contenido
+    servidor.segundos_por_token = SEGUNDOS_POR_TOKEN_LLM
+    evaluacion_ia.TIMEOUT_ENTRE_TOKENS = TIMEOUT_ENTRE_TOKENS_BENCH
+    try:
+        for pausa_cada in (0, PAUSA_CADA):
+            servidor.pausa, servidor.pausa_cada = PAUSA_GENERACION, pausa_cada
+            for modo, streaming in (("completa", False), ("streaming", True)):
+                evaluacion_ia.LLM_STREAMING = streaming
+                antes = len(servidor.peticiones)
+                r = medir(lambda _: evaluacion_ia.evaluar_con_groq(alumno), repeticiones * 4)
+                r["peticiones"] = len(servidor.peticiones) - antes
+                etiqueta = f"pausa={PAUSA_GENERACION}s_1de{pausa_cada}" if pausa_cada else "sin_pausas"
+                resultados[f"respuesta_{modo}/{etiqueta}"] = r
+    finally:
+        (servidor.latencia, servidor.contenido, servidor.segundos_por_token, servidor.pausa,
+         servidor.pausa_cada, evaluacion_ia.LLM_STREAMING, evaluacion_ia.TIMEOUT_ENTRE_TOKENS) = configuracion
+
+
+def bench_cobertura(resultados, servidor, repeticiones):
+    """Cola de latencia con dos backends lentos de vez en cuando: sin duplicar frente a peticiones cubiertas."""
+    from evaluacion import evaluacion_ia
+    from core.peticiones_cubiertas import Cobertura, MIN_MUESTRAS
+
+    oficial = generar_notebook_oficial(20, 200, semilla=0)
+    alumno = generar_notebook_alumno(oficial, 20, 200, semilla=1)
+
+    configuracion = (servidor.latencia, servidor.segundos_por_token, servidor.pausa, servidor.pausa_cada,
+                     evaluacion_ia.LLM_BACKENDS, evaluacion_ia.LLM_COBERTURA, evaluacion_ia.cobertura_llm)
+    with ServidorLLMSimulado(semilla=1) as segundo:
+        for backend in (servidor, segundo):
+            backend.latencia = LATENCIA_LLM
+            backend.segundos_por_token = SEGUNDOS_POR_TOKEN_LLM
+            backend.pausa, backend.pausa_cada = LENTITUD_BACKEND, LENTA_CADA
+        evaluacion_ia.LLM_BACKENDS = [
+            {"nombre": "simulado_1", "url": servidor.url, "clave": "clave-simulada"},
+            {"nombre": "simulado_2", "url": segundo.url, "clave": "clave-simulada-2"},
+        ]
+        try:
+            for modo, cubrir in (("sin_cobertura", False), ("cubierta", True)):
+                evaluacion_ia.LLM_COBERTURA = cubrir
+                evaluacion_ia.cobertura_llm = Cobertura(
+                    configuracion[6].percentil, configuracion[6].presupuesto)
+                # Latencias para estimar el percentil antes de medir
+                for _ in range(MIN_MUESTRAS):
+                    evaluacion_ia.evaluar_con_groq(alumno)
+                antes = len(servidor.peticiones) + len(segundo.peticiones)
+                r = medir(lambda _: evaluacion_ia.evaluar_con_groq(alumno), max(EVALUACIONES_COBERTURA, repeticiones))
+                r["peticiones"] = len(servidor.peticiones) + len(segundo.peticiones) - antes
+                r["peticiones_extra"] = round(r["peticiones"] / (r["repeticiones"] + 1) - 1, 3)
+                r.update(evaluacion_ia.cobertura_llm.estadisticas())
+                resultados[f"cobertura_{modo}/lenta={LENTITUD_BACKEND}s_1de{LENTA_CADA}"] = r
+        finally:
+            (servidor.latencia, servidor.segundos_por_token, servidor.pausa, servidor.pausa_cada,
+             evaluacion_ia.LLM_BACKENDS, evaluacion_ia.LLM_COBERTURA, evaluacion_ia.cobertura_llm) = configuracion
+
+
+def bench_predictor(resultados, repeticiones):
+    """Entrenamiento del predictor local de notas y una predicción (nota provisional)."""
+    import numpy as np
+    from evaluacion.predictor_nota import caracteristicas, entrenar, predecir
+
+    oficial = generar_notebook_oficial(60, 200, semilla=0)
+    notebooks = [generar_notebook_alumno(oficial, 20 + i % 40, 200, ratio_copia=0.3, semilla=i)
+                 for i in range(NOTEBOOKS_PREDICTOR)]
+    X = np.array([caracteristicas(notebook) for notebook in notebooks])
+    # Notas sintéticas: combinación lineal de las características más ruido
+    rng = np.random.default_rng(0)
+    Y = np.clip(X[:, [8, 9, 10, 11, 12]] * [0.2, 0.3, 0.5, 0.3, 0.05] + rng.normal(0, 0.2, (len(X), 5)), 0, 2)
+
+    etiqueta = f"notebooks={NOTEBOOKS_PREDICTOR}"
+    resultados[f"predictor_entrenar/{etiqueta}"] = medir(lambda _: entrenar(X, Y), repeticiones)
+    modelo = entrenar(X, Y)
+    resultados["predictor_predecir/un_notebook"] = r = medir(lambda _: predecir(modelo, notebooks[-1]), repeticiones * 20)
+    r["mae_loo"] = modelo["mae_loo"]
+
+
+def bench_prefijo(resultados, repeticiones):
+    """Construcción de los prompts y fracción del prompt que comparten dos entregas (prefijo cacheable)."""
+    from config.settings import ENUNCIADO_EJERCICIO
+    from evaluacion.plantillas_prompt import COMPONENTES, prompt_evaluacion, prompt_criterio
+    from evaluacion.reentrega import celdas_por_componente
+
+    oficial = generar_notebook_oficial(60, 200, semilla=0)
+    alumnos = [generar_notebook_alumno(oficial, 40, 200, ratio_copia=0.3, semilla=i) for i in (1, 2)]
+    casos = {
+        "completo": lambda alumno: prompt_evaluacion(alumno),
+        "parcial": lambda alumno: prompt_evaluacion(alumno, componentes=COMPONENTES[2:4]),
+        "criterio": lambda alumno: prompt_criterio(celdas_por_componente(alumno)["modelos"], ENUNCIADO_EJERCICIO, "modelos"),
+    }
+    for nombre, construir in casos.items():
+        prompts = [construir(alumno) for alumno in alumnos]
+        r = medir(lambda _: construir(alumnos[0]), repeticiones * 20)
+        comun = len(os.path.commonprefix(prompts))
+        r["caracteres_prefijo_comun"] = comun
+        r["fraccion_prefijo_comun"] = round(comun / len(prompts[0]), 3)
+        resultados[f"prompt_{nombre}/notebook=40_celdas"] = r
+
+
+def bench_lote_api(resultados, servidor, repeticiones):
+    """Reevaluación de un capítulo: una petición síncrona por entrega frente a un lote de la API de lotes."""
+    import pandas as pd
+    from config.capitulos import obtener_capitulo
+    from core.asincrono import ejecutar
+    from data.data_manager import actualizar_evaluacion
+    from evaluacion.evaluacion_ia import evaluar_lote
+    from evaluacion.lote_ia import preparar_lote, avanzar_lote_async
+    from evaluacion.recalificacion import ultimas_entregas
+
+    capitulo = obtener_capitulo("cap2")
+    oficial = generar_notebook_oficial(40, 300, semilla=0)
+    with tempfile.TemporaryDirectory() as tmp:
+        carpeta = os.path.join(tmp, "soluciones_alumnos", capitulo["carpeta"])
+        os.makedirs(carpeta)
+        os.makedirs(os.path.join(tmp, "evaluaciones"))
+        filas = []
+        for i in range(ENTREGAS_CAPITULO):
+            with open(os.path.join(carpeta, f"alumno_{i}_2025-11-10.ipynb"), "w", encoding="utf-8") as f:
+                json.dump(generar_notebook_alumno(oficial, 40, 300, semilla=i), f)
+            ev = _evaluacion_sintetica(i)
+            filas.append({
+                "Nombre": f"alumno_{i}", "Capítulo": capitulo["nombre"], "Originalidad": "Original",
+                "Similitud": 0.1, "Nota_Total": ev["nota_total"], "Exploracion": ev["exploracion"],
+                "Preprocesamiento": ev["preprocesamiento"], "Modelos": ev["modelos"],
+                "Evaluacion": ev["evaluacion"], "Documentacion": ev["documentacion"],
+                "Comentario": ev["comentario"], "Fecha": "2025-11-10", "Origen": "ia",
+            })
+        pd.DataFrame(filas).to_csv(os.path.join(tmp, "evaluaciones", "evaluacion_originalidad.csv"), index=False)
+
+        def sincrona(_):
+            entregas = ultimas_entregas(tmp, lambda ultimas: ultimas["Capítulo"] == capitulo["nombre"])
+            notebooks = []
+            for entrega in entregas:
+                with open(entrega["ruta"], encoding="utf-8") as f:
+                    notebooks.append(json.load(f))
+            for entrega, evaluacion in zip(entregas, evaluar_lote(notebooks, capitulo["enunciado"])):
+                actualizar_evaluacion(entrega["indice"], evaluacion, tmp)
+
+        def por_lotes(_):
+            control = preparar_lote(tmp, capitulo, os.path.join(tmp, "lotes"))
+            ejecutar(avanzar_lote_async(control, tmp, intervalo=0.05))
+
+        etiqueta = f"entregas={ENTREGAS_CAPITULO}"
+        for nombre, funcion in (("recalificacion_sincrona", sincrona), ("recalificacion_lote_api", por_lotes)):
+            antes = len(servidor.peticiones)
+            r = medir(funcion, max(1, repeticiones // 2))
+            r["peticiones_sincronas"] = (len(servidor.peticiones) - antes) // (max(1, repeticiones // 2) + 1)
+            resultados[f"{nombre}/{etiqueta}"] = r
+
+
+def _notebook_ejecutable(i):
+    """Notebook que carga housing.csv y ajusta una regresión con numpy (distinto en cada i: otra huella)."""
+    celdas = [
+        "import numpy as np\nimport pandas as pd",
+        "housing = pd.read_csv('datasets/housing/housing.csv')\nhousing.describe()",
+        f"X = housing[['longitude', 'latitude', 'median_income']].to_numpy()\ny = housing['median_house_value'].to_numpy()\nsemilla = {i}",
+        "for _ in range(30):\n    coef, *_ = np.linalg.lstsq(np.c_[X, np.ones(len(X))], y, rcond=None)",
+        "rmse = float(np.sqrt(np.mean((np.c_[X, np.ones(len(X))] @ coef - y) ** 2)))",
+    ]
+    return {"cells": [{"cell_type": "code", "source": c, "execution_count": n + 1, "outputs": []}
+                      for n, c in enumerate(celdas)]}
+
+
+def bench_ejecucion(resultados, repeticiones):
+    """Verificación por ejecución: notebooks uno tras otro frente al grupo de procesos, y ejecución guardada."""
+    import numpy as np
+    from evaluacion import ejecucion_notebooks
+
+    if ejecucion_notebooks._prefijo_aislamiento() is None:
+        print("ejecucion: sin unshare -rnm no se ejecutan notebooks (EJECUCION_SIN_AISLAMIENTO=1 para medirlo)")
+        return
+    configuracion = (ejecucion_notebooks.DIRECTORIO_DATOS, ejecucion_notebooks.DIRECTORIO_CACHE_EJECUCION)
+    with tempfile.TemporaryDirectory() as tmp:
+        rng = np.random.default_rng(0)
+        with open(os.path.join(tmp, "housing.csv"), "w", encoding="utf-8") as f:
+            f.write("longitude,latitude,median_income,median_house_value\n")
+            for fila in rng.normal([-119.5, 35.6, 3.9, 206000], [2.0, 2.1, 1.9, 115000], (FILAS_HOUSING, 4)):
+                f.write(",".join(f"{v:.4f}" for v in fila) + "\n")
+        ejecucion_notebooks.DIRECTORIO_DATOS = tmp
+        ejecucion_notebooks.DIRECTORIO_CACHE_EJECUCION = os.path.join(tmp, "cache")
+        notebooks = [_notebook_ejecutable(i) for i in range(NOTEBOOKS_EJECUCION)]
+        try:
+            etiqueta = f"notebooks={NOTEBOOKS_EJECUCION}"
+            veces = max(1, repeticiones // 2)
+            r = medir(lambda _: [ejecucion_notebooks.verificar_ejecucion(nb, usar_cache=False) for nb in notebooks], veces)
+            resultados[f"ejecucion_secuencial/{etiqueta}"] = r
+            r = medir(lambda _: ejecucion_notebooks.verificar_ejecuciones(notebooks, usar_cache=False), veces)
+            r["procesos"] = ejecucion_notebooks.PROCESOS_EJECUCION
+            r["correctos"] = sum(e["ok"] for e in ejecucion_notebooks.verificar_ejecuciones(notebooks, usar_cache=False))
+            resultados[f"ejecucion_paralela/{etiqueta}"] = r
+            resultados["ejecucion_guardada/un_notebook"] = medir(
+                lambda _: ejecucion_notebooks.verificar_ejecucion(notebooks[0]), repeticiones * 20)
+        finally:
+            ejecucion_notebooks.DIRECTORIO_DATOS, ejecucion_notebooks.DIRECTORIO_CACHE_EJECUCION = configuracion
+
+
+def bench_circuito(resultados, servidor, repeticiones):
+    """Entregas durante una caída del proveedor: reintentos completos frente al circuito abierto."""
+    from evaluacion import evaluacion_ia
+    from core.circuito import Circuito
+
+    oficial = generar_notebook_oficial(20, 200, semilla=0)
+    alumno = generar_notebook_alumno(oficial, 20, 200, semilla=1)
+
+    configuracion = servidor.latencia, servidor.tasa_error, evaluacion_ia.circuito_llm
+    servidor.latencia, servidor.tasa_error = LATENCIA_CAIDA, 1.0
+    try:
+        for modo, umbral in (("sin_circuito", float("inf")), ("circuito", evaluacion_ia.UMBRAL_FALLOS_LLM)):
+            evaluacion_ia.circuito_llm = Circuito("llm", umbral, evaluacion_ia.SEGUNDOS_CIRCUITO_ABIERTO)
+            antes = len(servidor.peticiones)
+            r = medir(lambda _: evaluacion_ia.evaluar_respuestas_ia(alumno), repeticiones)
+            r["peticiones"] = len(servidor.peticiones) - antes
+            resultados[f"entrega_caida_{modo}/latencia={LATENCIA_CAIDA}s"] = r
+    finally:
+        servidor.latencia, servidor.tasa_error, evaluacion_ia.circuito_llm = configuracion
+
+
+def _extraer_json_anterior(contenido, componentes):
+    """Lectura de la respuesta anterior a respuesta_json: subcadena entre llaves y json.loads."""
+    inicio = contenido.find("{")
+    fin = contenido.rfind("}") + 1
+    if inicio == -1 or fin <= inicio:
+        raise ValueError("No se encontró JSON en la respuesta")
+    evaluacion = json.loads(contenido[inicio:fin])
+    evaluacion["nota_total"] = round(sum(evaluacion.get(c, 0) for c in componentes), 1)
+    return evaluacion
+
+
+def bench_respuestas_json(resultados, servidor, repeticiones):
+    """Reintentos con el corpus de respuestas mal formadas: lectura anterior frente a respuesta_json."""
+    import itertools
+    from evaluacion.evaluacion_ia import COMPONENTES, evaluar_con_groq
+    from evaluacion.respuesta_json import extraer_evaluacion
+
+    with open(os.path.join(RAIZ, "benchmarks", "respuestas_llm_invalidas.json"), encoding="utf-8") as f:
+        corpus = json.load(f)
+    contenidos = [caso["contenido"] for caso in corpus]
+
+    for nombre, extraer in (("anterior", _extraer_json_anterior), ("respuesta_json", extraer_evaluacion)):
+        fallos = 0
+        for contenido in contenidos:
+            try:
+                extraer(contenido, COMPONENTES)
+            except Exception:
+                fallos += 1
+        r = medir(lambda _: [_probar(extraer, c, COMPONENTES) for c in contenidos], repeticiones)
+        r["respuestas"] = len(contenidos)
+        r["tasa_reintento"] = round(fallos / len(contenidos), 3)
+        resultados[f"lectura_json_{nombre}/corpus={len(contenidos)}"] = r
+
+    # Extremo a extremo: el servidor simulado devuelve el corpus en orden (con modo JSON)
+    oficial = generar_notebook_oficial(20, 200, semilla=0)
+    alumno = generar_notebook_alumno(oficial, 20, 200, semilla=1)
+    contenido = servidor.contenido
+    siguiente = itertools.cycle(contenidos)
+    servidor.contenido = lambda cuerpo: next(siguiente)
+    evaluadas = []
+    try:
+        antes = len(servidor.peticiones)
+        r = medir(lambda _: evaluadas.append(evaluar_con_groq(alumno) is not None), len(contenidos))
+        peticiones = len(servidor.peticiones) - antes
+        # medir() hace una ejecución más para la memoria
+        r["evaluaciones"] = len(evaluadas)
+        r["sin_evaluar"] = evaluadas.count(False)
+        r["peticiones"] = peticiones
+        r["reintentos_por_evaluacion"] = round(peticiones / len(evaluadas) - 1, 3)
+        resultados[f"evaluar_con_groq/corpus={len(contenidos)}"] = r
+    finally:
+        servidor.contenido = contenido
+
+
+def _probar(extraer, contenido, componentes):
+    try:
+        return extraer(contenido, componentes)
+    except Exception:
+        return None
+
+
+def bench_git(resultados, repeticiones):
+    from git import Repo
+    from core.git_manager import commit_y_push
+
+    with tempfile.TemporaryDirectory() as tmp:
+        remoto = os.path.join(tmp, "remoto.git")
+        Repo.init(remoto, bare=True)
+        clon = Repo.clone_from(remoto, os.path.join(tmp, "clon"))
+        with clon.config_writer() as config:
+            config.set_value("user", "name", "Benchmark")
+            config.set_value("user", "email", "bench@ml.local")
+        ruta_csv = os.path.join(clon.working_dir, "evaluaciones.csv")
+        with open(ruta_csv, "w", encoding="utf-8") as f:
+            f.write("Nombre,Nota\n")
+        clon.git.add(".")
+        clon.index.commit("inicial")
+        clon.git.push("origin", "HEAD")
+
+        contador = {"n": 0}
+
+        def modificar():
+            contador["n"] += 1
+            with open(ruta_csv, "a", encoding="utf-8") as f:
+                f.write(f"alumno_{contador['n']},{contador['n'] % 10}\n")
+
+        resultados["commit_y_push/remoto_local"] = medir(
+            lambda _: commit_y_push(clon, f"entrega {contador['n']}"), repeticiones, preparar=modificar)
+
+
+def commit_actual():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rapido", action="store_true", help="solo el escenario pequeño")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--solo", choices=["originalidad", "cascada", "alineacion", "corpus", "anillos", "evaluaciones", "llm", "especulativa", "lote", "criterios", "json", "streaming", "cobertura", "circuito", "predictor", "prefijo", "lote_api", "ejecucion", "git"], action="append",
+                        help="ejecutar solo algunos grupos (se puede repetir)")
+    parser.add_argument("--salida", help="fichero JSON de salida (por defecto benchmarks/resultados/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    grupos = set(args.solo or ["originalidad", "cascada", "alineacion", "corpus", "anillos", "evaluaciones", "llm", "especulativa", "lote", "criterios", "json", "streaming", "cobertura", "circuito", "predictor", "prefijo", "lote_api", "ejecucion", "git"])
+    escenarios = ESCENARIOS_RAPIDOS if args.rapido else ESCENARIOS
+    resultados = {}
+
+    with ServidorLLMSimulado(latencia=LATENCIA_LLM) as servidor:
+        # La configuración se lee al importar: el entorno debe estar listo antes
+        os.environ["GROQ_API_URL"] = servidor.url
+        os.environ["GROQ_API_KEY"] = "clave-simulada"
+        os.environ.setdefault("TRAZAS_PATH", os.path.join(tempfile.gettempdir(), "bench_spans.jsonl"))
+
+        if "originalidad" in grupos:
+            bench_notebooks(resultados, escenarios, args.repeticiones)
+        if "cascada" in grupos:
+            bench_cascada(resultados)
+        if "alineacion" in grupos:
+            bench_alineacion(resultados, args.repeticiones)
+        if "corpus" in grupos:
+            bench_corpus(resultados, args.repeticiones)
+        if "anillos" in grupos:
+            bench_anillos(resultados, args.repeticiones)
+        if "evaluaciones" in grupos:
+            bench_evaluaciones(resultados, args.repeticiones)
+        if "llm" in grupos:
+            bench_llm(resultados, servidor, args.repeticiones)
+        if "especulativa" in grupos:
+            bench_especulativa(resultados, servidor, args.repeticiones)
+        if "lote" in grupos:
+            bench_lote(resultados, servidor, args.repeticiones)
+        if "criterios" in grupos:
+            bench_criterios(resultados, servidor, args.repeticiones)
+        if "json" in grupos:
+            bench_respuestas_json(resultados, servidor, args.repeticiones)
+        if "streaming" in grupos:
+            bench_streaming(resultados, servidor, args.repeticiones)
+        if "cobertura" in grupos:
+            bench_cobertura(resultados, servidor, args.repeticiones)
+        if "circuito" in grupos:
+            bench_circuito(resultados, servidor, args.repeticiones)
+        if "predictor" in grupos:
+            bench_predictor(resultados, args.repeticiones)
+        if "prefijo" in grupos:
+            bench_prefijo(resultados, args.repeticiones)
+        if "lote_api" in grupos:
+            bench_lote_api(resultados, servidor, args.repeticiones)
+        if "ejecucion" in grupos:
+            bench_ejecucion(resultados, args.repeticiones)
+        if "git" in grupos:
+            bench_git(resultados, args.repeticiones)
+
+    commit = commit_actual()
+    informe = {
+        "commit": commit,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+
+    salida = args.salida or os.path.join(RAIZ, "benchmarks", "resultados", f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(salida)), exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(informe, f, ensure_ascii=False, indent=2)
+
+    ancho = max(len(k) for k in resultados) if resultados else 10
+    print(f"{'caso':<{ancho}}  {'mediana ms':>11}  {'p95 ms':>9}  {'p99 ms':>9}  {'mem KB':>9}")
+    for caso, r in resultados.items():
+        print(f"{caso:<{ancho}}  {r['mediana_s'] * 1000:>11.2f}  {r['p95_s'] * 1000:>9.2f}  "
+              f"{r['p99_s'] * 1000:>9.2f}  {r['memoria_pico_kb']:>9.1f}")
+    print(f"\nResultados guardados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
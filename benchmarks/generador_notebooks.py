@@ -0,0 +1,135 @@
+"""
+Generador de notebooks sintéticos para los benchmarks
+Permite variar el número de celdas, el tamaño de las salidas y la proporción
+de celdas copiadas del notebook oficial. Con la misma semilla el resultado es
+siempre idéntico.
+"""
+import base64
+import random
+
+FRAGMENTOS_CODIGO = [
+    "import pandas as pd\nimport numpy as np\nimport matplotlib.pyplot as plt",
+    "housing = pd.read_csv('datasets/housing/housing.csv')\nhousing.head()",
+    "housing.info()",
+    "housing.describe()",
+    "housing.hist(bins=50, figsize=(12, 8))\nplt.show()",
+    "corr_matrix = housing.corr(numeric_only=True)\ncorr_matrix['median_house_value'].sort_values(ascending=False)",
+    "from sklearn.model_selection import train_test_split\ntrain_set, test_set = train_test_split(housing, test_size=0.2, random_state=42)",
+    "from sklearn.impute import SimpleImputer\nimputer = SimpleImputer(strategy='median')",
+    "from sklearn.preprocessing import StandardScaler, OneHotEncoder\nscaler = StandardScaler()",
+    "from sklearn.pipeline import Pipeline\nnum_pipeline = Pipeline([('imputer', imputer), ('scaler', scaler)])",
+    "from sklearn.compose import ColumnTransformer\npreprocessing = ColumnTransformer([('num', num_pipeline, num_attribs), ('cat', OneHotEncoder(), cat_attribs)])",
+    "from sklearn.linear_model import LinearRegression\nlin_reg = LinearRegression()\nlin_reg.fit(housing_prepared, housing_labels)",
+    "from sklearn.ensemble import RandomForestRegressor\nforest_reg = RandomForestRegressor(random_state=42)\nforest_reg.fit(housing_prepared, housing_labels)",
+    "from sklearn.model_selection import cross_val_score\nscores = cross_val_score(forest_reg, housing_prepared, housing_labels, scoring='neg_root_mean_squared_error', cv=10)",
+    "from sklearn.metrics import mean_squared_error, mean_absolute_error\nrmse = mean_squared_error(y_test, y_pred) ** 0.5\nmae = mean_absolute_error(y_test, y_pred)",
+    "from sklearn.model_selection import GridSearchCV\ngrid = GridSearchCV(forest_reg, param_grid, cv=3)\ngrid.fit(housing_prepared, housing_labels)",
+    "final_predictions = final_model.predict(X_test)\nplt.scatter(y_test, final_predictions, alpha=0.3)",
+]
+
+FRAGMENTOS_MARKDOWN = [
+    "## Exploración de datos\nCargamos el dataset y revisamos sus características principales.",
+    "Las variables con más correlación con el precio son los ingresos medios.",
+    "## Preprocesamiento\nSeparamos train y test antes de mirar demasiado los datos.",
+    "Creamos un pipeline para imputar los nulos, escalar y codificar las categóricas.",
+    "## Modelos\nProbamos una regresión lineal y un random forest.",
+    "El random forest sobreajusta: el error en validación cruzada es mucho mayor que en entrenamiento.",
+    "## Conclusiones\nEl mejor modelo obtiene un RMSE razonable en el conjunto de test.",
+]
+
+IDENTIFICADORES = ["datos", "modelo", "resultado", "tabla", "serie", "valores", "prediccion", "error"]
+
+
+def _celda_codigo(source, ejecucion, salida):
+    return {
+        "cell_type": "code",
+        "execution_count": ejecucion,
+        "metadata": {},
+        "outputs": salida,
+        "source": source.splitlines(True),
+    }
+
+
+def _celda_markdown(source):
+    return {"cell_type": "markdown", "metadata": {}, "source": source.splitlines(True)}
+
+
+def _salida(rng, tamano, con_imagen):
+    """Genera las salidas de una celda de unos `tamano` bytes aproximadamente."""
+    if tamano <= 0:
+        return []
+    if con_imagen:
+        datos = base64.b64encode(rng.randbytes(max(1, tamano * 3 // 4))).decode("ascii")
+        return [{
+            "output_type": "display_data",
+            "metadata": {},
+            "data": {"image/png": datos, "text/plain": ["<Figure size 640x480 with 1 Axes>"]},
+        }]
+    lineas = []
+    total = 0
+    while total < tamano:
+        linea = " ".join(f"{rng.random():.6f}" for _ in range(8)) + "\n"
+        lineas.append(linea)
+        total += len(linea)
+    return [{"output_type": "stream", "name": "stdout", "text": lineas}]
+
+
+def _codigo_original(rng):
+    """Celda de código 'escrita por el alumno' (variaciones de nombres y literales)."""
+    base = rng.choice(FRAGMENTOS_CODIGO)
+    nombre = rng.choice(IDENTIFICADORES) + f"_{rng.randint(1, 99)}"
+    return f"# Paso {rng.randint(1, 50)}\n{nombre} = {rng.randint(0, 1000)}\n" + base.replace("housing", f"df_{nombre}")
+
+
+def generar_notebook_oficial(n_celdas=120, tamano_salida=2000, semilla=0):
+    """
+    Genera un notebook 'oficial' de referencia.
+
+    Args:
+        n_celdas: Número total de celdas
+        tamano_salida: Bytes aproximados de salida por celda de código
+        semilla: Semilla del generador
+
+    Returns:
+        dict: Notebook en formato JSON
+    """
+    rng = random.Random(semilla)
+    celdas = []
+    for i in range(n_celdas):
+        if i % 3 == 0:
+            celdas.append(_celda_markdown(rng.choice(FRAGMENTOS_MARKDOWN)))
+        else:
+            codigo = rng.choice(FRAGMENTOS_CODIGO) + f"\nresultado_{i} = {i}"
+            celdas.append(_celda_codigo(codigo, i, _salida(rng, tamano_salida, i % 10 == 1)))
+    return {"cells": celdas, "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
+
+
+def generar_notebook_alumno(oficial, n_celdas=120, tamano_salida=2000, ratio_copia=0.3,
+                            ratio_ejecutadas=0.9, semilla=1):
+    """
+    Genera un notebook de alumno que copia una fracción de celdas del oficial.
+
+    Args:
+        oficial: Notebook oficial (ver generar_notebook_oficial)
+        n_celdas: Número total de celdas
+        tamano_salida: Bytes aproximados de salida por celda de código
+        ratio_copia: Fracción de celdas copiadas literalmente del oficial (0.0 a 1.0)
+        ratio_ejecutadas: Fracción de celdas de código con execution_count
+        semilla: Semilla del generador
+
+    Returns:
+        dict: Notebook en formato JSON
+    """
+    rng = random.Random(semilla)
+    celdas_oficiales = oficial.get("cells", [])
+    celdas = []
+    for i in range(n_celdas):
+        if celdas_oficiales and rng.random() < ratio_copia:
+            celdas.append(dict(celdas_oficiales[i % len(celdas_oficiales)]))
+            continue
+        if i % 4 == 0:
+            celdas.append(_celda_markdown(rng.choice(FRAGMENTOS_MARKDOWN) + f"\n\nNota {rng.randint(1, 999)}."))
+        else:
+            ejecucion = i if rng.random() < ratio_ejecutadas else None
+            celdas.append(_celda_codigo(_codigo_original(rng), ejecucion, _salida(rng, tamano_salida, i % 12 == 5)))
+    return {"cells": celdas, "metadata": {}, "nbformat": 4, "nbformat_minor": 5}
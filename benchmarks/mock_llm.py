@@ -0,0 +1,314 @@
+"""
+Servidor LLM simulado compatible con la API de chat de Groq/OpenAI
+Responde con una evaluación JSON determinista tras una latencia configurable,
+para medir el pipeline sin depender de la red ni gastar cuota. También imita
+la API de lotes (/files y /batches) con ficheros JSONL.
+
+Uso:
+    with ServidorLLMSimulado(latencia=0.2) as servidor:
+        os.environ["GROQ_API_URL"] = servidor.url
+"""
+import json
+import random
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EVALUACION_SIMULADA = {
+    "nota_total": 6.4,
+    "exploracion": 1.5,
+    "preprocesamiento": 1.4,
+    "modelos": 2.0,
+    "evaluacion": 1.0,
+    "documentacion": 0.5,
+    "comentario": "Evaluación simulada para benchmarks.",
+    "puntos_fuertes": ["Pipeline completo"],
+    "areas_mejora": ["Analizar los errores del modelo"],
+}
+
+
+def _es_json(texto):
+    try:
+        json.loads(texto)
+        return True
+    except ValueError:
+        return False
+
+
+class ServidorLLMSimulado:
+    """
+    Servidor HTTP local que imita /chat/completions.
+
+    Como Groq, si la petición usa response_format json_object y el contenido no
+    es JSON válido responde 400 con el texto en error.failed_generation. Con
+    "stream": true responde en SSE (chat.completion.chunk) token a token.
+
+    Args:
+        latencia: Segundos de espera antes de responder
+        jitter: Variación aleatoria máxima (segundos) añadida a la latencia
+        tasa_error: Probabilidad de responder 500
+        contenido: Texto del mensaje del modelo (por defecto, EVALUACION_SIMULADA), o una
+            función cuerpo_peticion -> texto para responder según el prompt
+        semilla: Semilla para que el jitter y los errores sean reproducibles
+        segundos_por_token: Tiempo de generación por token de la respuesta (len // 4)
+        pausa: Segundos que se detiene la generación a un tercio de la respuesta...
+        pausa_cada: ...en una de cada `pausa_cada` peticiones (0 = nunca)
+        duracion_lote: Segundos que tarda en completarse un lote (/batches)
+    """
+
+    def __init__(self, latencia=0.0, jitter=0.0, tasa_error=0.0, contenido=None, semilla=0, segundos_por_token=0.0,
+                 pausa=0.0, pausa_cada=0, duracion_lote=0.0):
+        self.latencia = latencia
+        self.duracion_lote = duracion_lote
+        self.segundos_por_token = segundos_por_token
+        self.pausa = pausa
+        self.pausa_cada = pausa_cada
+        self.jitter = jitter
+        self.tasa_error = tasa_error
+        self.contenido = contenido if contenido is not None else json.dumps(EVALUACION_SIMULADA, ensure_ascii=False)
+        self.peticiones = []
+        self.ficheros = {}
+        self.lotes = {}
+        self._rng = random.Random(semilla)
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    @property
+    def url(self):
+        host, puerto = self._httpd.server_address[:2]
+        return f"http://{host}:{puerto}/openai/v1/chat/completions"
+
+    def _sortear(self):
+        with self._lock:
+            espera = self.latencia + (self._rng.random() * self.jitter if self.jitter else 0.0)
+            falla = self._rng.random() < self.tasa_error
+            pausa = self.pausa if self.pausa_cada and len(self.peticiones) % self.pausa_cada == 0 else 0.0
+        return espera, falla, pausa
+
+    def _responder_linea(self, linea):
+        """Resultado de una línea de un lote (mismo contenido y errores que /chat/completions)."""
+        cuerpo = linea["body"]
+        _, falla, _ = self._sortear()
+        if falla:
+            respuesta = {"status_code": 500, "body": {"error": {"message": "fallo simulado"}}}
+        else:
+            contenido = self.contenido(cuerpo) if callable(self.contenido) else self.contenido
+            prompt = "".join(m.get("content", "") for m in cuerpo.get("messages", []))
+            respuesta = {"status_code": 200, "body": {
+                "object": "chat.completion",
+                "model": cuerpo.get("model", ""),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": contenido},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(contenido) // 4,
+                          "total_tokens": (len(prompt) + len(contenido)) // 4},
+            }}
+        return {"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": linea["custom_id"],
+                "response": respuesta, "error": None}
+
+    def _procesar_lote(self, id_lote):
+        time.sleep(self.duracion_lote)
+        with self._lock:
+            lote = self.lotes[id_lote]
+            if lote["status"] == "cancelled":
+                return
+            lineas = self.ficheros[lote["input_file_id"]].decode("utf-8").splitlines()
+        salida = "".join(
+            json.dumps(self._responder_linea(json.loads(linea)), ensure_ascii=False) + "\n"
+            for linea in lineas if linea.strip()
+        )
+        id_salida = f"file_{uuid.uuid4().hex[:12]}"
+        with self._lock:
+            self.ficheros[id_salida] = salida.encode("utf-8")
+            lote.update({
+                "status": "completed",
+                "output_file_id": id_salida,
+                "completed_at": int(time.time()),
+                "request_counts": {"total": len(lineas), "completed": len(lineas), "failed": 0},
+            })
+
+    def _manejador(self):
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Con conexiones persistentes, cabeceras y cuerpo en escrituras separadas sufren Nagle + delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                longitud = int(self.headers.get("Content-Length", 0))
+                datos = self.rfile.read(longitud)
+                if self.path.endswith("/files"):
+                    self._subir_fichero(datos)
+                    return
+                cuerpo = json.loads(datos or b"{}")
+                if self.path.endswith("/batches"):
+                    self._crear_lote(cuerpo)
+                    return
+                with servidor._lock:
+                    servidor.peticiones.append({
+                        "autorizacion": self.headers.get("Authorization", ""),
+                        "cuerpo": cuerpo,
+                        "momento": time.time(),
+                    })
+
+                espera, falla, pausa = servidor._sortear()
+                if falla:
+                    time.sleep(espera)
+                    self._responder(500, {"error": {"message": "fallo simulado"}})
+                    return
+
+                contenido = servidor.contenido(cuerpo) if callable(servidor.contenido) else servidor.contenido
+                prompt = "".join(m.get("content", "") for m in cuerpo.get("messages", []))
+                if cuerpo.get("stream"):
+                    self._responder_sse(contenido, prompt, espera, pausa)
+                    return
+                time.sleep(espera + len(contenido) // 4 * servidor.segundos_por_token + pausa)
+
+                if cuerpo.get("response_format", {}).get("type") == "json_object" and not _es_json(contenido):
+                    self._responder(400, {"error": {
+                        "message": "Failed to generate JSON. Please adjust your prompt.",
+                        "type": "invalid_request_error",
+                        "code": "json_validate_failed",
+                        "failed_generation": contenido,
+                    }})
+                    return
+
+                self._responder(200, {
+                    "id": "chatcmpl-simulado",
+                    "object": "chat.completion",
+                    "model": cuerpo.get("model", ""),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": contenido},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {
+                        "prompt_tokens": len(prompt) // 4,
+                        "completion_tokens": len(contenido) // 4,
+                        "total_tokens": (len(prompt) + len(contenido)) // 4,
+                    },
+                })
+
+            def do_GET(self):
+                partes = self.path.rstrip("/").split("/")
+                with servidor._lock:
+                    if len(partes) >= 2 and partes[-2] == "batches" and partes[-1] in servidor.lotes:
+                        self._responder(200, dict(servidor.lotes[partes[-1]]))
+                        return
+                    if partes[-1] == "content" and partes[-2] in servidor.ficheros:
+                        contenido = servidor.ficheros[partes[-2]]
+                    else:
+                        contenido = None
+                if contenido is None:
+                    self._responder(404, {"error": {"message": "no encontrado"}})
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(contenido)))
+                self.end_headers()
+                self.wfile.write(contenido)
+
+            def _subir_fichero(self, datos):
+                # multipart/form-data con los campos purpose y file
+                mensaje = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode("utf-8") + datos
+                )
+                campos = {parte.get_param("name", header="content-disposition"): parte for parte in mensaje.iter_parts()}
+                if "file" not in campos:
+                    self._responder(400, {"error": {"message": "falta el fichero"}})
+                    return
+                contenido = campos["file"].get_payload(decode=True)
+                id_fichero = f"file_{uuid.uuid4().hex[:12]}"
+                with servidor._lock:
+                    servidor.ficheros[id_fichero] = contenido
+                self._responder(200, {"id": id_fichero, "object": "file", "bytes": len(contenido),
+                                      "purpose": "batch", "filename": campos["file"].get_filename()})
+
+            def _crear_lote(self, cuerpo):
+                with servidor._lock:
+                    if cuerpo.get("input_file_id") not in servidor.ficheros:
+                        self._responder(400, {"error": {"message": "input_file_id desconocido"}})
+                        return
+                    id_lote = f"batch_{uuid.uuid4().hex[:12]}"
+                    servidor.lotes[id_lote] = lote = {
+                        "id": id_lote, "object": "batch", "endpoint": cuerpo.get("endpoint"),
+                        "input_file_id": cuerpo["input_file_id"], "completion_window": cuerpo.get("completion_window"),
+                        "status": "in_progress", "output_file_id": None, "error_file_id": None,
+                        "created_at": int(time.time()),
+                    }
+                    respuesta = dict(lote)
+                threading.Thread(target=servidor._procesar_lote, args=(id_lote,), daemon=True).start()
+                self._responder(200, respuesta)
+
+            def _responder(self, estado, datos):
+                cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+                self.send_response(estado)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                try:
+                    self.wfile.write(cuerpo)
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente canceló la petición (p. ej. evaluación especulativa de una copia)
+                    self.close_connection = True
+
+            def _responder_sse(self, contenido, prompt, espera, pausa):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+                time.sleep(espera)
+                # Trozos de 4 tokens (16 caracteres)
+                trozos = [contenido[i:i + 16] for i in range(0, len(contenido), 16)]
+                try:
+                    for numero, trozo in enumerate(trozos):
+                        if pausa and numero == len(trozos) // 3:
+                            time.sleep(pausa)
+                        time.sleep(4 * servidor.segundos_por_token)
+                        evento = {
+                            "object": "chat.completion.chunk",
+                            "choices": [{"index": 0, "delta": {"content": trozo}, "finish_reason": None}],
+                        }
+                        self.wfile.write(f"data: {json.dumps(evento, ensure_ascii=False)}\n\n".encode("utf-8"))
+                        self.wfile.flush()
+                    # Como Groq, el consumo llega en el último evento (x_groq.usage)
+                    final = {
+                        "object": "chat.completion.chunk",
+                        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                        "x_groq": {"usage": {"prompt_tokens": len(prompt) // 4,
+                                             "completion_tokens": len(contenido) // 4,
+                                             "total_tokens": (len(prompt) + len(contenido)) // 4}},
+                    }
+                    self.wfile.write(f"data: {json.dumps(final, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    # El cliente dejó de leer (JSON completo, generación detenida o cancelación)
+                    pass
+
+            def log_message(self, format, *args):
+                return
+
+        return Manejador
+
+    def iniciar(self):
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._manejador())
+        self._httpd.daemon_threads = True
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
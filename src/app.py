@@ -4,33 +4,60 @@ Sistema de entregas - Versión ultra simplificada
 import streamlit as st
 import os
 from datetime import datetime
-import pytz
+from functools import partial
 
 # Importa módulos personalizados
-from config.settings import (
-    CAPITULO, COLUMNA, CARPETA_DESTINO, FECHA_LIMITE,
-    REPO_URL, REPO_DIR, TOKEN, REGISTRO_PATH,
-    SOLUCION_OFICIAL_URL
+from config.settings import REPO_URL, REPO_DIR, TOKEN, REGISTRO_PATH, MODO_EVALUACION_IA, EJECUCION_NOTEBOOKS
+from config.capitulos import (
+    cargar_capitulos, capitulos_abiertos, capitulo_por_defecto,
+    obtener_capitulo, plazo_vencido
 )
-from core.git_manager import inicializar_repo, commit_y_push
+from core.asincrono import ejecutar, lanzar
+from core.git_manager import inicializar_repo, commit_y_push_async
 from data.data_manager import (
-    cargar_registro, actualizar_registro,
-    guardar_evaluacion, generar_hall_of_fame
+    cargar_registro, version_registro, version_evaluaciones, actualizar_registro,
+    guardar_evaluacion, cargar_ultima_evaluacion, generar_hall_of_fame
 )
 from core.validators import validar_nombre_archivo, validar_nombre_en_lista
+from core.indice_nombres import obtener_indice_nombres
 from core.file_processor import guardar_archivo_zip, procesar_archivo_zip
-from utils.notebook_utils import descargar_notebook_oficial
-from evaluacion.evaluacion_originalidad import evaluar_originalidad
-from evaluacion.evaluacion_ia import evaluar_respuestas_ia
+from utils.notebook_utils import obtener_notebook_oficial
+from utils.telemetria_llm import contexto_llm
+from utils.trazas import traza, span, iniciar_servidor_metricas
+from evaluacion.evaluacion_originalidad import analizar_originalidad
+from evaluacion.corpus_referencia import obtener_corpus
+from evaluacion.similitud_prosa import analizar_prosa, obtener_indice_prosa
+from evaluacion.huellas_imagenes import analizar_imagenes, obtener_indice_imagenes
+from evaluacion.alineacion_celdas import alinear_celdas
+from evaluacion.evaluacion_ia import (
+    COMPONENTES, ORIGEN_IA, ORIGEN_TRIAJE, ORIGEN_COPIA, ORIGEN_PENDIENTE,
+    evaluar_respuestas_ia_async, es_evaluacion_pendiente
+)
+from evaluacion.evaluacion_criterios import evaluar_respuestas_criterios_async
+from evaluacion.evaluacion_especulativa import EvaluacionEspeculativa
+from evaluacion.ejecucion_notebooks import verificar_ejecucion_async, resumen_ejecucion
+from evaluacion.plantillas_prompt import version_prompt
+from evaluacion.triaje import triaje_estatico, limitar_evaluacion
+from evaluacion.predictor_nota import obtener_predictor, predecir
+from evaluacion.reentrega import (
+    ultima_entrega, planificar_reentrega, reevaluar_componentes_async, evaluacion_desde_fila, extras_desde_fila
+)
 from evaluacion.cierre_capitulo_simple import verificar_cierre_automatico
+from evaluacion.recalificacion import iniciar_recalificador
 from ui.ui_components import (
-    mostrar_header, mostrar_resultado_originalidad,
-    mostrar_evaluacion_ia, mostrar_tabla_entregas,
+    mostrar_header, mostrar_header_capitulos, mostrar_resultado_originalidad, mostrar_originalidad_prosa,
+    mostrar_imagenes_reutilizadas, mostrar_reentrega,
+    mostrar_evaluacion_ia, mostrar_triaje, mostrar_evaluacion_pendiente, mostrar_nota_provisional,
+    mostrar_tabla_entregas,
     mostrar_mensaje_exito
 )
 
 st.set_page_config(layout="centered", page_title="Entregas ML grupo lectura post bootcamp")
 
+# Endpoint /metrics (formato Prometheus) con los tiempos por etapa, si se configura el puerto
+if os.environ.get("METRICS_PORT"):
+    iniciar_servidor_metricas(os.environ["METRICS_PORT"])
+
 def inicializar_session_state():
     if "archivo_guardado" not in st.session_state:
         st.session_state.archivo_guardado = False
@@ -39,8 +66,30 @@ def inicializar_session_state():
         st.session_state.similitud = 0
         st.session_state.evaluacion = None
 
+def calcular_halls(capitulos):
+    return {
+        capitulo["columna"]: generar_hall_of_fame(capitulo["columna"], REPO_DIR)
+        for capitulo in capitulos
+    }
+
+def mostrar_tabla(df, capitulos, indice):
+    # La tabla solo se recalcula si cambia el registro, las evaluaciones o los capítulos
+    version = (
+        version_registro(REPO_DIR, REGISTRO_PATH),
+        version_evaluaciones(REPO_DIR),
+        tuple(capitulo["columna"] for capitulo in capitulos),
+    )
+    mostrar_tabla_entregas(df, lambda: calcular_halls(capitulos), indice, version)
+
 def main():
-    mostrar_header(CAPITULO, FECHA_LIMITE)
+    capitulos = list(cargar_capitulos().values())
+    abiertos = capitulos_abiertos()
+    
+    if abiertos:
+        mostrar_header_capitulos(abiertos)
+    else:
+        capitulo = capitulo_por_defecto()
+        mostrar_header(capitulo["nombre"], capitulo["fecha_limite"])
     
     try:
         repo = inicializar_repo(REPO_DIR, REPO_URL, TOKEN)
@@ -48,47 +97,42 @@ def main():
         st.error(f"❌ Error Git: {str(e)}")
         st.stop()
     
+    # Reevalúa en segundo plano las entregas que quedaron pendientes por una caída de la IA
+    iniciar_recalificador(REPO_DIR, repo)
+    
+    # Cierra los capítulos cuyo plazo ya venció (solo actúa una vez por capítulo);
+    # el notebook oficial solo se carga si el capítulo se cierra de verdad
+    for capitulo in capitulos:
+        if plazo_vencido(capitulo):
+            verificar_cierre_automatico(
+                capitulo["nombre"], capitulo["columna"], REPO_DIR, REGISTRO_PATH, capitulo["fecha_limite"],
+                capitulo["carpeta"], partial(obtener_notebook_oficial, capitulo, REPO_DIR)
+            )
+    
     df = cargar_registro(REPO_DIR, REGISTRO_PATH)
     if df is None:
         st.error("No se encuentra registro_entregas.csv")
         st.stop()
     
-    if COLUMNA not in df.columns:
-        df[COLUMNA] = ""
+    for capitulo in capitulos:
+        if capitulo["columna"] not in df.columns:
+            df[capitulo["columna"]] = ""
     
-    inicializar_session_state()
+    indice = obtener_indice_nombres(df, version_registro(REPO_DIR, REGISTRO_PATH))
     
-    # VERIFICACIÓN DIRECTA SIN FUNCIONES
-    madrid_tz = pytz.timezone('Europe/Madrid')
-    ahora = datetime.now(madrid_tz)
-    
-    fecha_limite_check = FECHA_LIMITE
-    if fecha_limite_check.tzinfo is None:
-        fecha_limite_check = madrid_tz.localize(fecha_limite_check)
-    else:
-        fecha_limite_check = fecha_limite_check.astimezone(madrid_tz)
-    
-    plazo_vencido = ahora > fecha_limite_check
+    inicializar_session_state()
     
-    # Si está vencido, mostrar tabla de Hall of Fame
-    if plazo_vencido:
+    # Si no queda ningún capítulo abierto, mostrar tabla de Hall of Fame
+    if not abiertos:
         st.write("---")
         st.subheader("🎖️ ENTREGAS - CAPÍTULO CERRADO")
         
-        # Intentar cerrar
-        verificar_cierre_automatico(CAPITULO, COLUMNA, REPO_DIR, REGISTRO_PATH, FECHA_LIMITE)
-        
-        # Recargar df
-        df = cargar_registro(REPO_DIR, REGISTRO_PATH)
-        
-        # Mostrar tabla
-        hall = generar_hall_of_fame(COLUMNA, REPO_DIR)
-        mostrar_tabla_entregas(df, COLUMNA, hall)
+        mostrar_tabla(df, capitulos, indice)
         
         st.error("❌ El plazo de entrega ha finalizado.")
         return  # IMPORTANTE: Sale aquí, no muestra uploader
     
-    # SI NO ESTÁ VENCIDO, mostrar uploader
+    # SI HAY CAPÍTULOS ABIERTOS, mostrar uploader
     archivo = st.file_uploader(
         "Sube tu archivo .zip (capX-nombre.zip)",
         type=["zip"],
@@ -96,10 +140,9 @@ def main():
     )
     
     if archivo and not st.session_state.archivo_guardado:
-        procesar_entrega(archivo, df, repo)
+        procesar_entrega(archivo, df, indice, repo)
     
-    hall = generar_hall_of_fame(COLUMNA, REPO_DIR)
-    mostrar_tabla_entregas(df, COLUMNA, hall)
+    mostrar_tabla(df, capitulos, indice)
     
     if st.session_state.archivo_guardado:
         mostrar_mensaje_exito(
@@ -108,43 +151,111 @@ def main():
             st.session_state.similitud
         )
 
-def procesar_entrega(archivo, df, repo):
+def procesar_entrega(archivo, df, indice, repo):
+    # Todos los spans de esta entrega comparten el mismo identificador de traza
+    with traza(os.path.splitext(archivo.name)[0]):
+        with span("entrega_total", bytes=archivo.size):
+            _procesar_entrega(archivo, df, indice, repo)
+
+def _procesar_entrega(archivo, df, indice, repo):
     es_valido, capitulo_archivo, nombre = validar_nombre_archivo(archivo.name)
     
     if not es_valido:
         st.error("❌ Formato inválido: usa capX-nombre.zip")
         st.stop()
     
-    if not validar_nombre_en_lista(nombre, df["Nombre"].values):
-        st.error(f"El nombre '{nombre}' no está en la lista.")
+    capitulo = obtener_capitulo(capitulo_archivo)
+    if capitulo is None:
+        st.error(f"❌ El capítulo '{capitulo_archivo}' no está registrado para entregas.")
         st.stop()
     
-    carpeta_capitulo = os.path.join(REPO_DIR, "uploads", CARPETA_DESTINO)
-    carpeta_soluciones = os.path.join(REPO_DIR, "soluciones_alumnos", CARPETA_DESTINO)
+    if plazo_vencido(capitulo):
+        st.error(f"❌ El plazo de entrega de {capitulo['nombre']} ha finalizado.")
+        st.stop()
+    
+    if not validar_nombre_en_lista(nombre, indice):
+        sugerencias = indice.sugerencias(nombre)
+        if sugerencias:
+            opciones = ", ".join(f"'{s}'" for s in sugerencias)
+            st.error(f"El nombre '{nombre}' no está en la lista. ¿Quisiste decir {opciones}?")
+        else:
+            st.error(f"El nombre '{nombre}' no está en la lista.")
+        st.stop()
+    
+    carpeta_capitulo = os.path.join(REPO_DIR, "uploads", capitulo["carpeta"])
+    carpeta_soluciones = os.path.join(REPO_DIR, "soluciones_alumnos", capitulo["carpeta"])
     fecha = datetime.now().strftime("%Y-%m-%d")
     
-    filepath = guardar_archivo_zip(archivo, carpeta_capitulo)
+    with span("guardar_zip", bytes=archivo.size):
+        filepath = guardar_archivo_zip(archivo, carpeta_capitulo)
+    
+    # La entrega anterior se lee antes de extraer: una reentrega el mismo día la sobrescribe
+    with span("entrega_anterior"):
+        _, notebook_anterior = ultima_entrega(carpeta_soluciones, nombre)
+        fila_anterior = cargar_ultima_evaluacion(nombre, capitulo["nombre"], REPO_DIR)
     
     with st.spinner("🔍 Evaluando originalidad..."):
-        notebook_usuario, nombre_notebook = procesar_archivo_zip(
-            filepath, carpeta_soluciones, nombre, fecha
-        )
+        with span("extraer_zip", bytes=archivo.size):
+            notebook_usuario, nombre_notebook = procesar_archivo_zip(
+                filepath, carpeta_soluciones, nombre, fecha
+            )
         
         if notebook_usuario is None:
             st.error("❌ No hay notebook .ipynb en el .zip")
             st.stop()
         
-        notebook_oficial = descargar_notebook_oficial(SOLUCION_OFICIAL_URL)
-        if not notebook_oficial:
-            st.error("❌ No se pudo descargar el notebook oficial.")
-            st.stop()
-        
-        originalidad, similitud = evaluar_originalidad(notebook_usuario, notebook_oficial)
-        st.session_state.similitud = similitud
+        # Una evaluación puesta con otra versión de la rúbrica del capítulo no se reutiliza
+        version_rubrica = version_prompt(capitulo["enunciado"])
+        plan = planificar_reentrega(notebook_usuario, notebook_anterior, fila_anterior, version_rubrica)
+        triaje = ejecucion = None
+        prediccion = aviso_provisional = None
+        if plan["modo"] != "sin_cambios":
+            with span("triaje"):
+                triaje = triaje_estatico(notebook_usuario)
+            if EJECUCION_NOTEBOOKS and not triaje["evaluacion"]:
+                # El notebook se vuelve a ejecutar en un proceso aislado, en paralelo con la IA y la originalidad
+                ejecucion = lanzar(verificar_ejecucion_async(notebook_usuario))
+        if triaje and triaje["evaluacion"]:
+            # Notebook claramente incompleto: nota estática sin petición a la IA
+            plan = {**plan, "modo": "completa", "componentes": list(COMPONENTES)}
+            evaluacion_llm = None
+        else:
+            # La IA se lanza ya, en paralelo con la originalidad; se cancela si resulta ser una copia directa
+            # Alumno y capítulo en la telemetría de cada llamada al LLM
+            with contexto_llm(alumno=nombre, capitulo=capitulo["nombre"]):
+                evaluacion_llm = _lanzar_evaluacion_ia(plan, notebook_usuario, capitulo, fila_anterior)
+            if evaluacion_llm:
+                # Nota estimada en local mientras responde la IA
+                prediccion = _nota_provisional(notebook_usuario, triaje)
+                aviso_provisional = mostrar_nota_provisional(prediccion)
+        analisis = None
+        try:
+            if plan["modo"] != "sin_cambios":
+                analisis = _analizar_originalidad_entrega(notebook_usuario, capitulo, nombre)
+        except BaseException:
+            if evaluacion_llm:
+                evaluacion_llm.cancelar()
+            if ejecucion:
+                ejecucion.cancel()
+            raise
     
-    mostrar_resultado_originalidad(originalidad, similitud)
+    mostrar_reentrega(plan)
+    if analisis:
+        originalidad, similitud, extras = _mostrar_originalidad_entrega(analisis)
     
-    if originalidad == "Copia directa":
+    if plan["modo"] == "sin_cambios":
+        # Mismo contenido que la entrega anterior: se reutiliza su evaluación sin llamar a la IA
+        # Similitud puede estar vacía (no se calculó exacta) y cargar_ultima_evaluacion omite las columnas vacías
+        originalidad, similitud = fila_anterior["Originalidad"], fila_anterior.get("Similitud")
+        mostrar_resultado_originalidad(originalidad, similitud)
+        extras = extras_desde_fila(fila_anterior)
+        evaluacion_ia = evaluacion_desde_fila(fila_anterior)
+    elif originalidad == "Copia directa":
+        if evaluacion_llm:
+            evaluacion_llm.cancelar()
+        if ejecucion:
+            ejecucion.cancel()
+        extras["Origen"] = ORIGEN_COPIA
         evaluacion_ia = {
             "nota_total": 0.0,
             "exploracion": 0,
@@ -156,22 +267,127 @@ def procesar_entrega(archivo, df, repo):
             "puntos_fuertes": [],
             "areas_mejora": ["Hacer trabajo original"]
         }
+    elif triaje["evaluacion"]:
+        mostrar_triaje(triaje)
+        evaluacion_ia = triaje["evaluacion"]
+        extras["Origen"] = ORIGEN_TRIAJE
     else:
-        with st.spinner("🤖 Evaluando con IA..."):
-            evaluacion_ia = evaluar_respuestas_ia(notebook_usuario)
+        detalle = f" ({', '.join(plan['componentes'])})" if plan["modo"] == "parcial" else ""
+        with st.spinner(f"🤖 Evaluando con IA{detalle}..."):
+            with span("espera_llm"):
+                evaluacion_ia = evaluacion_llm.resultado()
+        if es_evaluacion_pendiente(evaluacion_ia):
+            # IA caída: nota provisional que el recalificador sustituirá cuando vuelva
+            # (la ejecución sigue en curso y el recalificador la encontrará guardada)
+            mostrar_evaluacion_pendiente()
+            extras["Origen"] = ORIGEN_PENDIENTE
+        else:
+            if aviso_provisional:
+                aviso_provisional.empty()
+            if ejecucion:
+                # Celdas ejecutadas y errores según la ejecución real, no según las salidas guardadas
+                resultado_ejecucion = _resultado_ejecucion(ejecucion)
+                triaje = triaje_estatico(notebook_usuario, resultado_ejecucion)
+                extras["Ejecucion"] = resumen_ejecucion(resultado_ejecucion)
+            # Nota máxima sugerida por el análisis estático (sin modelos, sin métricas, errores...)
+            evaluacion_ia = limitar_evaluacion(evaluacion_ia, triaje)
+            extras["Origen"] = ORIGEN_IA
+            extras["Version_Prompt"] = version_rubrica
+        if prediccion:
+            # Para medir la concordancia con la IA (python -m evaluacion.predictor_nota concordancia)
+            extras["Nota_Prevista"] = prediccion["nota_total"]
     
+    st.session_state.similitud = similitud
     st.session_state.evaluacion = evaluacion_ia
     mostrar_evaluacion_ia(evaluacion_ia, originalidad)
     
-    guardar_evaluacion(nombre, CAPITULO, fecha, originalidad, similitud, evaluacion_ia, REPO_DIR)
-    actualizar_registro(df, nombre, COLUMNA, REPO_DIR, REGISTRO_PATH)
+    with span("escritura_csv"):
+        extras["Reevaluacion"] = plan["modo"] if plan["modo"] != "parcial" else f"parcial: {', '.join(plan['componentes'])}"
+        guardar_evaluacion(nombre, capitulo["nombre"], fecha, originalidad, similitud, evaluacion_ia, REPO_DIR, extras)
+        actualizar_registro(df, nombre, capitulo["columna"], REPO_DIR, REGISTRO_PATH, indice)
     
-    mensaje_commit = f"{CAPITULO} - {nombre} - Nota: {evaluacion_ia['nota_total']}/10"
-    commit_y_push(repo, mensaje_commit)
+    mensaje_commit = f"{capitulo['nombre']} - {nombre} - Nota: {evaluacion_ia['nota_total']}/10"
+    # Por el núcleo asíncrono: se serializa con los commits del recalificador
+    ejecutar(commit_y_push_async(repo, mensaje_commit))
     
     st.session_state.archivo_guardado = True
     st.session_state.archivo_nombre = archivo.name
     st.session_state.archivo_autor = nombre
 
+def _lanzar_evaluacion_ia(plan, notebook_usuario, capitulo, fila_anterior):
+    """Evaluación con IA especulativa según el plan de reentrega (None si no hace falta)."""
+    if plan["modo"] == "completa":
+        evaluar = evaluar_respuestas_criterios_async if MODO_EVALUACION_IA == "criterios" else evaluar_respuestas_ia_async
+        return EvaluacionEspeculativa(evaluar, notebook_usuario, capitulo["enunciado"])
+    if plan["modo"] == "parcial":
+        return EvaluacionEspeculativa(
+            reevaluar_componentes_async, notebook_usuario, capitulo["enunciado"],
+            evaluacion_desde_fila(fila_anterior), plan["componentes"]
+        )
+    return None
+
+def _resultado_ejecucion(ejecucion):
+    """Espera la verificación por ejecución (None si no se pudo hacer: se usa el análisis estático)."""
+    with st.spinner("🧪 Comprobando que el notebook se ejecuta..."):
+        with span("espera_ejecucion"):
+            try:
+                return ejecucion.result()
+            except Exception as e:
+                st.warning(f"⚠️ No se pudo comprobar la ejecución del notebook: {e}")
+                return None
+
+def _nota_provisional(notebook_usuario, triaje):
+    """Nota del predictor local (None si aún no se ha entrenado), limitada por el análisis estático."""
+    modelo = obtener_predictor(REPO_DIR)
+    if modelo is None:
+        return None
+    with span("prediccion_nota"):
+        prediccion = predecir(modelo, notebook_usuario, triaje["analisis"])
+    prediccion["nota_total"] = min(prediccion["nota_total"], triaje["analisis"]["nota_maxima_sugerida"])
+    return prediccion
+
+def _analizar_originalidad_entrega(notebook_usuario, capitulo, nombre):
+    """Originalidad del código (con su alineación por celdas), de la prosa y de las gráficas."""
+    with span("descarga_oficial", capitulo=capitulo["clave"]):
+        notebook_oficial = obtener_notebook_oficial(capitulo, REPO_DIR)
+    if not notebook_oficial:
+        st.error("❌ No se pudo descargar el notebook oficial.")
+        st.stop()
+    
+    with span("carga_corpus"):
+        corpus = obtener_corpus(REPO_DIR)
+    resultado = analizar_originalidad(notebook_usuario, notebook_oficial, corpus=corpus)
+    
+    with span("alineacion_celdas"):
+        alineacion = alinear_celdas(notebook_usuario, notebook_oficial)
+    
+    with span("similitud_prosa"):
+        prosa = analizar_prosa(
+            notebook_usuario, notebook_oficial, obtener_indice_prosa(capitulo, REPO_DIR), nombre
+        )
+    
+    with span("huellas_imagenes"):
+        imagenes = analizar_imagenes(
+            notebook_usuario, obtener_indice_imagenes(capitulo, REPO_DIR, notebook_oficial), nombre
+        )
+    
+    return {"resultado": resultado, "alineacion": alineacion, "prosa": prosa, "imagenes": imagenes}
+
+def _mostrar_originalidad_entrega(analisis):
+    """Muestra el análisis de originalidad; devuelve (originalidad, similitud, extras)."""
+    resultado, prosa, imagenes = analisis["resultado"], analisis["prosa"], analisis["imagenes"]
+    # Similitud solo guarda el ratio exacto; la estimación de la cascada va en su propia columna
+    originalidad, similitud = resultado["originalidad"], resultado["similitud_exacta"]
+    mostrar_resultado_originalidad(originalidad, similitud, analisis["alineacion"], resultado["fuente"])
+    mostrar_originalidad_prosa(prosa)
+    mostrar_imagenes_reutilizadas(imagenes)
+    
+    extras = {"Similitud_Estimada": round(resultado["similitud"], 3)}
+    if prosa["originalidad_prosa"] is not None:
+        extras["Originalidad_Prosa"] = round(prosa["originalidad_prosa"], 3)
+    if imagenes["imagenes"]:
+        extras["Graficas_Reutilizadas"] = len(imagenes["reutilizadas"])
+    return originalidad, similitud, extras
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,206 @@
+"""
+Registro de capítulos cargado desde capitulos.toml
+Se lee una sola vez y se recarga automáticamente si cambia la fecha de modificación
+"""
+import os
+import re
+import threading
+import tomllib
+from datetime import datetime
+import pytz
+
+RUTA_CAPITULOS = os.environ.get(
+    "CAPITULOS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "capitulos.toml")
+)
+
+MADRID_TZ = pytz.timezone('Europe/Madrid')
+
+CAMPOS_OBLIGATORIOS = ["nombre", "columna", "carpeta", "fecha_limite", "solucion_oficial_url", "enunciado"]
+
+_lock = threading.Lock()
+_registro = {
+    "ruta": None,
+    "mtime": None,
+    "por_defecto": None,
+    "capitulos": {},
+    "caches": {},
+}
+
+
+def normalizar_clave(clave):
+    """
+    Normaliza el prefijo de capítulo ('cap02', 'CAP2' -> 'cap2').
+
+    Args:
+        clave: Prefijo del capítulo tal y como aparece en el nombre del ZIP
+
+    Returns:
+        str: Clave normalizada o None si no tiene formato capX
+    """
+    match = re.match(r"^cap(\d{1,2})$", str(clave).strip().lower())
+    if not match:
+        return None
+    return f"cap{int(match.group(1))}"
+
+
+def _preparar_capitulo(clave, datos):
+    """
+    Valida y completa la configuración de un capítulo leída del TOML.
+
+    Args:
+        clave: Clave normalizada del capítulo
+        datos: Tabla TOML del capítulo
+
+    Returns:
+        dict: Configuración del capítulo con la fecha límite en hora de Madrid
+    """
+    faltan = [campo for campo in CAMPOS_OBLIGATORIOS if campo not in datos]
+    if faltan:
+        raise ValueError(f"Capítulo '{clave}' sin campos obligatorios: {', '.join(faltan)}")
+
+    capitulo = dict(datos)
+    capitulo["clave"] = clave
+
+    fecha_limite = capitulo["fecha_limite"]
+    if not isinstance(fecha_limite, datetime):
+        raise ValueError(f"Capítulo '{clave}': fecha_limite debe ser una fecha TOML (2025-11-24T20:30:00)")
+    if fecha_limite.tzinfo is None:
+        fecha_limite = MADRID_TZ.localize(fecha_limite)
+    else:
+        fecha_limite = fecha_limite.astimezone(MADRID_TZ)
+    capitulo["fecha_limite"] = fecha_limite
+
+    capitulo.setdefault("solucion_oficial_local", "")
+    return capitulo
+
+
+def cargar_capitulos(ruta=None):
+    """
+    Devuelve el registro de capítulos, recargándolo solo si el fichero ha cambiado.
+
+    Si el fichero modificado no es válido se mantiene la última versión buena.
+
+    Args:
+        ruta: Ruta al fichero TOML (por defecto RUTA_CAPITULOS)
+
+    Returns:
+        dict: {clave: configuración del capítulo}
+    """
+    ruta = ruta or RUTA_CAPITULOS
+    mtime = os.stat(ruta).st_mtime_ns
+
+    with _lock:
+        if _registro["ruta"] == ruta and _registro["mtime"] == mtime:
+            return _registro["capitulos"]
+
+        try:
+            with open(ruta, "rb") as f:
+                datos = tomllib.load(f)
+
+            capitulos = {}
+            for clave, datos_capitulo in datos.get("capitulos", {}).items():
+                clave_normalizada = normalizar_clave(clave)
+                if clave_normalizada is None:
+                    raise ValueError(f"Clave de capítulo inválida: '{clave}' (usa capX)")
+                capitulos[clave_normalizada] = _preparar_capitulo(clave_normalizada, datos_capitulo)
+
+            if not capitulos:
+                raise ValueError("No hay capítulos definidos en el registro")
+        except (OSError, tomllib.TOMLDecodeError, ValueError):
+            if _registro["capitulos"]:
+                # Fichero a medio editar: seguimos con la versión anterior
+                return _registro["capitulos"]
+            raise
+
+        por_defecto = normalizar_clave(datos.get("por_defecto", "")) or next(iter(capitulos))
+
+        # Las cachés se conservan solo para capítulos cuya configuración no cambió
+        caches = {
+            clave: cache
+            for clave, cache in _registro["caches"].items()
+            if _registro["capitulos"].get(clave) == capitulos.get(clave)
+        }
+
+        _registro.update({
+            "ruta": ruta,
+            "mtime": mtime,
+            "por_defecto": por_defecto if por_defecto in capitulos else next(iter(capitulos)),
+            "capitulos": capitulos,
+            "caches": caches,
+        })
+        return capitulos
+
+
+def obtener_capitulo(clave):
+    """
+    Busca un capítulo por su prefijo (el 'capX' de validar_nombre_archivo).
+
+    Args:
+        clave: Prefijo del capítulo
+
+    Returns:
+        dict: Configuración del capítulo o None si no está registrado
+    """
+    clave_normalizada = normalizar_clave(clave)
+    if clave_normalizada is None:
+        return None
+    return cargar_capitulos().get(clave_normalizada)
+
+
+def capitulo_por_defecto():
+    """
+    Devuelve el capítulo marcado como 'por_defecto' en el registro.
+
+    Returns:
+        dict: Configuración del capítulo
+    """
+    capitulos = cargar_capitulos()
+    return capitulos[_registro["por_defecto"]]
+
+
+def plazo_vencido(capitulo, ahora=None):
+    """
+    Indica si ha pasado la fecha límite de un capítulo.
+
+    Args:
+        capitulo: Configuración del capítulo
+        ahora: Fecha de referencia (por defecto, la hora actual en Madrid)
+
+    Returns:
+        bool: True si el plazo ha terminado
+    """
+    ahora = ahora or datetime.now(MADRID_TZ)
+    return ahora > capitulo["fecha_limite"]
+
+
+def capitulos_abiertos(ahora=None):
+    """
+    Lista los capítulos que aún aceptan entregas, ordenados por fecha límite.
+
+    Args:
+        ahora: Fecha de referencia (por defecto, la hora actual en Madrid)
+
+    Returns:
+        list: Configuraciones de los capítulos abiertos
+    """
+    abiertos = [c for c in cargar_capitulos().values() if not plazo_vencido(c, ahora)]
+    return sorted(abiertos, key=lambda c: c["fecha_limite"])
+
+
+def cache_capitulo(clave):
+    """
+    Caché en memoria asociada a un capítulo (notebook oficial, huellas...).
+
+    Se vacía automáticamente si la configuración del capítulo cambia en el TOML.
+
+    Args:
+        clave: Prefijo del capítulo
+
+    Returns:
+        dict: Diccionario mutable compartido entre sesiones
+    """
+    clave_normalizada = normalizar_clave(clave)
+    cargar_capitulos()
+    with _lock:
+        return _registro["caches"].setdefault(clave_normalizada, {})
@@ -1,12 +1,13 @@
-from datetime import datetime
+import os
 import streamlit as st
-import pytz
+from config.capitulos import capitulo_por_defecto
 
-# Configuración del capítulo (cambia en cada entrega)
-CAPITULO = "Capítulo 2"
-COLUMNA = "Capítulo 2"
-CARPETA_DESTINO = "capitulo_02"
-FECHA_LIMITE = pytz.timezone('Europe/Madrid').localize(datetime(2025, 11, 24, 20, 30, 0))
+# Configuración del capítulo por defecto (el registro completo está en capitulos.toml)
+_CAPITULO_POR_DEFECTO = capitulo_por_defecto()
+CAPITULO = _CAPITULO_POR_DEFECTO["nombre"]
+COLUMNA = _CAPITULO_POR_DEFECTO["columna"]
+CARPETA_DESTINO = _CAPITULO_POR_DEFECTO["carpeta"]
+FECHA_LIMITE = _CAPITULO_POR_DEFECTO["fecha_limite"]
 
 # Configuración del repositorio GitHub
 REPO_URL = "https://github.com/eortas/Machine_learning_grupo.git"
@@ -14,53 +15,54 @@ REPO_DIR = "repo_temp"
 REGISTRO_PATH = "uploads/registro_entregas.csv"
 
 # URL del notebook oficial 
-SOLUCION_OFICIAL_URL = "https://github.com/ageron/handson-ml3/raw/main/02_end_to_end_machine_learning_project.ipynb"
+SOLUCION_OFICIAL_URL = _CAPITULO_POR_DEFECTO["solucion_oficial_url"]
 
 # Carga tokens desde secrets
 try:
     TOKEN = st.secrets.get("GITHUB_TOKEN", "")
     GROQ_API_KEY = st.secrets.get("GROQ_API_KEY", "")
+    GROQ_API_KEY_2 = st.secrets.get("GROQ_API_KEY_2", "")
 except:
     TOKEN = ""
     GROQ_API_KEY = ""
+    GROQ_API_KEY_2 = ""
 
-# Enunciado del ejercicio
-ENUNCIADO_EJERCICIO = """
-**Ejercicio: End-to-End Machine Learning Project**
+# Variables de entorno como alternativa a secrets (Docker, benchmarks)
+TOKEN = TOKEN or os.environ.get("GITHUB_TOKEN", "")
+GROQ_API_KEY = GROQ_API_KEY or os.environ.get("GROQ_API_KEY", "")
+GROQ_API_KEY_2 = GROQ_API_KEY_2 or os.environ.get("GROQ_API_KEY_2", "")
+
+# Endpoint compatible con OpenAI (en benchmarks/ se apunta al servidor simulado)
+GROQ_API_URL = os.environ.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+# Segundo backend (otra clave y, opcionalmente, otro endpoint compatible) para las peticiones cubiertas
+GROQ_API_URL_2 = os.environ.get("GROQ_API_URL_2", GROQ_API_URL)
 
-El objetivo de este capítulo es construir un modelo de Machine Learning completo para predecir precios de viviendas en California.
+# Backends del LLM por orden de preferencia (solo los que tienen clave)
+LLM_BACKENDS = [
+    {"nombre": nombre, "url": url, "clave": clave}
+    for nombre, url, clave in (("groq_1", GROQ_API_URL, GROQ_API_KEY), ("groq_2", GROQ_API_URL_2, GROQ_API_KEY_2))
+    if clave
+]
 
-**Tareas a realizar:**
+# Peticiones cubiertas: si la respuesta tarda más que este percentil de las latencias
+# recientes se lanza un duplicado en otro backend; 0 para desactivarlas
+LLM_COBERTURA = os.environ.get("LLM_COBERTURA", "1") != "0"
+LLM_COBERTURA_PERCENTIL = float(os.environ.get("LLM_COBERTURA_PERCENTIL", "95"))
+# Fracción máxima de peticiones duplicadas (gasto extra de cuota)
+LLM_COBERTURA_PRESUPUESTO = float(os.environ.get("LLM_COBERTURA_PRESUPUESTO", "0.1"))
 
-1. **Exploración de datos:**
-   - Cargar el dataset de viviendas de California
-   - Analizar las características principales
-   - Visualizar distribuciones y correlaciones
-   - Identificar valores faltantes y outliers
+# Evaluación con IA: "monolitica" (un prompt para los 5 criterios) o "criterios" (una petición por criterio)
+MODO_EVALUACION_IA = os.environ.get("MODO_EVALUACION_IA", "monolitica")
 
-2. **Preprocesamiento:**
-   - Dividir datos en train/test
-   - Crear un pipeline de transformación
-   - Manejar valores faltantes
-   - Escalar características numéricas
-   - Codificar variables categóricas
+# Pide al proveedor respuestas en modo JSON (response_format json_object); 0 si no lo admite
+LLM_MODO_JSON = os.environ.get("LLM_MODO_JSON", "1") != "0"
 
-3. **Modelado:**
-   - Entrenar al menos 2 modelos diferentes
-   - Usar validación cruzada
-   - Optimizar hiperparámetros (opcional)
-   - Evaluar con métricas apropiadas (RMSE, MAE)
+# Recibe las respuestas en streaming (SSE) y deja de leer al cerrarse el JSON; 0 para esperar la respuesta entera
+LLM_STREAMING = os.environ.get("LLM_STREAMING", "1") != "0"
 
-4. **Análisis de resultados:**
-   - Comparar modelos
-   - Analizar errores
-   - Visualizar predicciones vs valores reales
-   - Documentar conclusiones
+# Vuelve a ejecutar cada notebook en un proceso aislado para comprobar que el código funciona de verdad
+# (ver evaluacion.ejecucion_notebooks); necesita housing.csv en DATOS_EJECUCION_PATH
+EJECUCION_NOTEBOOKS = os.environ.get("EJECUCION_NOTEBOOKS", "0") != "0"
 
-**Criterios de evaluación (sobre 10):**
-- Exploración de datos completa (2 puntos)
-- Preprocesamiento correcto (2 puntos)
-- Implementación de modelos (3 puntos)
-- Evaluación y análisis (2 puntos)
-- Documentación y claridad (1 punto)
-"""
+# Enunciado del ejercicio
+ENUNCIADO_EJERCICIO = _CAPITULO_POR_DEFECTO["enunciado"]
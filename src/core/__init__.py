@@ -1,13 +1,21 @@
 """Módulo core con lógica principal"""
-from .git_manager import inicializar_repo, commit_y_push
+from .git_manager import inicializar_repo, commit_y_push, commit_y_push_async
+from .asincrono import ejecutar, lanzar
 from .file_processor import guardar_archivo_zip, procesar_archivo_zip
 from .validators import validar_nombre_archivo, validar_nombre_en_lista
+from .indice_nombres import IndiceNombres, normalizar_nombre, obtener_indice_nombres
 
 __all__ = [
     'inicializar_repo',
     'commit_y_push',
+    'commit_y_push_async',
+    'ejecutar',
+    'lanzar',
     'guardar_archivo_zip',
     'procesar_archivo_zip',
     'validar_nombre_archivo',
     'validar_nombre_en_lista',
+    'IndiceNombres',
+    'normalizar_nombre',
+    'obtener_indice_nombres',
 ]
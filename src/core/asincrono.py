@@ -0,0 +1,117 @@
+"""
+Núcleo asíncrono compartido
+Un único bucle de eventos en un hilo propio, con un cliente HTTP (httpx) y
+semáforos con nombre, compartido por todas las sesiones de Streamlit.
+
+El código síncrono (la app, los scripts) no usa asyncio directamente:
+    ejecutar(corrutina)   espera el resultado (fachada síncrona)
+    lanzar(corrutina)     devuelve un concurrent.futures.Future cancelable
+Las operaciones bloqueantes (git, CPU) se llevan a hilos con en_hilo().
+"""
+import asyncio
+import logging
+import threading
+import contextvars
+import httpx
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT_HTTP = httpx.Timeout(60.0, connect=10.0)
+LIMITES_HTTP = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+
+_lock = threading.Lock()
+_estado = {"bucle": None, "hilo": None, "cliente": None}
+_semaforos = {}
+
+
+def _obtener_bucle():
+    """Bucle de eventos compartido; se arranca en un hilo daemon la primera vez."""
+    with _lock:
+        if _estado["bucle"] is None:
+            bucle = asyncio.new_event_loop()
+            hilo = threading.Thread(target=bucle.run_forever, name="nucleo_asincrono", daemon=True)
+            hilo.start()
+            _estado["bucle"], _estado["hilo"] = bucle, hilo
+        return _estado["bucle"]
+
+
+async def _en_contexto(corrutina, contexto):
+    # Cada tarea tiene su propio contexto: se copian las variables del llamante
+    # (p. ej. la traza de la entrega) para que los spans queden asociados
+    for variable, valor in contexto.items():
+        variable.set(valor)
+    return await corrutina
+
+
+def lanzar(corrutina):
+    """
+    Programa una corrutina en el bucle compartido sin esperarla.
+
+    Args:
+        corrutina: Corrutina a ejecutar
+
+    Returns:
+        concurrent.futures.Future: future.cancel() cancela la tarea (y su petición HTTP en curso)
+    """
+    bucle = _obtener_bucle()
+    if threading.current_thread() is _estado["hilo"]:
+        corrutina.close()
+        raise RuntimeError("lanzar() no se puede usar desde el bucle asíncrono: usa await")
+    return asyncio.run_coroutine_threadsafe(_en_contexto(corrutina, contextvars.copy_context()), bucle)
+
+
+def ejecutar(corrutina, timeout=None):
+    """
+    Fachada síncrona: ejecuta una corrutina en el bucle compartido y devuelve su resultado.
+
+    Args:
+        corrutina: Corrutina a ejecutar
+        timeout: Segundos máximos de espera (None = sin límite); al vencer se cancela la tarea
+
+    Returns:
+        Resultado de la corrutina
+
+    Raises:
+        TimeoutError: Si se supera el timeout
+    """
+    futuro = lanzar(corrutina)
+    try:
+        return futuro.result(timeout)
+    except TimeoutError:
+        futuro.cancel()
+        raise
+
+
+def cliente_http():
+    """
+    Cliente HTTP asíncrono compartido (reutiliza conexiones entre peticiones).
+
+    Solo se puede usar desde corrutinas que se ejecutan en el bucle compartido.
+
+    Returns:
+        httpx.AsyncClient
+    """
+    if _estado["cliente"] is None:
+        _estado["cliente"] = httpx.AsyncClient(timeout=TIMEOUT_HTTP, limits=LIMITES_HTTP, follow_redirects=True)
+    return _estado["cliente"]
+
+
+def limitador(nombre, limite):
+    """
+    Semáforo con nombre para acotar la concurrencia de un recurso (p. ej. 'llm').
+
+    Args:
+        nombre: Identificador del recurso
+        limite: Operaciones simultáneas permitidas (se fija la primera vez)
+
+    Returns:
+        asyncio.Semaphore
+    """
+    if nombre not in _semaforos:
+        _semaforos[nombre] = asyncio.Semaphore(limite)
+    return _semaforos[nombre]
+
+
+async def en_hilo(funcion, *args, **kwargs):
+    """Ejecuta una función bloqueante (git, CPU) en un hilo sin bloquear el bucle."""
+    return await asyncio.to_thread(funcion, *args, **kwargs)
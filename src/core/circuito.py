@@ -0,0 +1,79 @@
+"""
+Cortacircuitos para un servicio externo (p. ej. el LLM)
+Tras varios fallos seguidos el circuito se abre y las llamadas se rechazan al
+instante en lugar de repetir reintentos y esperas contra un servicio caído.
+Pasado un tiempo deja pasar una sola llamada de prueba: si funciona se cierra
+y, si no, vuelve a abrirse. El estado es compartido por todas las sesiones.
+"""
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+
+
+class Circuito:
+    """
+    Args:
+        nombre: Servicio que protege (para los logs)
+        umbral_fallos: Fallos seguidos que abren el circuito
+        tiempo_abierto: Segundos que permanece abierto antes de probar de nuevo
+    """
+
+    def __init__(self, nombre, umbral_fallos, tiempo_abierto):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_abierto = tiempo_abierto
+        self._estado = CERRADO
+        self._fallos = 0
+        self._abierto_desde = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        with self._lock:
+            if self._estado != CERRADO and time.monotonic() - self._abierto_desde >= self.tiempo_abierto:
+                return SEMIABIERTO
+            return self._estado
+
+    def permite(self):
+        """
+        Indica si se puede llamar al servicio.
+
+        Con el circuito abierto, pasado tiempo_abierto se deja pasar una única
+        llamada de prueba; el resto se rechaza hasta que esta termine.
+
+        Returns:
+            bool
+        """
+        with self._lock:
+            if self._estado == CERRADO:
+                return True
+            # Una llamada de prueba que no termina (cancelada) no bloquea el circuito: pasado
+            # tiempo_abierto se permite otra
+            if time.monotonic() - self._abierto_desde >= self.tiempo_abierto:
+                self._estado = SEMIABIERTO
+                self._abierto_desde = time.monotonic()
+                logger.info(f"Circuito {self.nombre}: llamada de prueba")
+                return True
+            return False
+
+    def registrar_exito(self):
+        with self._lock:
+            if self._estado != CERRADO:
+                logger.info(f"Circuito {self.nombre}: cerrado, el servicio responde")
+            self._estado = CERRADO
+            self._fallos = 0
+
+    def registrar_fallo(self):
+        with self._lock:
+            self._fallos += 1
+            if self._estado == SEMIABIERTO or self._fallos >= self.umbral_fallos:
+                if self._estado != ABIERTO:
+                    logger.warning(f"Circuito {self.nombre}: abierto tras {self._fallos} fallos seguidos")
+                self._estado = ABIERTO
+                self._abierto_desde = time.monotonic()
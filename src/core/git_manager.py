@@ -5,6 +5,8 @@ import os
 import logging
 from git import Repo
 from git.exc import GitCommandError
+from utils.trazas import span
+from core.asincrono import limitador, en_hilo
 
 logger = logging.getLogger(__name__)
 
@@ -89,20 +91,22 @@ def commit_y_push(repo, mensaje_commit):
             logger.info("No hay cambios para hacer commit")
             return True
         
-        # Agrega archivos
-        repo.git.add(".")
-        
-        # Verifica si hay cambios staged
-        if repo.index.diff("HEAD"):
-            # Realiza commit
-            repo.index.commit(mensaje_commit)
-            logger.info(f"Commit realizado: {mensaje_commit}")
+        with span("commit"):
+            # Agrega archivos
+            repo.git.add(".")
+            
+            # Verifica si hay cambios staged
+            if repo.index.diff("HEAD"):
+                # Realiza commit
+                repo.index.commit(mensaje_commit)
+                logger.info(f"Commit realizado: {mensaje_commit}")
         
         # Push con reintentos
         try:
             logger.info("Haciendo push...")
             origin = repo.remote(name="origin")
-            origin.push(force=True)  # force=True para evitar rechazos
+            with span("push"):
+                origin.push(force=True)  # force=True para evitar rechazos
             logger.info("Push completado exitosamente")
             return True
         
@@ -111,8 +115,9 @@ def commit_y_push(repo, mensaje_commit):
             # Intenta pull antes de push nuevamente
             try:
                 logger.info("Intentando pull antes de push...")
-                origin.pull(force=True)
-                origin.push(force=True)
+                with span("push", reintento=True):
+                    origin.pull(force=True)
+                    origin.push(force=True)
                 logger.info("Push exitoso después de pull")
                 return True
             except GitCommandError as retry_error:
@@ -121,4 +126,15 @@ def commit_y_push(repo, mensaje_commit):
     
     except Exception as e:
         logger.error(f"Error en commit/push: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+
+async def commit_y_push_async(repo, mensaje_commit):
+    """
+    commit_y_push() en un hilo, para usarlo desde corrutinas sin bloquear el bucle.
+    
+    Las operaciones git se serializan: dos commits a la vez sobre el mismo
+    repositorio se pisarían el índice.
+    """
+    async with limitador("git", 1):
+        return await en_hilo(commit_y_push, repo, mensaje_commit)
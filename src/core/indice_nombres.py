@@ -0,0 +1,134 @@
+"""
+Índice de nombres del registro de entregas
+Búsqueda O(1) por nombre normalizado y sugerencias "¿quisiste decir...?"
+"""
+import threading
+import unicodedata
+from collections import defaultdict
+
+TAMANO_NGRAMA = 3
+
+_lock = threading.Lock()
+_cache_indices = {}
+
+
+def normalizar_nombre(nombre):
+    """
+    Normaliza un nombre para compararlo: sin acentos, casefold y sin espacios extremos.
+
+    Args:
+        nombre: Nombre a normalizar
+
+    Returns:
+        str: Nombre normalizado ('Íñigo ' -> 'inigo')
+    """
+    descompuesto = unicodedata.normalize("NFKD", str(nombre))
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return sin_acentos.casefold().strip()
+
+
+def _ngramas(texto):
+    """
+    Devuelve el conjunto de n-gramas de caracteres de un texto ya normalizado.
+    Se añaden marcadores de inicio y fin para dar peso a prefijos y sufijos.
+    """
+    texto = f"^{texto}$"
+    if len(texto) <= TAMANO_NGRAMA:
+        return {texto}
+    return {texto[i:i + TAMANO_NGRAMA] for i in range(len(texto) - TAMANO_NGRAMA + 1)}
+
+
+class IndiceNombres:
+    """
+    Índice del listado de miembros construido una vez por versión del registro.
+
+    Mapea cada nombre normalizado a su posición (fila) en el DataFrame y mantiene
+    un índice invertido de trigramas para sugerir nombres parecidos.
+    """
+
+    def __init__(self, nombres):
+        self.nombres = [str(n) for n in nombres]
+        self.claves = [normalizar_nombre(n) for n in self.nombres]
+        self.posiciones = {}
+        self._ngramas_por_nombre = {}
+        self._nombres_por_ngrama = defaultdict(set)
+
+        for posicion, clave in enumerate(self.claves):
+            if clave in self.posiciones:
+                continue
+            self.posiciones[clave] = posicion
+            ngramas = _ngramas(clave)
+            self._ngramas_por_nombre[clave] = ngramas
+            for ngrama in ngramas:
+                self._nombres_por_ngrama[ngrama].add(clave)
+
+    def __len__(self):
+        return len(self.posiciones)
+
+    def __contains__(self, nombre):
+        return normalizar_nombre(nombre) in self.posiciones
+
+    def posicion(self, nombre):
+        """
+        Devuelve la fila del nombre en el registro o None si no existe.
+
+        Args:
+            nombre: Nombre a buscar (sin normalizar)
+
+        Returns:
+            int: Posición de la fila o None
+        """
+        return self.posiciones.get(normalizar_nombre(nombre))
+
+    def sugerencias(self, nombre, maximo=3, umbral=0.3):
+        """
+        Sugiere nombres del registro parecidos al dado (coeficiente de Dice sobre trigramas).
+
+        Solo se puntúan los nombres que comparten al menos un trigrama, gracias
+        al índice invertido precalculado.
+
+        Args:
+            nombre: Nombre introducido
+            maximo: Número máximo de sugerencias
+            umbral: Similitud mínima (0.0 a 1.0)
+
+        Returns:
+            list: Nombres originales del registro, del más parecido al menos parecido
+        """
+        clave = normalizar_nombre(nombre)
+        ngramas = _ngramas(clave)
+
+        coincidencias = defaultdict(int)
+        for ngrama in ngramas:
+            for candidato in self._nombres_por_ngrama.get(ngrama, ()):
+                coincidencias[candidato] += 1
+
+        puntuaciones = []
+        for candidato, comunes in coincidencias.items():
+            total = len(ngramas) + len(self._ngramas_por_nombre[candidato])
+            similitud = 2 * comunes / total
+            if similitud >= umbral and candidato != clave:
+                puntuaciones.append((similitud, candidato))
+
+        puntuaciones.sort(key=lambda x: (-x[0], x[1]))
+        return [self.nombres[self.posiciones[c]] for _, c in puntuaciones[:maximo]]
+
+
+def obtener_indice_nombres(df, version):
+    """
+    Devuelve el índice de nombres del registro, construyéndolo solo si cambió la versión.
+
+    Args:
+        df: DataFrame con el registro de entregas (columna 'Nombre')
+        version: Versión del registro (ver data_manager.version_registro)
+
+    Returns:
+        IndiceNombres: Índice compartido entre sesiones
+    """
+    with _lock:
+        indice = _cache_indices.get(version)
+        if indice is None or len(indice.nombres) != len(df):
+            indice = IndiceNombres(df["Nombre"].values)
+            _cache_indices.clear()
+            _cache_indices[version] = indice
+        return indice
@@ -0,0 +1,129 @@
+"""
+Peticiones cubiertas (hedged requests)
+Si una petición no ha respondido cuando ya supera un percentil de las
+latencias recientes, se lanza un duplicado en otro backend y se usa la
+primera respuesta válida; la otra se cancela. Así la cola de latencia deja de
+ser la suma de timeouts de un backend lento. Un presupuesto limita la
+fracción de peticiones duplicadas para acotar el gasto extra.
+"""
+import time
+import math
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+
+logger = logging.getLogger(__name__)
+
+# Peticiones recientes que se tienen en cuenta para el percentil y el presupuesto
+VENTANA = 200
+# Hasta tener estas latencias no se estima el percentil: se usa RETARDO_INICIAL
+MIN_MUESTRAS = 20
+RETARDO_INICIAL = 10.0
+
+
+class Cobertura:
+    """
+    Estado compartido de las peticiones cubiertas de un recurso (p. ej. el LLM).
+
+    Las latencias se agrupan por clase de petición (p. ej. max_tokens), porque
+    una respuesta corta y una larga no tienen la misma distribución.
+
+    Args:
+        percentil: Percentil (0-100) de las latencias recientes tras el que se duplica
+        presupuesto: Fracción máxima de peticiones duplicadas en la ventana
+    """
+
+    def __init__(self, percentil, presupuesto):
+        self.percentil = percentil
+        self.presupuesto = presupuesto
+        self._latencias = defaultdict(lambda: deque(maxlen=VENTANA))
+        self._duplicadas = deque(maxlen=VENTANA)
+        self._lock = threading.Lock()
+        self._contadores = {"intentos": 0, "duplicadas": 0, "ganadas_por_duplicado": 0, "sin_presupuesto": 0}
+
+    def retardo(self, clase=None):
+        """Segundos de espera antes de duplicar una petición de esta clase."""
+        with self._lock:
+            latencias = sorted(self._latencias[clase])
+        if len(latencias) < MIN_MUESTRAS:
+            return RETARDO_INICIAL
+        posicion = max(0, math.ceil(self.percentil / 100 * len(latencias)) - 1)
+        return latencias[posicion]
+
+    def registrar_latencia(self, segundos, clase=None):
+        with self._lock:
+            self._latencias[clase].append(segundos)
+
+    def _reservar(self):
+        """Anota una petición y decide si el presupuesto permite duplicarla."""
+        with self._lock:
+            self._contadores["intentos"] += 1
+            permitidas = self.presupuesto * max(len(self._duplicadas) + 1, MIN_MUESTRAS)
+            if sum(self._duplicadas) + 1 > permitidas:
+                self._duplicadas.append(False)
+                self._contadores["sin_presupuesto"] += 1
+                return False
+            self._duplicadas.append(True)
+            self._contadores["duplicadas"] += 1
+            return True
+
+    def _anotar_sin_duplicar(self):
+        with self._lock:
+            self._contadores["intentos"] += 1
+            self._duplicadas.append(False)
+
+    def estadisticas(self):
+        """Contadores acumulados: intentos, duplicadas, ganadas_por_duplicado, sin_presupuesto."""
+        with self._lock:
+            return dict(self._contadores)
+
+    async def ejecutar(self, intentar, principal, alternativo=None, es_valido=None, clase=None):
+        """
+        Ejecuta intentar(principal) y, si tarda más que retardo(clase), también intentar(alternativo).
+
+        Args:
+            intentar: Función backend -> corrutina con el resultado de la petición
+            principal: Backend de la petición
+            alternativo: Backend del duplicado (None = no se duplica)
+            es_valido: Función resultado -> bool; un resultado no válido no gana la carrera
+            clase: Clase de petición para el percentil
+
+        Returns:
+            El primer resultado válido o, si ninguno lo es, el de la petición principal
+
+        Raises:
+            La excepción de la petición principal si ninguna da un resultado válido
+        """
+        es_valido = es_valido or (lambda resultado: resultado is not None)
+        inicio = time.perf_counter()
+        primera = asyncio.ensure_future(intentar(principal))
+        segunda = None
+        try:
+            terminadas, _ = await asyncio.wait({primera}, timeout=self.retardo(clase))
+            if terminadas or alternativo is None or not self._reservar():
+                if terminadas or alternativo is None:
+                    self._anotar_sin_duplicar()
+                resultado = await primera
+                if es_valido(resultado):
+                    self.registrar_latencia(time.perf_counter() - inicio, clase)
+                return resultado
+
+            logger.debug("Petición cubierta: se lanza un duplicado en el backend alternativo")
+            segunda = asyncio.ensure_future(intentar(alternativo))
+            pendientes = {primera, segunda}
+            while pendientes:
+                terminadas, pendientes = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for tarea in terminadas:
+                    if tarea.exception() is None and es_valido(tarea.result()):
+                        self.registrar_latencia(time.perf_counter() - inicio, clase)
+                        if tarea is segunda:
+                            with self._lock:
+                                self._contadores["ganadas_por_duplicado"] += 1
+                        return tarea.result()
+            return primera.result()
+        finally:
+            # La petición perdedora (o las dos, si se cancela la llamada) se cancela con su conexión
+            for tarea in (primera, segunda):
+                if tarea is not None and not tarea.done():
+                    tarea.cancel()
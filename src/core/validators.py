@@ -2,6 +2,7 @@
 Funciones para validar archivos y nombres
 """
 import re
+from core.indice_nombres import IndiceNombres, normalizar_nombre
 
 
 def validar_nombre_archivo(nombre_archivo):
@@ -29,13 +30,16 @@ def validar_nombre_archivo(nombre_archivo):
 def validar_nombre_en_lista(nombre, lista_nombres):
     """
     Valida que el nombre esté en la lista de nombres válidos.
+    Ignora mayúsculas y acentos.
     
     Args:
         nombre: Nombre a validar
-        lista_nombres: Lista de nombres válidos
+        lista_nombres: IndiceNombres del registro (búsqueda O(1)) o lista de nombres válidos
         
     Returns:
         bool: True si el nombre es válido, False en caso contrario
     """
-    nombres_validos = [n.lower() for n in lista_nombres]
-    return nombre.lower() in nombres_validos
+    if isinstance(lista_nombres, IndiceNombres):
+        return nombre in lista_nombres
+    nombres_validos = {normalizar_nombre(n) for n in lista_nombres}
+    return normalizar_nombre(nombre) in nombres_validos
@@ -1,14 +1,24 @@
 """Módulo de gestión de datos"""
 from .data_manager import (
     cargar_registro,
+    version_registro,
+    version_evaluaciones,
     actualizar_registro,
     guardar_evaluacion,
+    actualizar_evaluacion,
+    actualizar_evaluaciones,
+    cargar_ultima_evaluacion,
     generar_hall_of_fame
 )
 
 __all__ = [
     'cargar_registro',
+    'version_registro',
+    'version_evaluaciones',
     'actualizar_registro',
     'guardar_evaluacion',
+    'actualizar_evaluacion',
+    'actualizar_evaluaciones',
+    'cargar_ultima_evaluacion',
     'generar_hall_of_fame',
 ]
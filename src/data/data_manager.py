@@ -3,10 +3,14 @@ Funciones para gestionar datos de entregas y evaluaciones
 Versión corregida que guarda el CSV dentro del repositorio
 """
 import os
+import threading
 import pandas as pd
 
+# La app y el recalificador en segundo plano (ver evaluacion.recalificacion) escriben el mismo CSV
+_lock_evaluaciones = threading.Lock()
 
-def guardar_evaluacion(nombre, capitulo, fecha, originalidad, similitud, evaluacion_ia, repo_dir):
+
+def guardar_evaluacion(nombre, capitulo, fecha, originalidad, similitud, evaluacion_ia, repo_dir, extras=None):
     """
     Guarda la evaluación completa en un archivo CSV dentro del repositorio.
     
@@ -15,15 +19,16 @@ def guardar_evaluacion(nombre, capitulo, fecha, originalidad, similitud, evaluac
         capitulo: Nombre del capítulo
         fecha: Fecha de entrega
         originalidad: Nivel de originalidad
-        similitud: Puntuación de similitud
+        similitud: Puntuación de similitud (None si no se calculó exacta: se deja vacía)
         evaluacion_ia: Diccionario con la evaluación de IA
         repo_dir: Directorio del repositorio donde guardar el CSV
+        extras: Columnas adicionales {columna: valor} (opcional)
     """
     fila = {
         "Nombre": nombre,
         "Capítulo": capitulo,
         "Originalidad": originalidad,
-        "Similitud": round(similitud, 3),
+        "Similitud": round(similitud, 3) if similitud is not None else None,
         "Nota_Total": evaluacion_ia["nota_total"],
         "Exploracion": evaluacion_ia["exploracion"],
         "Preprocesamiento": evaluacion_ia["preprocesamiento"],
@@ -33,6 +38,8 @@ def guardar_evaluacion(nombre, capitulo, fecha, originalidad, similitud, evaluac
         "Comentario": evaluacion_ia["comentario"],
         "Fecha": fecha
     }
+    if extras:
+        fila.update(extras)
     
     # Guardar en el repositorio para que se suba a GitHub
     csv_path = os.path.join(repo_dir, "evaluaciones", "evaluacion_originalidad.csv")
@@ -40,15 +47,104 @@ def guardar_evaluacion(nombre, capitulo, fecha, originalidad, similitud, evaluac
     # Crear carpeta evaluaciones si no existe
     os.makedirs(os.path.dirname(csv_path), exist_ok=True)
     
+    with _lock_evaluaciones:
+        try:
+            df_eval = pd.read_csv(csv_path)
+            df_eval = pd.concat([df_eval, pd.DataFrame([fila])], ignore_index=True)
+        except:
+            df_eval = pd.DataFrame([fila])
+        
+        df_eval.to_csv(csv_path, index=False, encoding='utf-8')
+    
+    print(f"✅ Evaluación guardada en: {csv_path}")
+
+
+def actualizar_evaluacion(indice, evaluacion_ia, repo_dir, extras=None):
+    """
+    Sustituye la nota de una evaluación ya guardada (p. ej. una provisional pendiente de la IA).
+    
+    Args:
+        indice: Posición de la fila en evaluacion_originalidad.csv
+        evaluacion_ia: Diccionario con la nueva evaluación de IA
+        repo_dir: Directorio del repositorio
+        extras: Columnas adicionales {columna: valor} (opcional)
+    """
+    actualizar_evaluaciones([(indice, evaluacion_ia, extras)], repo_dir)
+
+
+def actualizar_evaluaciones(cambios, repo_dir):
+    """
+    Sustituye la nota de varias evaluaciones con una sola lectura y escritura del CSV.
+    
+    Args:
+        cambios: Lista de (indice, evaluacion_ia, extras o None), como en actualizar_evaluacion()
+        repo_dir: Directorio del repositorio
+    """
+    csv_path = os.path.join(repo_dir, "evaluaciones", "evaluacion_originalidad.csv")
+    
+    with _lock_evaluaciones:
+        df_eval = pd.read_csv(csv_path)
+        for indice, evaluacion_ia, extras in cambios:
+            columnas = {
+                "Nota_Total": evaluacion_ia["nota_total"],
+                "Exploracion": evaluacion_ia["exploracion"],
+                "Preprocesamiento": evaluacion_ia["preprocesamiento"],
+                "Modelos": evaluacion_ia["modelos"],
+                "Evaluacion": evaluacion_ia["evaluacion"],
+                "Documentacion": evaluacion_ia["documentacion"],
+                "Comentario": evaluacion_ia["comentario"],
+            }
+            if extras:
+                columnas.update(extras)
+            for columna, valor in columnas.items():
+                if columna not in df_eval.columns:
+                    df_eval[columna] = None
+                if df_eval[columna].dtype != object:
+                    df_eval[columna] = df_eval[columna].astype(object)
+                df_eval.at[indice, columna] = valor
+        df_eval.to_csv(csv_path, index=False, encoding='utf-8')
+
+
+def cargar_ultima_evaluacion(nombre, capitulo, repo_dir):
+    """
+    Devuelve la última evaluación guardada de un estudiante en un capítulo.
+    
+    Args:
+        nombre: Nombre del estudiante (sin distinguir mayúsculas)
+        capitulo: Nombre del capítulo
+        repo_dir: Directorio del repositorio
+        
+    Returns:
+        dict: Fila del CSV {columna: valor} (sin columnas vacías) o None si no hay ninguna
+    """
+    csv_path = os.path.join(repo_dir, "evaluaciones", "evaluacion_originalidad.csv")
+    
     try:
         df_eval = pd.read_csv(csv_path)
-        df_eval = pd.concat([df_eval, pd.DataFrame([fila])], ignore_index=True)
-    except:
-        df_eval = pd.DataFrame([fila])
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return None
     
-    df_eval.to_csv(csv_path, index=False, encoding='utf-8')
+    df_alumno = df_eval[
+        (df_eval["Capítulo"] == capitulo) & (df_eval["Nombre"].astype(str).str.lower() == nombre.lower())
+    ]
+    if df_alumno.empty:
+        return None
     
-    print(f"✅ Evaluación guardada en: {csv_path}")
+    fila = df_alumno.iloc[-1]
+    return {columna: valor for columna, valor in fila.items() if pd.notna(valor)}
+
+
+def similitud_para_ranking(df):
+    """
+    Similitud con la que se ordena el Hall of Fame.
+    
+    La columna Similitud queda vacía cuando la cascada de originalidad no calculó
+    el ratio exacto; entonces se usa Similitud_Estimada (estimación determinista
+    limitada por la cota superior, ver evaluacion_originalidad.analizar_originalidad).
+    """
+    if "Similitud_Estimada" not in df.columns:
+        return df["Similitud"]
+    return df["Similitud"].fillna(df["Similitud_Estimada"])
 
 
 def generar_hall_of_fame(capitulo, repo_dir):
@@ -76,7 +172,8 @@ def generar_hall_of_fame(capitulo, repo_dir):
         return {}
     
     # Puntuación combinada: originalidad (30%) + nota IA (70%)
-    df_cap["Puntuacion_Combinada"] = (1 - df_cap["Similitud"]) * 0.3 + (df_cap["Nota_Total"] / 10) * 0.7
+    df_cap["Similitud_Ranking"] = similitud_para_ranking(df_cap)
+    df_cap["Puntuacion_Combinada"] = (1 - df_cap["Similitud_Ranking"]) * 0.3 + (df_cap["Nota_Total"] / 10) * 0.7
     
     df_cap = df_cap.sort_values(by="Puntuacion_Combinada", ascending=False)
     
@@ -87,7 +184,7 @@ def generar_hall_of_fame(capitulo, repo_dir):
     
     ganador = df_cap.iloc[0]["Nombre"].lower()
     
-    df_creativo = df_cap[df_cap["Nombre"] != df_cap.iloc[0]["Nombre"]].sort_values(by="Similitud", ascending=True)
+    df_creativo = df_cap[df_cap["Nombre"] != df_cap.iloc[0]["Nombre"]].sort_values(by="Similitud_Ranking", ascending=True)
     creativo = df_creativo.iloc[0]["Nombre"].lower() if len(df_creativo) > 0 else None
     
     df_explicativo = df_cap[~df_cap["Nombre"].isin([df_cap.iloc[0]["Nombre"], creativo])]
@@ -119,11 +216,49 @@ def cargar_registro(repo_dir, registro_path):
     """
     full_path = os.path.join(repo_dir, registro_path)
     if os.path.exists(full_path):
-        return pd.read_csv(full_path, encoding="utf-8")
+        # dtype=str: las columnas vacías no se leen como float y admiten emojis
+        return pd.read_csv(full_path, encoding="utf-8", dtype=str)
     return None
 
 
-def actualizar_registro(df, nombre, columna, repo_dir, registro_path):
+def version_registro(repo_dir, registro_path):
+    """
+    Devuelve un identificador que cambia cada vez que se modifica el registro.
+    
+    Args:
+        repo_dir: Directorio del repositorio
+        registro_path: Ruta relativa del archivo de registro
+        
+    Returns:
+        tuple: (ruta, mtime_ns, tamaño) o None si no existe
+    """
+    full_path = os.path.join(repo_dir, registro_path)
+    try:
+        stat = os.stat(full_path)
+    except FileNotFoundError:
+        return None
+    return (full_path, stat.st_mtime_ns, stat.st_size)
+
+
+def version_evaluaciones(repo_dir):
+    """
+    Devuelve un identificador que cambia cada vez que se guarda una evaluación.
+    
+    Args:
+        repo_dir: Directorio del repositorio
+        
+    Returns:
+        tuple: (ruta, mtime_ns, tamaño) o None si no existe
+    """
+    csv_path = os.path.join(repo_dir, "evaluaciones", "evaluacion_originalidad.csv")
+    try:
+        stat = os.stat(csv_path)
+    except FileNotFoundError:
+        return None
+    return (csv_path, stat.st_mtime_ns, stat.st_size)
+
+
+def actualizar_registro(df, nombre, columna, repo_dir, registro_path, indice=None):
     """
     Actualiza el registro de entregas marcando como entregado.
     
@@ -133,7 +268,13 @@ def actualizar_registro(df, nombre, columna, repo_dir, registro_path):
         columna: Columna del capítulo a actualizar
         repo_dir: Directorio del repositorio
         registro_path: Ruta relativa del archivo de registro
+        indice: IndiceNombres del registro (opcional, evita recorrer la columna)
     """
-    df.loc[df["Nombre"].str.lower() == nombre, columna] = "✅"
+    if indice is not None:
+        posicion = indice.posicion(nombre)
+        if posicion is not None:
+            df.iloc[posicion, df.columns.get_loc(columna)] = "✅"
+    else:
+        df.loc[df["Nombre"].str.lower() == nombre, columna] = "✅"
     full_path = os.path.join(repo_dir, registro_path)
     df.to_csv(full_path, index=False, encoding='utf-8')
@@ -1,5 +1,19 @@
 """Módulo de evaluación"""
-from .evaluacion_ia import evaluar_respuestas_ia
+from .evaluacion_ia import evaluar_respuestas_ia, evaluar_lote
 from .evaluacion_originalidad import evaluar_originalidad
+from .alineacion_celdas import alinear_celdas
+from .corpus_referencia import obtener_corpus
+from .similitud_prosa import analizar_prosa, obtener_indice_prosa
+from .huellas_imagenes import analizar_imagenes, obtener_indice_imagenes
+from .anillos_copia import analizar_copias_capitulo
+from .reentrega import planificar_reentrega, reevaluar_componentes
+from .evaluacion_especulativa import EvaluacionEspeculativa
+from .evaluacion_criterios import evaluar_respuestas_criterios
+from .plantillas_prompt import version_prompt
+from .ejecucion_notebooks import verificar_ejecucion
 
-__all__ = ['evaluar_respuestas_ia', 'evaluar_originalidad']
+__all__ = ['evaluar_respuestas_ia', 'evaluar_lote', 'evaluar_originalidad', 'alinear_celdas', 'obtener_corpus',
+           'analizar_prosa', 'obtener_indice_prosa',
+           'analizar_imagenes', 'obtener_indice_imagenes',
+           'analizar_copias_capitulo', 'planificar_reentrega', 'reevaluar_componentes',
+           'EvaluacionEspeculativa', 'evaluar_respuestas_criterios', 'version_prompt', 'verificar_ejecucion']
@@ -0,0 +1,222 @@
+"""
+Alineación celda a celda entre el notebook del alumno y el oficial
+Indica qué celdas son idénticas, cuáles son modificaciones de una celda oficial
+y cuáles son nuevas, para que el revisor vea de dónde sale el veredicto.
+
+Las celdas idénticas se emparejan en tiempo lineal con un diccionario de
+hashes; las casi idénticas, con una distancia de edición acotada sobre tokens
+calculada solo contra unos pocos candidatos que comparten tokens.
+"""
+import re
+import heapq
+import hashlib
+from collections import Counter, defaultdict
+
+ESTADOS = ("identica", "modificada", "nueva")
+
+# Similitud mínima (1 - distancia / longitud) para considerar una celda modificada
+UMBRAL_MODIFICADA = 0.6
+# Candidatos oficiales que se comparan por distancia de edición con cada celda
+MAX_CANDIDATOS = 3
+# Tokens presentes en más de esta fracción de celdas no sirven para buscar candidatos
+FRACCION_TOKEN_COMUN = 0.5
+
+_PATRON_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def _texto_celda(celda):
+    source = celda.get("source", "")
+    return "".join(source) if isinstance(source, list) else str(source)
+
+
+def normalizar_celda(celda):
+    """
+    Normaliza el contenido de una celda para compararlo.
+
+    En el código se quitan los comentarios de línea completa y las líneas
+    vacías; en el markdown se ignoran mayúsculas. En ambos se colapsan los espacios.
+
+    Args:
+        celda: Celda del notebook (dict)
+
+    Returns:
+        str: Texto normalizado ('' si la celda está vacía)
+    """
+    lineas = []
+    for linea in _texto_celda(celda).splitlines():
+        linea = " ".join(linea.split())
+        if not linea:
+            continue
+        if celda.get("cell_type") == "code":
+            if linea.startswith("#"):
+                continue
+        else:
+            linea = linea.casefold()
+        lineas.append(linea)
+    return "\n".join(lineas)
+
+
+def _preparar(notebook):
+    """Lista de (índice, tipo, hash, tokens, multiconjunto de tokens) de las celdas no vacías."""
+    celdas = []
+    for i, celda in enumerate(notebook.get("cells", [])):
+        texto = normalizar_celda(celda)
+        if not texto:
+            continue
+        tipo = celda.get("cell_type", "code")
+        huella = hashlib.blake2b(f"{tipo}\0{texto}".encode("utf-8"), digest_size=16).digest()
+        tokens = _PATRON_TOKEN.findall(texto)
+        celdas.append((i, tipo, huella, tokens, Counter(tokens)))
+    return celdas
+
+
+def distancia_acotada(a, b, limite):
+    """
+    Distancia de Levenshtein entre dos secuencias si no supera `limite`.
+
+    Solo se recorre la banda diagonal de anchura 2*limite+1, así que el coste
+    es O(len(a) * limite) en vez de O(len(a) * len(b)).
+
+    Args:
+        a, b: Secuencias (listas de tokens o cadenas)
+        limite: Distancia máxima que interesa
+
+    Returns:
+        int: Distancia, o None si es mayor que `limite`
+    """
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) > limite:
+        return None
+    if not a:
+        return len(b)
+
+    infinito = limite + 1
+    n = len(b)
+    anterior = [j if j <= limite else infinito for j in range(n + 1)]
+    for i in range(1, len(a) + 1):
+        desde = max(1, i - limite)
+        hasta = min(n, i + limite)
+        actual = [infinito] * (n + 1)
+        if i <= limite:
+            actual[0] = i
+        minimo_fila = actual[0]
+        x = a[i - 1]
+        izquierda = actual[desde - 1]
+        for j in range(desde, hasta + 1):
+            coste = anterior[j - 1] + (x != b[j - 1])
+            if anterior[j] + 1 < coste:
+                coste = anterior[j] + 1
+            if izquierda + 1 < coste:
+                coste = izquierda + 1
+            actual[j] = izquierda = coste
+            if coste < minimo_fila:
+                minimo_fila = coste
+        if minimo_fila > limite:
+            return None
+        anterior = actual
+
+    return anterior[n] if anterior[n] <= limite else None
+
+
+def _candidatos(multiconjunto, indice_tokens):
+    """Celdas oficiales con más tokens distintivos en común."""
+    comunes = Counter()
+    for token in multiconjunto:
+        posiciones = indice_tokens.get(token)
+        if posiciones:
+            comunes.update(posiciones)
+    return heapq.nlargest(MAX_CANDIDATOS, comunes, key=comunes.__getitem__)
+
+
+def alinear_celdas(contenido_usuario, contenido_oficial):
+    """
+    Empareja cada celda del alumno con la celda oficial de la que procede.
+
+    Args:
+        contenido_usuario: Notebook del estudiante en formato JSON
+        contenido_oficial: Notebook oficial en formato JSON
+
+    Returns:
+        dict: {
+            'celdas': [                 # una entrada por celda no vacía del alumno
+                {'indice': int, 'tipo': str, 'estado': str,
+                 'celda_oficial': int | None, 'similitud': float}
+            ],
+            'resumen': {'identica': int, 'modificada': int, 'nueva': int},
+            'fraccion_copiada': float   # (idénticas + modificadas) / celdas
+        }
+    """
+    celdas_usuario = _preparar(contenido_usuario)
+    celdas_oficiales = _preparar(contenido_oficial)
+
+    # Paso 1: celdas idénticas por hash (se conserva la primera aparición oficial)
+    por_hash = {}
+    for j, (_, _, huella, _, _) in enumerate(celdas_oficiales):
+        por_hash.setdefault(huella, j)
+
+    # Índices invertidos de tokens (uno por tipo de celda) para buscar candidatos a "modificada"
+    indices_tokens = defaultdict(lambda: defaultdict(list))
+    for j, (_, tipo, _, _, multiconjunto) in enumerate(celdas_oficiales):
+        for token in multiconjunto:
+            indices_tokens[tipo][token].append(j)
+    max_apariciones = max(1, int(len(celdas_oficiales) * FRACCION_TOKEN_COMUN))
+    indices_tokens = {
+        tipo: {t: js for t, js in indice.items() if len(js) <= max_apariciones}
+        for tipo, indice in indices_tokens.items()
+    }
+
+    resultado = []
+    # Celdas repetidas en el notebook del alumno: se alinean una sola vez
+    ya_alineadas = {}
+    for indice, tipo, huella, tokens, multiconjunto in celdas_usuario:
+        if huella in ya_alineadas:
+            resultado.append({**ya_alineadas[huella], "indice": indice})
+            continue
+
+        j = por_hash.get(huella)
+        if j is not None:
+            resultado.append({
+                "indice": indice, "tipo": tipo, "estado": "identica",
+                "celda_oficial": celdas_oficiales[j][0], "similitud": 1.0,
+            })
+            ya_alineadas[huella] = resultado[-1]
+            continue
+
+        # Paso 2: casi idénticas por distancia de edición acotada
+        mejor_j, mejor_similitud = None, 0.0
+        for j in _candidatos(multiconjunto, indices_tokens.get(tipo, {})):
+            tokens_oficiales = celdas_oficiales[j][3]
+            longitud = max(len(tokens), len(tokens_oficiales))
+            limite = int(longitud * (1 - max(UMBRAL_MODIFICADA, mejor_similitud)))
+            # Cota inferior barata: los tokens que no comparten hay que editarlos
+            if longitud - sum((multiconjunto & celdas_oficiales[j][4]).values()) > limite:
+                continue
+            distancia = distancia_acotada(tokens, tokens_oficiales, limite)
+            if distancia is None:
+                continue
+            similitud = 1 - distancia / longitud
+            if similitud >= UMBRAL_MODIFICADA and similitud > mejor_similitud:
+                mejor_j, mejor_similitud = j, similitud
+
+        if mejor_j is not None:
+            resultado.append({
+                "indice": indice, "tipo": tipo, "estado": "modificada",
+                "celda_oficial": celdas_oficiales[mejor_j][0], "similitud": round(mejor_similitud, 3),
+            })
+        else:
+            resultado.append({
+                "indice": indice, "tipo": tipo, "estado": "nueva",
+                "celda_oficial": None, "similitud": 0.0,
+            })
+        ya_alineadas[huella] = resultado[-1]
+
+    resumen = Counter(c["estado"] for c in resultado)
+    resumen = {estado: resumen.get(estado, 0) for estado in ESTADOS}
+    total = len(resultado)
+
+    return {
+        "celdas": resultado,
+        "resumen": resumen,
+        "fraccion_copiada": (resumen["identica"] + resumen["modificada"]) / total if total else 0.0,
+    }
@@ -0,0 +1,242 @@
+"""
+Análisis de copias entre alumnos al cerrar un capítulo
+Calcula la similitud de todos los pares de entregas con firmas MinHash
+vectorizadas en numpy y agrupa en "anillos" los alumnos conectados por pares
+por encima del umbral (componentes conexas, union-find).
+
+Los resultados se guardan en evaluaciones/:
+    pares_similares_<carpeta>.csv   pares por encima de UMBRAL_INFORME
+    anillos_copia_<carpeta>.csv     un alumno por fila con su anillo
+
+Uso manual (desde src/):
+    python -m evaluacion.anillos_copia capitulo_02 [repo_dir]
+"""
+import os
+import re
+import sys
+import json
+import logging
+from collections import Counter
+import numpy as np
+import pandas as pd
+from utils.notebook_utils import extraer_contenido_notebook
+from evaluacion.similitud_prosa import firma_minhash
+
+logger = logging.getLogger(__name__)
+
+TOKENS_POR_SHINGLE = 5
+# Jaccard estimado a partir del cual dos entregas se consideran la misma copia
+UMBRAL_ANILLO = 0.6
+# Los pares por encima de este valor se guardan para revisión aunque no formen anillo
+UMBRAL_INFORME = 0.4
+# Shingles presentes en más de esta fracción de entregas se consideran plantilla común
+FRACCION_PLANTILLA = 0.5
+# Con pocas entregas una simple pareja de copias superaría la fracción: no se filtra
+MIN_ENTREGAS_PLANTILLA = 10
+
+_PATRON_TOKEN = re.compile(r"\w+|[^\w\s]")
+_PATRON_ENTREGA = re.compile(r"^(?P<nombre>.+)_(?P<fecha>\d{4}-\d{2}-\d{2})\.ipynb$")
+
+
+def shingles_entrega(notebook):
+    """Shingles de tokens del código y el markdown (sin salidas)."""
+    contenido = extraer_contenido_notebook(notebook)
+    tokens = _PATRON_TOKEN.findall(f"{contenido['codigo']}\n{contenido['markdown']}".casefold())
+    if not tokens:
+        return set()
+    return {
+        " ".join(tokens[i:i + TOKENS_POR_SHINGLE])
+        for i in range(max(1, len(tokens) - TOKENS_POR_SHINGLE + 1))
+    }
+
+
+def ultimas_entregas(carpeta):
+    """
+    Última entrega de cada alumno en una carpeta de soluciones.
+
+    Args:
+        carpeta: Ruta a soluciones_alumnos/<capitulo>
+
+    Returns:
+        dict: {nombre: ruta} (la de fecha más reciente por alumno)
+    """
+    entregas = {}
+    if not os.path.isdir(carpeta):
+        return entregas
+    for fichero in sorted(os.listdir(carpeta)):
+        coincidencia = _PATRON_ENTREGA.match(fichero)
+        if coincidencia:
+            # Orden alfabético = orden de fecha, la última sobrescribe
+            entregas[coincidencia.group("nombre")] = os.path.join(carpeta, fichero)
+    return entregas
+
+
+def matriz_similitud(firmas):
+    """
+    Similitud (Jaccard estimado) de todos los pares de firmas MinHash.
+
+    Args:
+        firmas: Matriz (n, NUM_PERMUTACIONES)
+
+    Returns:
+        np.ndarray: Matriz simétrica (n, n) con 1.0 en la diagonal
+    """
+    n = len(firmas)
+    coincidencias = np.zeros((n, n), dtype=np.int32)
+    # Una columna (permutación) cada vez: memoria O(n²) en lugar de O(n² · permutaciones)
+    for k in range(firmas.shape[1]):
+        columna = firmas[:, k]
+        coincidencias += columna[:, None] == columna[None, :]
+    return coincidencias / firmas.shape[1]
+
+
+def agrupar_anillos(nombres, similitud, umbral=UMBRAL_ANILLO):
+    """
+    Agrupa en anillos los alumnos conectados por pares con similitud >= umbral.
+
+    Args:
+        nombres: Lista de nombres (mismo orden que la matriz)
+        similitud: Matriz (n, n) de matriz_similitud()
+        umbral: Similitud mínima de un par para unir a dos alumnos
+
+    Returns:
+        list: Anillos (listas de nombres ordenadas) de 2 o más alumnos, de mayor a menor
+    """
+    padre = list(range(len(nombres)))
+
+    def raiz(i):
+        while padre[i] != i:
+            padre[i] = padre[padre[i]]
+            i = padre[i]
+        return i
+
+    filas, columnas = np.nonzero(np.triu(similitud >= umbral, k=1))
+    for i, j in zip(filas.tolist(), columnas.tolist()):
+        ri, rj = raiz(i), raiz(j)
+        if ri != rj:
+            padre[rj] = ri
+
+    grupos = {}
+    for i, nombre in enumerate(nombres):
+        grupos.setdefault(raiz(i), []).append(nombre)
+    anillos = [sorted(g) for g in grupos.values() if len(g) > 1]
+    return sorted(anillos, key=lambda g: (-len(g), g))
+
+
+def analizar_copias_capitulo(carpeta, repo_dir, notebook_oficial=None):
+    """
+    Similitud de todos los pares de entregas de un capítulo y anillos de copia.
+
+    Los shingles del notebook oficial y, a partir de MIN_ENTREGAS_PLANTILLA
+    entregas, los que aparecen en más de la mitad de ellas (plantilla común)
+    no cuentan, para no unir a todo el grupo.
+
+    Args:
+        carpeta: Subcarpeta del capítulo en soluciones_alumnos/ (p. ej. 'capitulo_02')
+        repo_dir: Directorio del repositorio
+        notebook_oficial: Notebook oficial (opcional)
+
+    Returns:
+        dict: {
+            'alumnos': int,
+            'pares': [(nombre_a, nombre_b, similitud)],   # >= UMBRAL_INFORME, de mayor a menor
+            'anillos': [[nombres]]
+        }
+    """
+    entregas = ultimas_entregas(os.path.join(repo_dir, "soluciones_alumnos", carpeta))
+    nombres, conjuntos = [], []
+    for nombre, ruta in entregas.items():
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                conjuntos.append(shingles_entrega(json.load(f)))
+            nombres.append(nombre)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer {ruta}: {e}")
+
+    excluidos = shingles_entrega(notebook_oficial) if notebook_oficial else set()
+    if len(conjuntos) >= MIN_ENTREGAS_PLANTILLA:
+        frecuencia = Counter(s for conjunto in conjuntos for s in conjunto)
+        limite = FRACCION_PLANTILLA * len(conjuntos)
+        excluidos |= {s for s, n in frecuencia.items() if n > limite}
+
+    validos, firmas = [], []
+    for nombre, conjunto in zip(nombres, conjuntos):
+        firma = firma_minhash(conjunto - excluidos)
+        if firma is not None:
+            validos.append(nombre)
+            firmas.append(firma)
+
+    if len(firmas) < 2:
+        return {"alumnos": len(nombres), "pares": [], "anillos": []}
+
+    similitud = matriz_similitud(np.vstack(firmas))
+    filas, columnas = np.nonzero(np.triu(similitud >= UMBRAL_INFORME, k=1))
+    pares = sorted(
+        ((validos[i], validos[j], float(similitud[i, j])) for i, j in zip(filas.tolist(), columnas.tolist())),
+        key=lambda par: -par[2],
+    )
+    return {
+        "alumnos": len(nombres),
+        "pares": pares,
+        "anillos": agrupar_anillos(validos, similitud),
+    }
+
+
+def guardar_analisis_copias(resultado, capitulo, carpeta, repo_dir):
+    """
+    Guarda los pares similares y los anillos en evaluaciones/.
+
+    Args:
+        resultado: Resultado de analizar_copias_capitulo()
+        capitulo: Nombre del capítulo
+        carpeta: Subcarpeta del capítulo
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        tuple: (ruta_pares, ruta_anillos)
+    """
+    carpeta_eval = os.path.join(repo_dir, "evaluaciones")
+    os.makedirs(carpeta_eval, exist_ok=True)
+
+    ruta_pares = os.path.join(carpeta_eval, f"pares_similares_{carpeta}.csv")
+    pd.DataFrame(
+        [{"Capítulo": capitulo, "Alumno_A": a, "Alumno_B": b, "Similitud": round(s, 3)}
+         for a, b, s in resultado["pares"]],
+        columns=["Capítulo", "Alumno_A", "Alumno_B", "Similitud"],
+    ).to_csv(ruta_pares, index=False, encoding="utf-8")
+
+    ruta_anillos = os.path.join(carpeta_eval, f"anillos_copia_{carpeta}.csv")
+    filas = []
+    for numero, anillo in enumerate(resultado["anillos"], 1):
+        for nombre in anillo:
+            filas.append({
+                "Capítulo": capitulo,
+                "Anillo": numero,
+                "Nombre": nombre,
+                "Miembros": len(anillo),
+                "Companeros": ", ".join(n for n in anillo if n != nombre),
+            })
+    pd.DataFrame(filas, columns=["Capítulo", "Anillo", "Nombre", "Miembros", "Companeros"]).to_csv(
+        ruta_anillos, index=False, encoding="utf-8"
+    )
+    return ruta_pares, ruta_anillos
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print(__doc__)
+        return 1
+    carpeta = argv[0]
+    repo_dir = argv[1] if len(argv) > 1 else "repo_temp"
+    resultado = analizar_copias_capitulo(carpeta, repo_dir)
+    print(f"{resultado['alumnos']} alumnos, {len(resultado['pares'])} pares >= {UMBRAL_INFORME}")
+    for a, b, s in resultado["pares"][:20]:
+        print(f"  {s:.2f}  {a} - {b}")
+    for numero, anillo in enumerate(resultado["anillos"], 1):
+        print(f"Anillo {numero}: {', '.join(anillo)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,9 @@ import os
 import pandas as pd
 from datetime import datetime
 import pytz
+from data.data_manager import similitud_para_ranking
+from evaluacion.anillos_copia import analizar_copias_capitulo, guardar_analisis_copias
+from evaluacion.triaje import peticiones_ahorradas
 
 
 def generar_hall_of_fame_final(capitulo, repo_dir):
@@ -41,7 +44,7 @@ def generar_hall_of_fame_final(capitulo, repo_dir):
     
     # Calcula puntuación combinada para "mejor trabajo"
     df_validos["Puntuacion_Combinada"] = (
-        (1 - df_validos["Similitud"]) * 0.3 + 
+        (1 - similitud_para_ranking(df_validos)) * 0.3 + 
         (df_validos["Nota_Total"] / 10) * 0.7
     )
     
@@ -136,7 +139,32 @@ def asignar_emojis_ganadores(capitulo, columna, repo_dir, registro_path):
     return cambios, hall
 
 
-def cerrar_capitulo_simple(capitulo, columna, repo_dir, registro_path, fecha_limite):
+def analizar_copias_cierre(capitulo, carpeta, repo_dir, notebook_oficial=None):
+    """
+    Compara todas las entregas del capítulo entre sí y guarda los anillos de copia.
+    
+    Args:
+        capitulo: Nombre del capítulo
+        carpeta: Subcarpeta del capítulo en soluciones_alumnos/
+        repo_dir: Directorio del repositorio
+        notebook_oficial: Notebook oficial (su contenido no cuenta como copia)
+        
+    Returns:
+        dict: Resultado de analizar_copias_capitulo()
+    """
+    print("🕸️ Comparando todas las entregas entre sí...")
+    resultado = analizar_copias_capitulo(carpeta, repo_dir, notebook_oficial)
+    ruta_pares, ruta_anillos = guardar_analisis_copias(resultado, capitulo, carpeta, repo_dir)
+    
+    print(f"   {resultado['alumnos']} entregas, {len(resultado['pares'])} pares similares")
+    for numero, anillo in enumerate(resultado["anillos"], 1):
+        print(f"   ⚠️  Anillo {numero}: {', '.join(anillo)}")
+    print(f"   Resultados en {ruta_pares} y {ruta_anillos}\n")
+    return resultado
+
+
+def cerrar_capitulo_simple(capitulo, columna, repo_dir, registro_path, fecha_limite,
+                           carpeta=None, notebook_oficial=None):
     """
     Cierra el capítulo y asigna emojis especiales solo a los ganadores.
     Se adapta al número de entregas disponibles.
@@ -147,6 +175,8 @@ def cerrar_capitulo_simple(capitulo, columna, repo_dir, registro_path, fecha_lim
         repo_dir: Directorio del repositorio
         registro_path: Ruta al registro
         fecha_limite: Fecha límite del capítulo
+        carpeta: Subcarpeta del capítulo; si se indica, se buscan anillos de copia
+        notebook_oficial: Notebook oficial para el análisis de copias (opcional)
         
     Returns:
         dict: Resumen de la operación
@@ -165,6 +195,17 @@ def cerrar_capitulo_simple(capitulo, columna, repo_dir, registro_path, fecha_lim
             "puede_cerrar": False
         }
     
+    # Análisis de copias entre alumnos (antes del Hall of Fame, se guarda aunque no haya ganadores)
+    anillos = []
+    if carpeta:
+        anillos = analizar_copias_cierre(capitulo, carpeta, repo_dir, notebook_oficial)["anillos"]
+    
+    # Evaluaciones resueltas por el triaje estático sin petición a la IA
+    ahorro = peticiones_ahorradas(repo_dir)
+    ahorro = ahorro[ahorro["Capítulo"] == capitulo]
+    sin_ia = int(ahorro["Sin_IA"].sum())
+    print(f"⚡ {sin_ia} de {int(ahorro['Evaluaciones'].sum())} evaluaciones sin petición a la IA (triaje estático)\n")
+    
     # Asigna emojis a ganadores
     print("🏆 Asignando emojis a los ganadores del Hall of Fame...")
     cambios, hall = asignar_emojis_ganadores(capitulo, columna, repo_dir, registro_path)
@@ -174,7 +215,9 @@ def cerrar_capitulo_simple(capitulo, columna, repo_dir, registro_path, fecha_lim
         print("   (Todas las entregas son copias o no hay entregas)")
         return {
             "exito": False,
-            "error": "No hay entregas válidas para premiar"
+            "error": "No hay entregas válidas para premiar",
+            "anillos": anillos,
+            "sin_ia": sin_ia
         }
     else:
         print(f"   ✅ Se asignaron {cambios} emoji(s) especial(es)\n")
@@ -208,15 +251,20 @@ def cerrar_capitulo_simple(capitulo, columna, repo_dir, registro_path, fecha_lim
         "exito": True,
         "cambios": cambios,
         "hall_of_fame": hall,
+        "anillos": anillos,
+        "sin_ia": sin_ia,
         "fecha_cierre": ahora.strftime("%Y-%m-%d %H:%M:%S")
     }
 
-def verificar_cierre_automatico(capitulo, columna, repo_dir, registro_path, fecha_limite):
+def verificar_cierre_automatico(capitulo, columna, repo_dir, registro_path, fecha_limite,
+                                carpeta=None, cargar_notebook_oficial=None):
     """
     Verifica si debe cerrarse automáticamente el capítulo.
     
     Args:
-        (mismos que cerrar_capitulo_simple)
+        (mismos que cerrar_capitulo_simple, salvo notebook_oficial)
+        cargar_notebook_oficial: Función sin argumentos que devuelve el notebook
+            oficial; solo se llama si de verdad se cierra el capítulo (opcional)
         
     Returns:
         bool: True si se cerró automáticamente
@@ -274,7 +322,10 @@ def verificar_cierre_automatico(capitulo, columna, repo_dir, registro_path, fech
 
     # Cierra automáticamente
     print("✅ PLAZO VENCIDO - Cerrando capítulo automáticamente...")
-    resultado = cerrar_capitulo_simple(capitulo, columna, repo_dir, registro_path, fecha_limite)
+    notebook_oficial = cargar_notebook_oficial() if cargar_notebook_oficial else None
+    resultado = cerrar_capitulo_simple(
+        capitulo, columna, repo_dir, registro_path, fecha_limite, carpeta, notebook_oficial
+    )
 
     return resultado.get("exito", False)
 
@@ -0,0 +1,214 @@
+"""
+Corpus de referencia para la originalidad
+Indexa todos los notebooks oficiales de soluciones_oficiales/ (los de cada
+capítulo de handson-ml3) y las entregas archivadas de cohortes anteriores en
+cohortes_anteriores/, con un índice invertido de huellas (winnowing).
+
+Una sola consulta al índice devuelve la fuente más parecida a una entrega, en
+lugar de comparar la entrega documento a documento.
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import Counter, defaultdict
+from utils.notebook_utils import extraer_contenido_notebook, CARPETA_SOLUCIONES_OFICIALES
+
+logger = logging.getLogger(__name__)
+
+# Carpetas del corpus (relativas al repositorio) y el tipo de fuente de cada una
+CARPETAS_CORPUS = {
+    "oficial": CARPETA_SOLUCIONES_OFICIALES,
+    "cohorte": "cohortes_anteriores",
+}
+
+# Huellas: k-gramas de tokens, winnowing con ventanas de W hashes
+TOKENS_POR_KGRAMA = 6
+VENTANA_WINNOWING = 4
+
+_PATRON_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+_lock = threading.Lock()
+_cache_corpus = {}
+
+
+def _hash_kgrama(kgrama):
+    return int.from_bytes(hashlib.blake2b(kgrama.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def huellas_notebook(notebook):
+    """
+    Calcula las huellas (winnowing) del código y el markdown de un notebook.
+
+    Las salidas de las celdas no se tienen en cuenta.
+
+    Args:
+        notebook: Notebook en formato JSON
+
+    Returns:
+        set: Conjunto de huellas (enteros de 64 bits)
+    """
+    contenido = extraer_contenido_notebook(notebook)
+    tokens = _PATRON_TOKEN.findall(f"{contenido['codigo']}\n{contenido['markdown']}".casefold())
+    if len(tokens) < TOKENS_POR_KGRAMA:
+        return {_hash_kgrama(" ".join(tokens))} if tokens else set()
+
+    hashes = [
+        _hash_kgrama(" ".join(tokens[i:i + TOKENS_POR_KGRAMA]))
+        for i in range(len(tokens) - TOKENS_POR_KGRAMA + 1)
+    ]
+    if len(hashes) <= VENTANA_WINNOWING:
+        return {min(hashes)}
+    return {
+        min(hashes[i:i + VENTANA_WINNOWING])
+        for i in range(len(hashes) - VENTANA_WINNOWING + 1)
+    }
+
+
+class CorpusReferencia:
+    """
+    Índice invertido huella -> documentos del corpus.
+
+    Atributos:
+        documentos: Lista de {'nombre', 'tipo', 'huellas'} (huellas = nº de huellas)
+    """
+
+    def __init__(self):
+        self.documentos = []
+        self._indice = defaultdict(list)
+
+    def __len__(self):
+        return len(self.documentos)
+
+    def agregar(self, nombre, tipo, notebook):
+        """
+        Añade un notebook al corpus.
+
+        Args:
+            nombre: Identificador del documento (ruta relativa)
+            tipo: 'oficial' o 'cohorte'
+            notebook: Notebook en formato JSON
+        """
+        huellas = huellas_notebook(notebook)
+        posicion = len(self.documentos)
+        self.documentos.append({"nombre": nombre, "tipo": tipo, "huellas": len(huellas)})
+        for huella in huellas:
+            self._indice[huella].append(posicion)
+
+    def consultar(self, notebook, huellas=None):
+        """
+        Busca la fuente del corpus que más huellas comparte con un notebook.
+
+        Args:
+            notebook: Notebook en formato JSON
+            huellas: Huellas ya calculadas del notebook (opcional)
+
+        Returns:
+            dict: {'documento': str, 'tipo': str, 'similitud': float, 'huellas_comunes': int}
+                  o None si el corpus está vacío o no comparte ninguna huella.
+                  'similitud' es la fracción de huellas de la entrega presentes en la fuente.
+        """
+        if huellas is None:
+            huellas = huellas_notebook(notebook)
+        if not huellas or not self.documentos:
+            return None
+
+        comunes = Counter()
+        for huella in huellas:
+            posiciones = self._indice.get(huella)
+            if posiciones:
+                comunes.update(posiciones)
+        if not comunes:
+            return None
+
+        # A igualdad de huellas comunes, gana la solución oficial
+        mejor = max(comunes, key=lambda p: (comunes[p], self.documentos[p]["tipo"] == "oficial", -p))
+        documento = self.documentos[mejor]
+        return {
+            "documento": documento["nombre"],
+            "tipo": documento["tipo"],
+            "similitud": comunes[mejor] / len(huellas),
+            "huellas_comunes": comunes[mejor],
+        }
+
+
+def _ficheros_corpus(repo_dir):
+    """Lista de (ruta, tipo) de los notebooks del corpus, en orden estable."""
+    ficheros = []
+    for tipo, carpeta in CARPETAS_CORPUS.items():
+        raiz = os.path.join(repo_dir, carpeta)
+        for directorio, subdirectorios, nombres in os.walk(raiz):
+            subdirectorios.sort()
+            for nombre in sorted(nombres):
+                if nombre.endswith(".ipynb") and not nombre.startswith("."):
+                    ficheros.append((os.path.join(directorio, nombre), tipo))
+    return ficheros
+
+
+def version_corpus(repo_dir):
+    """
+    Versión del corpus: cambia si se añade, borra o modifica algún notebook.
+
+    Args:
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        tuple: ((ruta, mtime_ns, tamaño), ...)
+    """
+    version = []
+    for ruta, _ in _ficheros_corpus(repo_dir):
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue
+        version.append((ruta, estado.st_mtime_ns, estado.st_size))
+    return tuple(version)
+
+
+def cargar_corpus(repo_dir):
+    """
+    Construye el corpus de referencia a partir de las carpetas del repositorio.
+
+    Los notebooks que no se pueden leer se omiten (con un aviso en el log).
+
+    Args:
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        CorpusReferencia: Corpus indexado
+    """
+    corpus = CorpusReferencia()
+    for ruta, tipo in _ficheros_corpus(repo_dir):
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                notebook = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo indexar {ruta}: {e}")
+            continue
+        corpus.agregar(os.path.relpath(ruta, repo_dir), tipo, notebook)
+    return corpus
+
+
+def obtener_corpus(repo_dir):
+    """
+    Devuelve el corpus de referencia, reconstruyéndolo solo si ha cambiado.
+
+    Args:
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        CorpusReferencia: Corpus indexado (compartido entre sesiones)
+    """
+    version = version_corpus(repo_dir)
+    with _lock:
+        guardado = _cache_corpus.get(repo_dir)
+        if guardado and guardado[0] == version:
+            return guardado[1]
+
+    corpus = cargar_corpus(repo_dir)
+    with _lock:
+        _cache_corpus[repo_dir] = (version, corpus)
+    return corpus
+
@@ -0,0 +1,431 @@
+"""
+Verificación de los notebooks ejecutándolos de nuevo
+analizar_completitud_notebook se fía de los execution_count y de las salidas
+de error que trae el JSON del alumno, que se editan a mano sin esfuerzo. Esta
+etapa opcional (EJECUCION_NOTEBOOKS) vuelve a ejecutar las celdas de código en
+un proceso aislado (evaluacion/ejecutor_aislado.py) con límites de CPU,
+memoria y tiempo, sin red y con el CSV de California housing ya preparado, y
+devuelve si el notebook se ejecuta de verdad y cuánto tarda cada celda.
+
+Los procesos se lanzan desde el bucle asíncrono compartido, hasta
+PROCESOS_EJECUCION a la vez (uno por núcleo); cada uno usa un solo hilo de
+BLAS y joblib sin multiproceso. Los resultados se guardan por huella de las
+celdas de código, así que un notebook idéntico no se vuelve a ejecutar.
+
+El proceso solo ve su directorio temporal (con una copia de los datos y del
+ejecutor) y la instalación de Python: los ganchos de auditoría del ejecutor
+bloquean la red, los procesos nuevos y cualquier fichero de fuera, y los
+errores solo se devuelven por su tipo. Los ganchos no son una barrera de
+seguridad (ctypes o una extensión en C los saltan), así que además hacen falta
+espacios de nombres sin privilegios (unshare -rnm): se corta la red en el
+núcleo y se monta un tmpfs vacío sobre el directorio de la aplicación, y ni
+repo_temp (con el token de git) ni las evaluaciones son accesibles. Sin ellos
+no se ejecuta nada (la ejecución queda "no_verificada"), salvo que se active
+a propósito EJECUCION_SIN_AISLAMIENTO=1 en un entorno sin secretos.
+
+Uso manual (desde src/), notebooks o carpetas con notebooks:
+    python -m evaluacion.ejecucion_notebooks ruta [ruta ...]
+"""
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import signal
+import asyncio
+import hashlib
+import logging
+import tempfile
+import threading
+import subprocess
+from core.asincrono import ejecutar, limitador
+
+logger = logging.getLogger(__name__)
+
+# Directorio con housing.csv (y, si se quiere, la caché de sklearn para fetch_california_housing)
+DIRECTORIO_DATOS = os.environ.get("DATOS_EJECUCION_PATH", "datos_ejecucion")
+FICHERO_HOUSING = "housing.csv"
+# Donde lo buscan los notebooks: junto al notebook y con la estructura del libro (datasets/housing/)
+RUTAS_HOUSING = (FICHERO_HOUSING, os.path.join("datasets", "housing", FICHERO_HOUSING))
+# Resultados por huella de las celdas (fuera de repo_temp)
+DIRECTORIO_CACHE_EJECUCION = os.environ.get("EJECUCION_CACHE_PATH", "cache_ejecucion")
+
+# Límites por notebook
+TIEMPO_MAXIMO_S = 300
+CPU_MAXIMA_S = 300
+MEMORIA_MAXIMA_MB = 2048
+FICHERO_MAXIMO_MB = 100
+PROCESOS_EJECUCION = os.cpu_count() or 1
+# Permite ejecutar sin unshare -rnm, solo con los ganchos del ejecutor (que se pueden saltar):
+# únicamente para entornos sin token de git ni datos de alumnos (desarrollo, benchmarks)
+EJECUCION_SIN_AISLAMIENTO = os.environ.get("EJECUCION_SIN_AISLAMIENTO", "0") != "0"
+
+# Subir al cambiar el ejecutor o los límites: invalida la caché
+VERSION_EJECUCION = 2
+MAX_RESULTADOS_MEMORIA = 512
+
+RUTA_EJECUTOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ejecutor_aislado.py")
+# Raíz del proyecto (por encima de src/): se oculta al proceso junto con el directorio actual
+RAIZ_APLICACION = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Dentro del directorio de trabajo del proceso
+CARPETA_DATOS = "datos"
+FICHERO_EJECUTOR = ".ejecutor_aislado.py"
+# Lo que llega del proceso es controlable por el alumno: solo se aceptan nombres (tipo de error, módulo)
+_NOMBRE = re.compile(r"[A-Za-z_][A-Za-z0-9_]{0,39}")
+# El proceso monta un tmpfs sobre cada directorio antes de -- y ejecuta el resto (125 si no puede)
+_SCRIPT_OCULTAR = 'while [ "$1" != -- ]; do mount -t tmpfs none "$1" || exit 125; shift; done; shift; exec "$@"'
+
+# Motivos por los que el proceso no llega al final
+TIMEOUT = "timeout"
+CPU = "cpu"
+PROCESO = "proceso"
+
+_lock = threading.Lock()
+_resultados = {}
+_estado = {"prefijo": None, "comprobado": False, "aviso_datos": False}
+
+
+def celdas_codigo(notebook):
+    """Fuente de las celdas de código, en orden (las vacías también: los índices coinciden con total_celdas)."""
+    return [
+        "".join(celda.get("source", []))
+        for celda in notebook.get("cells", [])
+        if celda.get("cell_type") == "code"
+    ]
+
+
+def huella_celdas(celdas):
+    """Huella de las celdas de código y de los límites con que se ejecutan."""
+    material = [VERSION_EJECUCION, TIEMPO_MAXIMO_S, CPU_MAXIMA_S, MEMORIA_MAXIMA_MB, FICHERO_MAXIMO_MB, celdas]
+    return hashlib.sha256(json.dumps(material, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def datos_preparados():
+    """True si housing.csv está en DIRECTORIO_DATOS (sin él la verificación no se hace)."""
+    return os.path.isfile(os.path.join(DIRECTORIO_DATOS, FICHERO_HOUSING))
+
+
+def _directorios_ocultos():
+    """Directorios de la aplicación que se tapan (sin los que contienen a Python o al directorio temporal)."""
+    necesarios = [os.path.realpath(ruta) for ruta in (sys.executable, sys.prefix, sys.base_prefix, tempfile.gettempdir())]
+    candidatos = sorted({os.path.realpath(RAIZ_APLICACION), os.path.realpath(os.getcwd())})
+    ocultos = []
+    for directorio in candidatos:
+        if any(ruta == directorio or ruta.startswith(directorio + os.sep) for ruta in necesarios):
+            logger.info(f"No se oculta {directorio} al ejecutar notebooks: contiene Python o el directorio temporal")
+        elif not any(directorio.startswith(oculto + os.sep) for oculto in ocultos):
+            ocultos.append(directorio)
+    return ocultos
+
+
+def _prefijo_aislamiento():
+    """
+    Prefijo de la orden del proceso según lo que permita el sistema (se comprueba una vez).
+
+    Con unshare -rnm: red y montajes propios, con la aplicación tapada por un tmpfs.
+    Si no está disponible devuelve None (no se ejecuta), salvo con
+    EJECUCION_SIN_AISLAMIENTO: entonces unshare -rn (solo la red) o [] (solo los ganchos).
+    """
+    with _lock:
+        if not _estado["comprobado"]:
+            prefijo = []
+            if sys.platform.startswith("linux") and shutil.which("unshare"):
+                ocultos = _directorios_ocultos()
+                with tempfile.TemporaryDirectory() as prueba:
+                    opciones = [
+                        (["unshare", "-rnm", "sh", "-c", _SCRIPT_OCULTAR, "sh", *ocultos, "--"],
+                         ["unshare", "-rnm", "sh", "-c", _SCRIPT_OCULTAR, "sh", prueba, "--", "true"]),
+                        (["unshare", "-rn"], ["unshare", "-rn", "true"]),
+                    ]
+                    for opcion, comprobacion in opciones:
+                        try:
+                            if subprocess.run(comprobacion, capture_output=True, timeout=5).returncode == 0:
+                                prefijo = opcion
+                                break
+                        except (OSError, subprocess.SubprocessError):
+                            continue
+            if "-rnm" not in prefijo:
+                if EJECUCION_SIN_AISLAMIENTO:
+                    logger.warning("Sin espacios de nombres para ejecutar notebooks (EJECUCION_SIN_AISLAMIENTO): "
+                                   "el aislamiento depende solo de los ganchos de auditoría del ejecutor")
+                else:
+                    logger.warning("Sin espacios de nombres (unshare -rnm) no se ejecutan los notebooks: "
+                                   "la ejecución queda sin verificar")
+                    prefijo = None
+            _estado["prefijo"], _estado["comprobado"] = prefijo, True
+        return _estado["prefijo"]
+
+
+def _entorno(directorio):
+    """Entorno mínimo del proceso: sin claves de la API, sin proxies y un hilo por proceso."""
+    return {
+        "PATH": os.environ.get("PATH", ""),
+        "HOME": directorio,
+        "TMPDIR": directorio,
+        "MPLCONFIGDIR": directorio,
+        "LANG": "C.UTF-8",
+        "MPLBACKEND": "Agg",
+        "OMP_NUM_THREADS": "1",
+        "OPENBLAS_NUM_THREADS": "1",
+        "MKL_NUM_THREADS": "1",
+        "JOBLIB_MULTIPROCESSING": "0",
+        "SCIKIT_LEARN_DATA": os.path.join(directorio, CARPETA_DATOS),
+        "PYTHONHASHSEED": "0",
+    }
+
+
+def _preparar_directorio(directorio):
+    """
+    Copia al directorio de trabajo el ejecutor, los datos y housing.csv donde lo buscan los notebooks.
+
+    Todo se copia en cada ejecución: el alumno puede sobrescribirlo y el
+    proceso no tiene acceso a DIRECTORIO_DATOS ni al código de la aplicación.
+    """
+    shutil.copyfile(RUTA_EJECUTOR, os.path.join(directorio, FICHERO_EJECUTOR))
+    shutil.copytree(DIRECTORIO_DATOS, os.path.join(directorio, CARPETA_DATOS))
+    origen = os.path.join(DIRECTORIO_DATOS, FICHERO_HOUSING)
+    for ruta in RUTAS_HOUSING:
+        destino = os.path.join(directorio, ruta)
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        shutil.copyfile(origen, destino)
+
+
+def _terminar(proceso):
+    """Mata el grupo de procesos del ejecutor si sigue vivo."""
+    if proceso.returncode is None:
+        try:
+            os.killpg(proceso.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError, AttributeError):
+            try:
+                proceso.kill()
+            except ProcessLookupError:
+                pass
+
+
+def _nombre(valor, otro=None):
+    """El valor si es un nombre corto (tipo de error, módulo); si no, otro."""
+    return valor if isinstance(valor, str) and _NOMBRE.fullmatch(valor) else otro
+
+
+async def _ejecutar_en_proceso(celdas, prefijo):
+    """Ejecuta las celdas en un proceso aislado y recoge una línea por celda."""
+    peticion = json.dumps({
+        "celdas": celdas,
+        "datos": CARPETA_DATOS,
+        "limites": {"cpu_s": CPU_MAXIMA_S, "memoria_mb": MEMORIA_MAXIMA_MB, "fichero_mb": FICHERO_MAXIMO_MB},
+    }, ensure_ascii=False).encode("utf-8")
+    registros, terminado, motivo = [], False, None
+    inicio = time.perf_counter()
+
+    with tempfile.TemporaryDirectory(prefix="ejecucion_") as directorio:
+        _preparar_directorio(directorio)
+        proceso = await asyncio.create_subprocess_exec(
+            *prefijo, sys.executable, "-I", os.path.join(directorio, FICHERO_EJECUTOR),
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            cwd=directorio, env=_entorno(directorio), start_new_session=True,
+        )
+
+        async def leer():
+            nonlocal terminado
+            try:
+                proceso.stdin.write(peticion)
+                await proceso.stdin.drain()
+                proceso.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            async for linea in proceso.stdout:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue
+                if not isinstance(registro, dict):
+                    continue
+                if registro.get("fin"):
+                    terminado = True
+                elif registro.get("celda") == len(registros) < len(celdas):
+                    registros.append({
+                        "celda": registro["celda"],
+                        "segundos": registro.get("segundos") if isinstance(registro.get("segundos"), (int, float)) else None,
+                        "error": _nombre(registro.get("error"), "Error") if registro.get("error") else None,
+                        "modulo": _nombre(registro.get("modulo")),
+                    })
+            await proceso.wait()
+
+        try:
+            await asyncio.wait_for(leer(), TIEMPO_MAXIMO_S)
+        except asyncio.TimeoutError:
+            motivo = TIMEOUT
+        finally:
+            _terminar(proceso)
+            await proceso.wait()
+
+    if not terminado and motivo is None:
+        motivo = CPU if proceso.returncode == -getattr(signal, "SIGXCPU", 0) else PROCESO
+    return _resultado(celdas, registros, motivo, time.perf_counter() - inicio)
+
+
+def _resultado(celdas, registros, motivo, segundos):
+    errores = [r for r in registros if r.get("error")]
+    if motivo and len(registros) < len(celdas):
+        # La celda en curso cuando se cortó el proceso
+        errores.append({"celda": len(registros), "segundos": None, "error": motivo})
+    return {
+        "version": VERSION_EJECUCION,
+        "ok": motivo is None and not errores,
+        "motivo": motivo,
+        "total_celdas": len(celdas),
+        "celdas_ok": sum(1 for r in registros if not r.get("error")),
+        "celdas": [{"celda": r["celda"], "segundos": r.get("segundos"), "error": r.get("error")} for r in registros],
+        "primer_error": {"celda": errores[0]["celda"], "error": errores[0]["error"]} if errores else None,
+        "modulos_ausentes": sorted({r["modulo"] for r in registros if r.get("modulo")}),
+        "segundos": round(segundos, 3),
+    }
+
+
+def _ruta_cache(huella):
+    return os.path.join(DIRECTORIO_CACHE_EJECUCION, f"{huella}.json")
+
+
+def _leer_cache(huella):
+    with _lock:
+        if huella in _resultados:
+            return _resultados[huella]
+    try:
+        with open(_ruta_cache(huella), encoding="utf-8") as f:
+            resultado = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo leer la ejecución guardada {huella[:10]}: {e}")
+        return None
+    with _lock:
+        _guardar_en_memoria(huella, resultado)
+    return resultado
+
+
+def _guardar_en_memoria(huella, resultado):
+    if len(_resultados) >= MAX_RESULTADOS_MEMORIA:
+        _resultados.pop(next(iter(_resultados)))
+    _resultados[huella] = resultado
+
+
+def _guardar_cache(huella, resultado):
+    with _lock:
+        _guardar_en_memoria(huella, resultado)
+    try:
+        os.makedirs(DIRECTORIO_CACHE_EJECUCION, exist_ok=True)
+        temporal = f"{_ruta_cache(huella)}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False)
+        os.replace(temporal, _ruta_cache(huella))
+    except OSError as e:
+        logger.warning(f"No se pudo guardar la ejecución {huella[:10]}: {e}")
+
+
+async def verificar_ejecucion_async(notebook, usar_cache=True):
+    """
+    Ejecuta un notebook en un proceso aislado (o devuelve la ejecución guardada).
+
+    Args:
+        notebook: Notebook en formato JSON
+        usar_cache: False para ejecutarlo aunque ya haya un resultado con la misma huella
+
+    Returns:
+        dict: {
+            'huella', 'ok': sin errores y hasta el final, 'motivo': None, 'timeout', 'cpu' o 'proceso',
+            'total_celdas', 'celdas_ok', 'celdas': [{'celda', 'segundos', 'error'}],
+            'primer_error': {'celda', 'error'} o None, 'modulos_ausentes': [módulos no instalados],
+            'segundos', 'cache': True si no se ha ejecutado ahora
+        }
+        o None si no está preparado housing.csv o no se puede aislar el proceso (ver _prefijo_aislamiento)
+    """
+    if not datos_preparados():
+        with _lock:
+            avisar, _estado["aviso_datos"] = not _estado["aviso_datos"], True
+        if avisar:
+            logger.warning(f"Falta {os.path.join(DIRECTORIO_DATOS, FICHERO_HOUSING)}: no se verifica la ejecución")
+        return None
+
+    celdas = celdas_codigo(notebook)
+    huella = huella_celdas(celdas)
+    if usar_cache:
+        resultado = _leer_cache(huella)
+        if resultado is not None:
+            return {**resultado, "cache": True}
+
+    prefijo = _prefijo_aislamiento()
+    if prefijo is None:
+        return None
+    async with limitador("ejecucion", PROCESOS_EJECUCION):
+        resultado = {"huella": huella, **await _ejecutar_en_proceso(celdas, prefijo)}
+    # Un fallo del propio proceso (no del código del alumno) se vuelve a intentar la próxima vez
+    if resultado["motivo"] != PROCESO:
+        _guardar_cache(huella, resultado)
+    return {**resultado, "cache": False}
+
+
+async def verificar_ejecuciones_async(notebooks, usar_cache=True):
+    """Verifica varios notebooks en paralelo (hasta PROCESOS_EJECUCION procesos a la vez), en orden."""
+    return await asyncio.gather(*(verificar_ejecucion_async(notebook, usar_cache) for notebook in notebooks))
+
+
+def verificar_ejecucion(notebook, usar_cache=True):
+    """Fachada síncrona de verificar_ejecucion_async()."""
+    return ejecutar(verificar_ejecucion_async(notebook, usar_cache))
+
+
+def verificar_ejecuciones(notebooks, usar_cache=True):
+    """Fachada síncrona de verificar_ejecuciones_async()."""
+    return ejecutar(verificar_ejecuciones_async(notebooks, usar_cache))
+
+
+def resumen_ejecucion(resultado):
+    """Texto corto de una ejecución (p. ej. para la columna Ejecucion)."""
+    if resultado is None:
+        return "no_verificada"
+    if resultado["ok"]:
+        return "ok"
+    if resultado["motivo"]:
+        return resultado["motivo"]
+    return f"errores ({resultado['total_celdas'] - resultado['celdas_ok']} celdas)"
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("Uso: python -m evaluacion.ejecucion_notebooks ruta [ruta ...]")
+        return 2
+    rutas = []
+    for ruta in argv:
+        if os.path.isdir(ruta):
+            rutas += sorted(os.path.join(ruta, f) for f in os.listdir(ruta) if f.endswith(".ipynb"))
+        else:
+            rutas.append(ruta)
+    if not datos_preparados():
+        print(f"Falta {os.path.join(DIRECTORIO_DATOS, FICHERO_HOUSING)} (DATOS_EJECUCION_PATH)")
+        return 1
+    if _prefijo_aislamiento() is None:
+        print("Sin unshare -rnm no se ejecutan notebooks (EJECUCION_SIN_AISLAMIENTO=1 para forzarlo sin secretos)")
+        return 1
+
+    notebooks = []
+    for ruta in rutas:
+        with open(ruta, encoding="utf-8") as f:
+            notebooks.append(json.load(f))
+    inicio = time.perf_counter()
+    resultados = verificar_ejecuciones(notebooks)
+    for ruta, resultado in zip(rutas, resultados):
+        print(f"{os.path.basename(ruta)}: {resumen_ejecucion(resultado)}, "
+              f"{resultado['celdas_ok']}/{resultado['total_celdas']} celdas en {resultado['segundos']} s"
+              f"{' (guardada)' if resultado['cache'] else ''}")
+        if resultado["primer_error"]:
+            print(f"    celda {resultado['primer_error']['celda']}: {resultado['primer_error']['error']}")
+        if resultado["modulos_ausentes"]:
+            print(f"    módulos no instalados: {', '.join(resultado['modulos_ausentes'])}")
+    print(f"\n{len(rutas)} notebooks en {time.perf_counter() - inicio:.1f} s ({PROCESOS_EJECUCION} procesos)")
+    return 0 if all(resultado["ok"] for resultado in resultados) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
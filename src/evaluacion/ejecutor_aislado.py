@@ -0,0 +1,177 @@
+"""
+Proceso hijo de la verificación de notebooks (ver evaluacion.ejecucion_notebooks)
+Se lanza como script con `python -I` en un directorio temporal: lee de la
+entrada estándar las celdas de código y los límites, se aplica los límites de
+CPU, memoria y tamaño de fichero, bloquea la red y la creación de procesos, y
+ejecuta las celdas en un único espacio de nombres (como un kernel). Por cada
+celda escribe una línea JSON con su tiempo y el tipo de su error en el
+descriptor original de la salida estándar; lo que imprime el alumno se descarta.
+
+Sistema de ficheros: solo se escribe dentro del directorio de trabajo y solo
+se lee de él y de la instalación de Python (biblioteca estándar, paquetes,
+datos del sistema). Se comprueba con ganchos de auditoría sobre la ruta real,
+así que un enlace simbólico no sirve para salir.
+
+Solo usa la biblioteca estándar: no importa nada del proyecto.
+"""
+import os
+import re
+import sys
+import json
+import time
+
+# Eventos de auditoría bloqueados: red y procesos nuevos
+_EVENTOS_RED = ("socket.connect", "socket.bind", "socket.sendto", "socket.getaddrinfo", "socket.gethostbyname")
+_EVENTOS_PROCESOS = ("subprocess.Popen", "os.system", "os.exec", "os.posix_spawn", "os.spawn", "os.fork", "pty.spawn")
+# Eventos con rutas: posición de los argumentos que son rutas
+_EVENTOS_LECTURA = {"os.listdir": (0,), "os.scandir": (0,)}
+_EVENTOS_ESCRITURA = {
+    "os.chdir": (0,), "os.mkdir": (0,), "os.rmdir": (0,), "os.remove": (0,), "os.rename": (0, 1),
+    "os.link": (0, 1), "os.symlink": (1,), "os.truncate": (0,), "os.chmod": (0,), "os.chown": (0,),
+    "os.utime": (0,), "os.chflags": (0,), "os.setxattr": (0,), "os.removexattr": (0,),
+}
+_FLAGS_ESCRITURA = os.O_WRONLY | os.O_RDWR | os.O_CREAT | os.O_APPEND | os.O_TRUNC
+# Datos del sistema que leen las bibliotecas (zonas horarias, fuentes, número de CPU)
+_LECTURA_SISTEMA = ("/usr/share", "/proc/self", "/sys/fs/cgroup", "/sys/devices/system/cpu")
+_DISPOSITIVOS = ("/dev/null", "/dev/urandom")
+_NOMBRE = re.compile(r"[A-Za-z_][A-Za-z0-9_]{0,39}")
+
+
+def _aplicar_limites(limites):
+    try:
+        import resource
+    except ImportError:  # Windows: solo queda el tiempo máximo del proceso padre
+        return
+    cpu = int(limites["cpu_s"])
+    memoria = int(limites["memoria_mb"]) * 1024 * 1024
+    fichero = int(limites["fichero_mb"]) * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 5))
+    resource.setrlimit(resource.RLIMIT_AS, (memoria, memoria))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (fichero, fichero))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+def _raices_lectura(trabajo):
+    """Directorios legibles: el de trabajo, la instalación de Python y los datos del sistema."""
+    raices = {trabajo, *_LECTURA_SISTEMA}
+    for ruta in (sys.prefix, sys.base_prefix, sys.exec_prefix, sys.base_exec_prefix, *sys.path):
+        if ruta and os.path.isdir(ruta):
+            raices.add(os.path.realpath(ruta))
+    return tuple(sorted(raices))
+
+
+def _dentro(ruta, raices):
+    return any(ruta == raiz or ruta.startswith(raiz.rstrip(os.sep) + os.sep) for raiz in raices)
+
+
+def _ruta_real(ruta):
+    """Ruta real de un argumento de auditoría (None si es un descriptor ya abierto)."""
+    if ruta is None:
+        ruta = "."
+    if isinstance(ruta, int):
+        return None
+    return os.path.realpath(os.fsdecode(os.fspath(ruta)))
+
+
+def _crear_auditoria(trabajo):
+    lectura = _raices_lectura(trabajo)
+    escritura = (trabajo,)
+
+    def comprobar(ruta, raices):
+        ruta = _ruta_real(ruta)
+        if ruta is not None and ruta not in _DISPOSITIVOS and not _dentro(ruta, raices):
+            raise PermissionError("Acceso a ficheros fuera del directorio de trabajo")
+
+    def auditoria(evento, argumentos):
+        if evento in _EVENTOS_RED:
+            raise PermissionError("Sin acceso a la red durante la verificación")
+        if evento in _EVENTOS_PROCESOS:
+            raise PermissionError("No se pueden crear procesos durante la verificación")
+        if evento == "open":
+            ruta, modo, flags = (tuple(argumentos) + (None, None))[:3]
+            escribe = any(c in (modo or "") for c in "wax+") or bool((flags or 0) & _FLAGS_ESCRITURA)
+            comprobar(ruta, escritura if escribe else lectura)
+        elif evento in _EVENTOS_LECTURA:
+            for posicion in _EVENTOS_LECTURA[evento]:
+                comprobar(argumentos[posicion] if len(argumentos) > posicion else None, lectura)
+        elif evento in _EVENTOS_ESCRITURA:
+            for posicion in _EVENTOS_ESCRITURA[evento]:
+                if len(argumentos) > posicion:
+                    comprobar(argumentos[posicion], escritura)
+    return auditoria
+
+
+def _urlopen_local(urlopen_original, datos):
+    """urlopen que sirve desde el directorio de datos los ficheros que se piden por URL (p. ej. housing.csv)."""
+    from urllib.parse import urlparse
+    from urllib.request import pathname2url
+
+    def urlopen(url, *args, **kwargs):
+        direccion = getattr(url, "full_url", url)
+        nombre = os.path.basename(urlparse(str(direccion)).path)
+        if nombre and os.path.isfile(os.path.join(datos, nombre)):
+            return urlopen_original("file:" + pathname2url(os.path.abspath(os.path.join(datos, nombre))))
+        return urlopen_original(url, *args, **kwargs)
+    return urlopen
+
+
+def _sin_magias(fuente):
+    """Quita las líneas de IPython (%magia, %%magia de celda, !comando): no son Python."""
+    lineas = []
+    for linea in fuente.splitlines():
+        if linea.lstrip().startswith(("%", "!")):
+            linea = linea[:len(linea) - len(linea.lstrip())] + "pass"
+        lineas.append(linea)
+    return "\n".join(lineas)
+
+
+def _modulo_ausente(error, fuente):
+    """Módulo que falta, solo si es un nombre que aparece en la celda (el mensaje no se devuelve)."""
+    modulo = (error.name or "").split(".")[0]
+    if _NOMBRE.fullmatch(modulo) and re.search(rf"\b{re.escape(modulo)}\b", fuente):
+        return modulo
+    return None
+
+
+def main():
+    peticion = json.load(sys.stdin)
+    _aplicar_limites(peticion["limites"])
+
+    # El canal de resultados es el stdout original; el del alumno va a /dev/null
+    resultados = os.fdopen(os.dup(1), "w", encoding="utf-8", buffering=1)
+    nulo = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(nulo, 1)
+    os.dup2(nulo, 2)
+    sys.stdout = sys.stderr = open(os.devnull, "w", encoding="utf-8")
+
+    trabajo = os.path.realpath(os.getcwd())
+    import mimetypes
+    import urllib.request
+    # urlopen('file:...') consulta los tipos MIME del sistema (/etc/mime.types): se cargan antes de los ganchos
+    mimetypes.init()
+    urllib.request.urlopen = _urlopen_local(urllib.request.urlopen, os.path.join(trabajo, peticion["datos"]))
+    sys.path.insert(0, trabajo)
+    sys.addaudithook(_crear_auditoria(trabajo))
+
+    espacio = {"__name__": "__main__", "display": lambda *args, **kwargs: None}
+    for indice, fuente in enumerate(peticion["celdas"]):
+        error = modulo = None
+        inicio = time.perf_counter()
+        try:
+            exec(compile(_sin_magias(fuente), f"<celda {indice}>", "exec"), espacio)
+        except ModuleNotFoundError as e:
+            error, modulo = "ModuleNotFoundError", _modulo_ausente(e, fuente)
+        except BaseException as e:  # SystemExit, KeyboardInterrupt... también son fallos de la celda
+            # Solo el tipo: el mensaje lo controla el código del alumno y acaba en el comentario de la nota
+            error = type(e).__name__
+        registro = {"celda": indice, "segundos": round(time.perf_counter() - inicio, 4), "error": error}
+        if modulo:
+            registro["modulo"] = modulo
+        resultados.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    resultados.write(json.dumps({"fin": True}) + "\n")
+    resultados.flush()
+    os._exit(0)
+
+
+if __name__ == "__main__":
+    main()
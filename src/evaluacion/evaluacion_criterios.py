@@ -0,0 +1,107 @@
+"""
+Evaluación con IA por criterios
+En lugar de un único prompt que puntúa los cinco componentes en una respuesta
+larga, se lanza una petición pequeña por criterio a la vez, cada una solo con
+las celdas de su sección del notebook. La latencia pasa a ser la de la
+respuesta más corta más lenta, y un JSON inválido solo repite su criterio.
+"""
+import asyncio
+import logging
+from config.settings import ENUNCIADO_EJERCICIO
+from core.asincrono import ejecutar
+from evaluacion.evaluacion_ia import COMPONENTES, solicitar_evaluacion_async, evaluacion_por_defecto
+from evaluacion.plantillas_prompt import prompt_criterio
+from evaluacion.reentrega import celdas_por_componente
+
+logger = logging.getLogger(__name__)
+
+# Una respuesta por criterio: nota, comentario breve y listas cortas
+MAX_TOKENS_CRITERIO = 300
+
+NOMBRES_CRITERIO = {
+    "exploracion": "Exploración",
+    "preprocesamiento": "Preprocesamiento",
+    "modelos": "Modelos",
+    "evaluacion": "Evaluación",
+    "documentacion": "Documentación",
+}
+
+
+def combinar_criterios(parciales):
+    """
+    Combina las evaluaciones de cada criterio en una evaluación completa.
+
+    Args:
+        parciales: {componente: evaluación del criterio}
+
+    Returns:
+        dict: Evaluación con nota_total = suma de componentes
+    """
+    evaluacion = {componente: parciales[componente].get(componente, 0.0) for componente in COMPONENTES}
+    evaluacion["nota_total"] = round(sum(evaluacion[c] for c in COMPONENTES), 1)
+    evaluacion["comentario"] = " ".join(
+        f"{NOMBRES_CRITERIO[c]}: {parciales[c]['comentario']}" for c in COMPONENTES if parciales[c].get("comentario")
+    )
+    evaluacion["puntos_fuertes"] = [p for c in COMPONENTES for p in parciales[c].get("puntos_fuertes", [])]
+    evaluacion["areas_mejora"] = [a for c in COMPONENTES for a in parciales[c].get("areas_mejora", [])]
+    return evaluacion
+
+
+async def evaluar_por_criterios_async(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO):
+    """
+    Evalúa un notebook con una petición concurrente por criterio.
+
+    Cada petición reintenta por su cuenta (ver solicitar_evaluacion_async), así
+    que un fallo solo repite su criterio. Un criterio sin celdas vale 0 sin
+    llamar a la IA.
+
+    Args:
+        notebook_usuario: Notebook del estudiante en formato JSON
+        enunciado: Enunciado y criterios del capítulo
+
+    Returns:
+        dict: Evaluación completa, o None si algún criterio no se pudo evaluar
+    """
+    celdas = celdas_por_componente(notebook_usuario)
+    parciales = {}
+    tareas = {}
+    async with asyncio.TaskGroup() as grupo:
+        for componente in COMPONENTES:
+            if not celdas[componente]:
+                parciales[componente] = {
+                    componente: 0.0,
+                    "comentario": "No hay contenido para este criterio.",
+                    "areas_mejora": [f"Completar: {NOMBRES_CRITERIO[componente].lower()}"],
+                }
+                continue
+            prompt = prompt_criterio(celdas[componente], enunciado, componente)
+            tareas[componente] = grupo.create_task(
+                solicitar_evaluacion_async(prompt, (componente,), MAX_TOKENS_CRITERIO)
+            )
+
+    fallidos = [componente for componente, tarea in tareas.items() if tarea.result() is None]
+    if fallidos:
+        logger.warning(f"No se pudieron evaluar los criterios: {', '.join(fallidos)}")
+        return None
+    parciales.update({componente: tarea.result() for componente, tarea in tareas.items()})
+    return combinar_criterios(parciales)
+
+
+async def evaluar_respuestas_criterios_async(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO):
+    """
+    Como evaluar_respuestas_ia_async, pero con una petición por criterio.
+
+    Args:
+        notebook_usuario: Notebook del estudiante en formato JSON
+        enunciado: Enunciado y criterios del capítulo
+
+    Returns:
+        dict: Evaluación completa (la evaluación por defecto si falla algún criterio)
+    """
+    evaluacion = await evaluar_por_criterios_async(notebook_usuario, enunciado)
+    return evaluacion or evaluacion_por_defecto()
+
+
+def evaluar_respuestas_criterios(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO):
+    """Versión síncrona de evaluar_respuestas_criterios_async."""
+    return ejecutar(evaluar_respuestas_criterios_async(notebook_usuario, enunciado))
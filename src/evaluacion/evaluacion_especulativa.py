@@ -0,0 +1,60 @@
+"""
+Evaluación con IA especulativa
+La petición al LLM solo depende de la originalidad para saltarse las copias
+directas, así que se lanza en segundo plano en cuanto se extrae el notebook y
+se cancela si el análisis de originalidad detecta una copia. La latencia de una
+entrega pasa a ser max(originalidad, IA) en lugar de la suma.
+"""
+import logging
+from concurrent.futures import CancelledError
+from core.asincrono import lanzar
+from utils.trazas import span
+
+logger = logging.getLogger(__name__)
+
+
+class EvaluacionEspeculativa:
+    """
+    Ejecuta una corrutina de evaluación en el bucle asíncrono compartido.
+
+    Las peticiones simultáneas al LLM están acotadas por el semáforo 'llm' de
+    evaluacion_ia. Cancelar la evaluación cancela la tarea y la petición HTTP en curso.
+
+    Args:
+        funcion: evaluar_respuestas_ia_async, reevaluar_componentes_async...
+        *args, **kwargs: Argumentos de la función
+    """
+
+    def __init__(self, funcion, *args, **kwargs):
+        self._cancelada = False
+        self._futuro = lanzar(self._ejecutar(funcion, args, kwargs))
+
+    @staticmethod
+    async def _ejecutar(funcion, args, kwargs):
+        with span("evaluacion_ia_especulativa"):
+            return await funcion(*args, **kwargs)
+
+    @property
+    def cancelada(self):
+        return self._cancelada
+
+    def cancelar(self):
+        """Cancela la evaluación (también la petición HTTP si ya se envió)."""
+        self._cancelada = True
+        self._futuro.cancel()
+
+    def resultado(self, timeout=None):
+        """
+        Espera a la evaluación y la devuelve.
+
+        Args:
+            timeout: Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            dict: Evaluación de la función (None si se canceló)
+        """
+        try:
+            return self._futuro.result(timeout)
+        except CancelledError:
+            logger.debug("Evaluación especulativa cancelada")
+            return None
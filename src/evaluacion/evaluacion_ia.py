@@ -5,189 +5,327 @@ CORREGIDO v2: La nota es SIEMPRE la suma de componentes, sin penalizaciones post
 """
 import json
 import time
-import requests
+import asyncio
+import httpx
 import streamlit as st
-from config.settings import GROQ_API_KEY, ENUNCIADO_EJERCICIO
-from utils.notebook_utils import extraer_contenido_notebook
+from config.settings import (
+    ENUNCIADO_EJERCICIO, LLM_MODO_JSON, LLM_STREAMING, LLM_BACKENDS,
+    LLM_COBERTURA, LLM_COBERTURA_PERCENTIL, LLM_COBERTURA_PRESUPUESTO
+)
+from core.asincrono import cliente_http, limitador, ejecutar
+from core.peticiones_cubiertas import Cobertura
+from core.circuito import Circuito
+from utils.trazas import span
+from utils.telemetria_llm import llamada_llm, estimar_tokens, OK, RESPUESTA_NO_VALIDA, ERROR_HTTP
+from evaluacion.respuesta_json import extraer_evaluacion, LectorJSONIncremental
+# CRITERIOS y COMPONENTES se siguen importando desde aquí
+from evaluacion.plantillas_prompt import SISTEMA, CRITERIOS, COMPONENTES, prompt_evaluacion
 
+# Peticiones simultáneas al LLM entre todas las sesiones (límite de peticiones del proveedor);
+# una evaluación por criterios (ver evaluacion_criterios) cabe entera
+MAX_PETICIONES_LLM = 5
 
-def evaluar_con_groq(notebook_usuario):
+# Streaming: segundos máximos hasta el primer token y entre dos tokens seguidos
+TIMEOUT_PRIMER_TOKEN = 20.0
+TIMEOUT_ENTRE_TOKENS = 5.0
+
+# Latencias recientes y presupuesto de las peticiones duplicadas (compartidos por todas las sesiones)
+cobertura_llm = Cobertura(LLM_COBERTURA_PERCENTIL, LLM_COBERTURA_PRESUPUESTO)
+
+# Cortacircuitos del proveedor: tras UMBRAL_FALLOS_LLM intentos fallidos seguidos (errores HTTP,
+# 429, timeouts) no se llama a la IA durante SEGUNDOS_CIRCUITO_ABIERTO
+UMBRAL_FALLOS_LLM = 5
+SEGUNDOS_CIRCUITO_ABIERTO = 60.0
+circuito_llm = Circuito("llm", UMBRAL_FALLOS_LLM, SEGUNDOS_CIRCUITO_ABIERTO)
+
+# Comentario de las evaluaciones por defecto guardadas antes de la reevaluación automática
+COMENTARIO_SIN_EVALUAR = "No se pudo evaluar automáticamente. Revisión manual necesaria. Nota provisional baja hasta confirmación."
+COMENTARIO_PENDIENTE = "La IA no está disponible ahora mismo. Nota provisional baja: la entrega se volverá a evaluar automáticamente."
+
+# Columna Origen de las evaluaciones: quién puso la nota
+ORIGEN_IA = "ia"
+ORIGEN_TRIAJE = "triaje"      # nota estática sin llamar a la IA (ver evaluacion.triaje)
+ORIGEN_COPIA = "copia"
+ORIGEN_PENDIENTE = "pendiente"  # nota provisional a la espera de la IA (ver evaluacion.recalificacion)
+
+
+def construir_prompt(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO, componentes=None):
     """
-    Evalúa un notebook usando la API de Groq con criterios más estrictos.
+    Construye el prompt de evaluación de un notebook (ver plantillas_prompt).
     
     Args:
         notebook_usuario: Notebook del estudiante en formato JSON
+        enunciado: Enunciado y criterios del capítulo
+        componentes: Si se indica, solo se piden estos componentes de COMPONENTES
+        
+    Returns:
+        str: Prompt para el modelo
+    """
+    return prompt_evaluacion(notebook_usuario, enunciado, componentes)
+
+
+def _cabeceras(backend):
+    return {
+        "Authorization": f"Bearer {backend['clave']}",
+        "Content-Type": "application/json"
+    }
+
+
+async def _recibir_completa(cuerpo, registro, backend):
+    """
+    Petición normal: espera la respuesta entera.
+    
+    Returns:
+        tuple: (estado HTTP, contenido del modelo o None, detalle del error)
+    """
+    inicio = time.perf_counter()
+    async with cliente_http().stream(
+        "POST", backend["url"], headers=_cabeceras(backend), json=cuerpo, timeout=60
+    ) as response:
+        registro["primer_byte_s"] = round(time.perf_counter() - inicio, 3)
+        await response.aread()
+    registro["status"] = response.status_code
+    registro["bytes_respuesta"] = len(response.content)
+    
+    try:
+        if response.status_code == 200:
+            datos = response.json()
+            registro["usage"] = datos.get("usage")
+            return 200, datos["choices"][0]["message"]["content"], ""
+        if response.status_code == 400 and "response_format" in cuerpo:
+            # En modo JSON el proveedor rechaza la salida inválida pero la devuelve en failed_generation
+            return 400, response.json()["error"]["failed_generation"], ""
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        return response.status_code, None, f"Error en estructura de respuesta: {str(e)}"
+    return response.status_code, None, response.text[:200]
+
+
+async def _recibir_en_streaming(cuerpo, registro, backend):
+    """
+    Petición en streaming (SSE): deja de leer en cuanto se cierra el objeto
+    JSON y corta si el modelo deja de enviar tokens.
+    
+    Returns:
+        tuple: (estado HTTP, contenido del modelo o None, detalle del error)
+        
+    Raises:
+        TimeoutError: Si no llega el primer token o la generación se detiene
+    """
+    lector = LectorJSONIncremental()
+    inicio = time.perf_counter()
+    async with cliente_http().stream(
+        "POST", backend["url"], headers=_cabeceras(backend), json={**cuerpo, "stream": True}, timeout=60
+    ) as response:
+        registro["primer_byte_s"] = round(time.perf_counter() - inicio, 3)
+        registro["status"] = response.status_code
+        if response.status_code != 200:
+            texto = (await response.aread()).decode("utf-8", errors="replace")
+            return response.status_code, None, texto[:200]
+        
+        lineas = response.aiter_lines()
+        espera = TIMEOUT_PRIMER_TOKEN
+        while not lector.completo:
+            try:
+                async with asyncio.timeout(espera):
+                    linea = await anext(lineas)
+            except StopAsyncIteration:
+                break
+            if not linea.startswith("data:"):
+                continue
+            dato = linea[len("data:"):].strip()
+            if dato == "[DONE]":
+                break
+            try:
+                evento = json.loads(dato)
+                # Groq manda el consumo en el último evento (x_groq.usage); solo llega si no se corta antes
+                uso = evento.get("usage") or (evento.get("x_groq") or {}).get("usage")
+                if uso:
+                    registro["usage"] = uso
+                fragmento = evento["choices"][0]["delta"].get("content") or ""
+            except (ValueError, KeyError, IndexError, TypeError, AttributeError):
+                continue
+            if fragmento and espera == TIMEOUT_PRIMER_TOKEN:
+                registro["primer_token_s"] = round(time.perf_counter() - inicio, 3)
+                espera = TIMEOUT_ENTRE_TOKENS
+            lector.agregar(fragmento)
+    
+    # Al salir del bloque se cierra la conexión aunque el modelo siga generando
+    registro["bytes_respuesta"] = len(lector.texto)
+    registro["corte_anticipado"] = lector.completo
+    return 200, lector.texto, ""
+
+
+async def _intentar(cuerpo, componentes, recibir, backend, intento, duplicada=False):
+    """
+    Una petición a un backend: recibe la respuesta y la repara y valida.
+    
+    Cada petición deja un registro de telemetría (ver utils.telemetria_llm).
+    
+    Returns:
+        tuple: (evaluación o None, estado HTTP, detalle del error)
+    """
+    prompt = "".join(mensaje["content"] for mensaje in cuerpo["messages"])
+    with llamada_llm(
+        tipo="streaming" if recibir is _recibir_en_streaming else "completa", modelo=cuerpo["model"],
+        backend=backend["nombre"], indice_clave=LLM_BACKENDS.index(backend) if backend in LLM_BACKENDS else None,
+        intento=intento + 1, duplicada=duplicada, max_tokens=cuerpo["max_tokens"],
+        tokens_prompt=estimar_tokens(prompt), tokens_estimados=True,
+    ) as llamada:
+        inicio = time.perf_counter()
+        registro = {}
+        try:
+            async with limitador("llm", MAX_PETICIONES_LLM):
+                llamada["espera_cola_s"] = round(time.perf_counter() - inicio, 3)
+                with span("peticion_llm", bytes=len(cuerpo["messages"][-1]["content"]), intento=intento + 1,
+                          backend=backend["nombre"]) as registro:
+                    estado, contenido_respuesta, detalle = await recibir(cuerpo, registro, backend)
+        finally:
+            llamada.update(estado=registro.get("status"), primer_byte_s=registro.get("primer_byte_s"),
+                           primer_token_s=registro.get("primer_token_s"))
+        
+        uso = registro.get("usage")
+        if uso:
+            llamada.update(tokens_prompt=uso.get("prompt_tokens"), tokens_respuesta=uso.get("completion_tokens"),
+                           tokens_estimados=False)
+        elif contenido_respuesta is not None:
+            llamada["tokens_respuesta"] = estimar_tokens(contenido_respuesta)
+        
+        if contenido_respuesta is None:
+            llamada["resultado"] = ERROR_HTTP
+            return None, estado, f"Error HTTP {estado}: {detalle}"
+        try:
+            evaluacion = extraer_evaluacion(contenido_respuesta, componentes)
+        except ValueError as e:
+            llamada["resultado"] = RESPUESTA_NO_VALIDA
+            return None, estado, f"Respuesta no válida: {str(e)}"
+        llamada["resultado"] = OK
+        return evaluacion, estado, ""
+
+
+def cuerpo_peticion(prompt, max_tokens=1000, streaming=LLM_STREAMING):
+    """
+    Cuerpo de /chat/completions para un prompt de evaluación (también las líneas de un lote, ver lote_ia).
+    
+    Args:
+        prompt: Prompt de evaluación
+        max_tokens: Longitud máxima de la respuesta
+        streaming: Si la respuesta se leerá en streaming
+        
+    Returns:
+        dict: Cuerpo de la petición
+    """
+    cuerpo = {
+        "model": "llama-3.3-70b-versatile",
+        "messages": [
+            {"role": "system", "content": SISTEMA},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.1,
+        "max_tokens": max_tokens
+    }
+    if LLM_MODO_JSON and not streaming:
+        # Groq no admite el modo JSON en streaming: ahí basta con la reparación de respuesta_json
+        cuerpo["response_format"] = {"type": "json_object"}
+    return cuerpo
+
+
+async def solicitar_evaluacion_async(prompt, componentes=COMPONENTES, max_tokens=1000):
+    """
+    Envía un prompt de evaluación a Groq y extrae el JSON de la respuesta.
+    
+    La respuesta se repara y se valida contra el esquema de la rúbrica (ver
+    respuesta_json); solo se repite la petición si no se puede recuperar, si
+    hay un error HTTP, un timeout o la generación se detiene (hasta 3 intentos,
+    rotando entre LLM_BACKENDS). Con LLM_STREAMING se deja de leer al cerrarse
+    el objeto JSON.
+    
+    Con LLM_COBERTURA y más de un backend, si un intento tarda más que el percentil de las
+    latencias recientes se duplica en el siguiente backend y gana la primera
+    respuesta válida (ver core.peticiones_cubiertas).
+    
+    Se ejecuta en el bucle compartido (ver core.asincrono); cancelar la tarea
+    cancela también la petición HTTP en curso.
+    
+    Args:
+        prompt: Prompt de evaluación
+        componentes: Componentes que puntúa el prompt (nota_total = su suma)
+        max_tokens: Longitud máxima de la respuesta
         
     Returns:
         dict: Evaluación con nota y comentarios, o None si falla
     """
-    if not GROQ_API_KEY:
+    if not LLM_BACKENDS:
         return None
     
-    contenido = extraer_contenido_notebook(notebook_usuario)
-    
-    # Usa TODO el contenido sin limitaciones de tokens
-    codigo = contenido["codigo"]
-    markdown = contenido["markdown"]
-    
-    prompt = f"""Eres un profesor ESTRICTO y EXIGENTE de Machine Learning evaluando la práctica de un estudiante. 
-
-**IMPORTANTE: Sé muy crítico y exigente. Un aprobado (5.0) debe demostrar dominio real de los conceptos.**
-
-**ENUNCIADO DEL EJERCICIO:**
-{ENUNCIADO_EJERCICIO}
-
-**NOTEBOOK DEL ESTUDIANTE:**
-
-CÓDIGO:
-```python
-{codigo}
-```
-
-EXPLICACIONES (MARKDOWN):
-{markdown}
-
-**CRITERIOS DE EVALUACIÓN ESTRICTOS:**
-
-1. **Exploración de datos (0-2 puntos)**
-   - 0.0-0.5: Solo carga datos o visualización básica
-   - 0.6-1.0: Análisis descriptivo básico (shape, info, describe)
-   - 1.1-1.5: Análisis de correlaciones, distribuciones y valores faltantes
-   - 1.6-2.0: Análisis profundo con visualizaciones múltiples e insights valiosos
-
-2. **Preprocesamiento (0-2 puntos)**
-   - 0.0: No hay preprocesamiento o está incompleto/incorrecto
-   - 0.5-1.0: Train/test split básico solamente
-   - 1.1-1.5: Pipeline básico con manejo de nulos y escalado
-   - 1.6-2.0: Pipeline completo con transformadores personalizados y encoders
-
-3. **Modelos implementados (0-3 puntos)**
-   - 0.0: No hay modelos implementados
-   - 0.5-1.0: Un solo modelo sin validación cruzada
-   - 1.1-2.0: Al menos 2 modelos con evaluación básica
-   - 2.1-3.0: Múltiples modelos con validación cruzada e hiperparámetros optimizados
-
-4. **Evaluación y análisis (0-2 puntos)**
-   - 0.0: No hay evaluación de modelos
-   - 0.5-1.0: Métricas básicas sin análisis
-   - 1.1-1.5: Comparación de modelos con varias métricas
-   - 1.6-2.0: Análisis profundo de errores y visualizaciones de predicciones
-
-5. **Documentación (0-1 punto)**
-   - 0.0-0.3: Sin explicaciones o muy básicas
-   - 0.4-0.6: Explicaciones mínimas de los pasos
-   - 0.7-1.0: Documentación clara con conclusiones y análisis
-
-**INSTRUCCIONES CRÍTICAS:**
-- Solo da nota >= 5.0 si hay REALMENTE un modelo de ML implementado y evaluado
-- Si no hay modelos implementados, la nota máxima es 3.0 (solo exploración)
-- Si no hay preprocesamiento adecuado, la nota máxima es 4.0
-- Si el código tiene muchos errores o no se ejecutaría, penaliza fuertemente
-- NO seas paternalista. Si el trabajo está incompleto, debe suspender.
-
-**IMPORTANTE: LA NOTA TOTAL DEBE SER LA SUMA EXACTA DE LOS 5 COMPONENTES**
-
-Devuelve tu respuesta en este formato JSON exacto:
-{{
-    "nota_total": 2.5,
-    "exploracion": 1.2,
-    "preprocesamiento": 0.0,
-    "modelos": 0.0,
-    "evaluacion": 0.0,
-    "documentacion": 0.3,
-    "comentario": "El estudiante solo ha realizado carga y visualización muy básica de datos. No hay preprocesamiento, modelos ni evaluación. Trabajo muy incompleto que no cumple los objetivos mínimos del ejercicio.",
-    "puntos_fuertes": ["Carga correcta de datos"],
-    "areas_mejora": ["Implementar preprocesamiento completo", "Desarrollar e implementar modelos de ML", "Realizar evaluación y análisis de resultados", "Mejorar documentación"]
-}}
-
-RECUERDA: 
-- Nota < 3.0 si solo hay carga/exploración básica de datos
-- Nota 3.0-4.0 si hay exploración completa pero sin modelos
-- Nota 5.0+ SOLO si hay modelos implementados y funcionando
-- Nota 7.0+ requiere trabajo excelente en todas las áreas
-- LA NOTA TOTAL = exploracion + preprocesamiento + modelos + evaluacion + documentacion"""
-
     max_intentos = 3
     ultimo_error = None
     
+    cuerpo = cuerpo_peticion(prompt, max_tokens)
+    recibir = _recibir_en_streaming if LLM_STREAMING else _recibir_completa
+    
     for intento in range(max_intentos):
+        if not circuito_llm.permite():
+            # Proveedor caído: la entrega queda pendiente sin esperar a reintentos
+            ultimo_error = "Circuito abierto"
+            break
+        # Cada intento empieza en un backend distinto; el duplicado va al siguiente
+        # (con una sola clave no hay duplicado: iría a la misma clave y gastaría su cuota)
+        backend = LLM_BACKENDS[intento % len(LLM_BACKENDS)]
+        alternativo = None
+        if LLM_COBERTURA and len(LLM_BACKENDS) > 1:
+            alternativo = LLM_BACKENDS[(intento + 1) % len(LLM_BACKENDS)]
         try:
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {GROQ_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "llama-3.3-70b-versatile",
-                    "messages": [
-                        {"role": "system", "content": "Eres un profesor universitario ESTRICTO de Machine Learning. NO seas condescendiente. Evalúa con rigor académico real."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 1000
-                },
-                timeout=60
+            evaluacion, estado, detalle = await cobertura_llm.ejecutar(
+                lambda b: _intentar(cuerpo, componentes, recibir, b, intento, duplicada=b is not backend),
+                backend, alternativo,
+                es_valido=lambda resultado: resultado[0] is not None,
+                clase=max_tokens,
             )
+            # Una respuesta (aunque no sea JSON válido) indica que el proveedor funciona
+            if estado in (200, 400):
+                circuito_llm.registrar_exito()
+            else:
+                circuito_llm.registrar_fallo()
             
-            if response.status_code == 200:
-                try:
-                    resultado = response.json()
-                    contenido_respuesta = resultado["choices"][0]["message"]["content"]
-                    
-                    # Extrae JSON de la respuesta
-                    inicio = contenido_respuesta.find('{')
-                    fin = contenido_respuesta.rfind('}') + 1
-                    
-                    if inicio != -1 and fin > inicio:
-                        json_str = contenido_respuesta[inicio:fin]
-                        evaluacion = json.loads(json_str)
-                        
-                        # ============ CORRECCIÓN DEFINITIVA ============
-                        # LA NOTA TOTAL SIEMPRE ES LA SUMA DE LOS COMPONENTES
-                        # No hay penalizaciones posteriores
-                        nota_calculada = (
-                            evaluacion.get("exploracion", 0) +
-                            evaluacion.get("preprocesamiento", 0) +
-                            evaluacion.get("modelos", 0) +
-                            evaluacion.get("evaluacion", 0) +
-                            evaluacion.get("documentacion", 0)
-                        )
-                        
-                        # Redondea a 1 decimal
-                        evaluacion["nota_total"] = round(nota_calculada, 1)
-                        # =============================================
-                        
-                        return evaluacion
-                    else:
-                        ultimo_error = "No se encontró JSON en la respuesta"
-                        continue
-                        
-                except json.JSONDecodeError as e:
-                    ultimo_error = f"Error al parsear JSON: {str(e)}"
-                    continue
-                except KeyError as e:
-                    ultimo_error = f"Error en estructura de respuesta: {str(e)}"
-                    continue
-                    
-            elif response.status_code == 429:
+            if evaluacion is not None:
+                # ============ CORRECCIÓN DEFINITIVA ============
+                # LA NOTA TOTAL SIEMPRE ES LA SUMA DE LOS COMPONENTES
+                # No hay penalizaciones posteriores
+                nota_calculada = sum(evaluacion[componente] for componente in componentes)
+                
+                # Redondea a 1 decimal
+                evaluacion["nota_total"] = round(nota_calculada, 1)
+                # =============================================
+                
+                return evaluacion
+            
+            if estado == 429:
                 if intento < max_intentos - 1:
-                    tiempo_espera = (intento + 1) * 30
-                    time.sleep(tiempo_espera)
+                    # Con otra clave disponible se pasa a ella en lugar de esperar
+                    if len(LLM_BACKENDS) == 1:
+                        tiempo_espera = (intento + 1) * 30
+                        await asyncio.sleep(tiempo_espera)
                     continue
                 else:
                     ultimo_error = "Rate limit excedido"
                     
             else:
-                ultimo_error = f"Error HTTP {response.status_code}: {response.text[:200]}"
+                ultimo_error = detalle
                 continue
                 
-        except requests.exceptions.Timeout:
+        except TimeoutError:
+            # Streaming sin tokens: se reintenta enseguida en lugar de esperar al timeout de 60 s
+            circuito_llm.registrar_fallo()
+            ultimo_error = "Generación detenida"
+            continue
+        except httpx.TimeoutException:
+            circuito_llm.registrar_fallo()
             ultimo_error = "Timeout en Groq"
             if intento < max_intentos - 1:
-                time.sleep(5)
+                await asyncio.sleep(5)
                 continue
         except Exception as e:
+            circuito_llm.registrar_fallo()
             ultimo_error = f"Error general: {str(e)}"
             continue
     
@@ -195,23 +333,29 @@ RECUERDA:
     return None
 
 
-def evaluar_respuestas_ia(notebook_usuario):
+async def evaluar_con_groq_async(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO, componentes=None):
     """
-    Función principal de evaluación con IA.
-    Intenta usar Groq y retorna evaluación por defecto si falla.
+    Evalúa un notebook usando la API de Groq con criterios más estrictos.
     
     Args:
         notebook_usuario: Notebook del estudiante en formato JSON
+        enunciado: Enunciado y criterios del capítulo
+        componentes: Si se indica, solo se puntúan estos componentes de COMPONENTES
         
     Returns:
-        dict: Evaluación completa
+        dict: Evaluación con nota y comentarios, o None si falla
     """
-    evaluacion = evaluar_con_groq(notebook_usuario)
-    
-    if evaluacion:
-        return evaluacion
-    
-    # Si falla, devuelve la evaluación por defecto MÁS BAJA
+    prompt = construir_prompt(notebook_usuario, enunciado, componentes)
+    return await solicitar_evaluacion_async(prompt, componentes or COMPONENTES)
+
+
+def evaluar_con_groq(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO, componentes=None):
+    """Versión síncrona de evaluar_con_groq_async (para la app y los scripts)."""
+    return ejecutar(evaluar_con_groq_async(notebook_usuario, enunciado, componentes))
+
+
+def evaluacion_por_defecto():
+    """Evaluación provisional (la MÁS BAJA) cuando la IA no responde; queda pendiente de reevaluar."""
     return {
         "nota_total": 3.0,
         "exploracion": 0.5,
@@ -219,7 +363,72 @@ def evaluar_respuestas_ia(notebook_usuario):
         "modelos": 0.0,
         "evaluacion": 0.0,
         "documentacion": 0.5,
-        "comentario": "No se pudo evaluar automáticamente. Revisión manual necesaria. Nota provisional baja hasta confirmación.",
+        "comentario": COMENTARIO_PENDIENTE,
         "puntos_fuertes": ["Archivo subido correctamente"],
         "areas_mejora": ["Requiere revisión manual completa"]
-    }
\ No newline at end of file
+    }
+
+
+def es_evaluacion_pendiente(evaluacion):
+    """Indica si una evaluación es la provisional de evaluacion_por_defecto() (también las antiguas)."""
+    return evaluacion.get("comentario") in (COMENTARIO_PENDIENTE, COMENTARIO_SIN_EVALUAR)
+
+
+async def evaluar_respuestas_ia_async(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO):
+    """
+    Función principal de evaluación con IA.
+    Intenta usar Groq y retorna evaluación por defecto si falla.
+    
+    Args:
+        notebook_usuario: Notebook del estudiante en formato JSON
+        enunciado: Enunciado y criterios del capítulo
+        
+    Returns:
+        dict: Evaluación completa
+    """
+    evaluacion = await evaluar_con_groq_async(notebook_usuario, enunciado)
+    
+    if evaluacion:
+        return evaluacion
+    
+    # Si falla, devuelve la evaluación por defecto MÁS BAJA
+    return evaluacion_por_defecto()
+
+
+def evaluar_respuestas_ia(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO):
+    """Versión síncrona de evaluar_respuestas_ia_async (para la app y los scripts)."""
+    return ejecutar(evaluar_respuestas_ia_async(notebook_usuario, enunciado))
+
+
+async def evaluar_lote_async(notebooks, enunciado=ENUNCIADO_EJERCICIO, concurrencia=MAX_PETICIONES_LLM,
+                             timeout=None):
+    """
+    Evalúa varios notebooks a la vez, con como mucho `concurrencia` en curso.
+    
+    Args:
+        notebooks: Lista de notebooks en formato JSON
+        enunciado: Enunciado y criterios del capítulo
+        concurrencia: Evaluaciones simultáneas de este lote
+        timeout: Segundos máximos por notebook (None = sin límite); al vencer se usa la evaluación por defecto
+        
+    Returns:
+        list: Evaluaciones en el mismo orden que `notebooks`
+    """
+    semaforo = asyncio.Semaphore(concurrencia)
+    
+    async def evaluar(notebook):
+        async with semaforo:
+            try:
+                async with asyncio.timeout(timeout):
+                    return await evaluar_respuestas_ia_async(notebook, enunciado)
+            except TimeoutError:
+                return evaluacion_por_defecto()
+    
+    async with asyncio.TaskGroup() as grupo:
+        tareas = [grupo.create_task(evaluar(notebook)) for notebook in notebooks]
+    return [tarea.result() for tarea in tareas]
+
+
+def evaluar_lote(notebooks, enunciado=ENUNCIADO_EJERCICIO, concurrencia=MAX_PETICIONES_LLM, timeout=None):
+    """Versión síncrona de evaluar_lote_async."""
+    return ejecutar(evaluar_lote_async(notebooks, enunciado, concurrencia, timeout))
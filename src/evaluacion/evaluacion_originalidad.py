@@ -1,45 +1,264 @@
 """
 Funciones para evaluar la originalidad de los notebooks
+
+El veredicto solo depende de en qué franja (0.7 / 0.85 / 0.95) cae la similitud
+máxima, así que se usa una cascada de cotas baratas y solo se calcula el
+SequenceMatcher.ratio() exacto cuando una cota queda a caballo de un umbral.
 """
+import re
 import json
+import zlib
+import threading
+from collections import Counter
 from difflib import SequenceMatcher
 from utils.notebook_utils import extraer_codigo_ejecutable
+from utils.trazas import span
+
+# Cortes de la similitud máxima que separan los cuatro veredictos
+UMBRALES = (0.7, 0.85, 0.95)
+
+# Niveles de la cascada, del más barato al más caro
+NIVELES_CASCADA = ("longitud", "quick_ratio", "exacto_parcial", "exacto")
+
+# Estimación por huellas: ventanas de 4 tokens, muestreadas 1 de cada 4 por hash
+# (crc32 y no hash(): la muestra tiene que ser la misma en cualquier proceso)
+TOKENS_POR_HUELLA = 4
+MODULO_MUESTREO = 4
+
+_lock = threading.Lock()
+_estadisticas_cascada = Counter()
 
 
-def evaluar_originalidad(contenido_usuario, contenido_oficial):
+def clasificar_originalidad(similitud_maxima, sim_codigo):
     """
-    Evalúa la originalidad de un notebook comparándolo con la solución oficial.
+    Traduce las similitudes a un veredicto de originalidad.
+    
+    Args:
+        similitud_maxima: max(similitud JSON, similitud de código)
+        sim_codigo: Similitud del código ejecutable
+        
+    Returns:
+        str: "Copia directa", "Copia modificada", "Inspirado" u "Original"
+    """
+    if similitud_maxima > 0.95 or sim_codigo > 0.95:
+        return "Copia directa"
+    elif similitud_maxima > 0.85 or sim_codigo > 0.90:
+        return "Copia modificada"
+    elif similitud_maxima > 0.7:
+        return "Inspirado"
+    return "Original"
+
+
+def _franja(similitud):
+    """Número de umbrales superados (0 = Original ... 3 = Copia directa)."""
+    return sum(similitud > umbral for umbral in UMBRALES)
+
+
+def _cota_longitud(a, b):
+    """Cota superior de ratio() usando solo las longitudes (igual que real_quick_ratio)."""
+    total = len(a) + len(b)
+    if total == 0:
+        return 1.0
+    return 2.0 * min(len(a), len(b)) / total
+
+
+def _huellas(texto):
+    """Huellas muestreadas de ventanas de tokens (estimación, no es una cota)."""
+    tokens = re.findall(r"\w+", texto)
+    huellas = set()
+    for i in range(max(1, len(tokens) - TOKENS_POR_HUELLA + 1)):
+        h = zlib.crc32(" ".join(tokens[i:i + TOKENS_POR_HUELLA]).encode("utf-8"))
+        if h % MODULO_MUESTREO == 0:
+            huellas.add(h)
+    return huellas
+
+
+def _estimar_similitud(a, b):
+    """Estimación de la similitud por coeficiente de Dice sobre huellas muestreadas."""
+    huellas_a = _huellas(a)
+    huellas_b = _huellas(b)
+    if not huellas_a and not huellas_b:
+        return 1.0 if a == b else 0.0
+    return 2.0 * len(huellas_a & huellas_b) / (len(huellas_a) + len(huellas_b))
+
+
+def _calcular_exacta(metrica):
+    with span(metrica["etapa"], bytes=len(metrica["a"]) + len(metrica["b"])):
+        if metrica["matcher"] is None:
+            metrica["matcher"] = SequenceMatcher(None, metrica["a"], metrica["b"])
+        metrica["valor"] = metrica["matcher"].ratio()
+
+
+def _resuelta(metricas):
+    """
+    Indica si la franja de la similitud máxima ya está determinada.
+    El mínimo posible es el mayor valor exacto conocido; el máximo, el mayor
+    valor exacto o cota superior.
+    """
+    minimo = max((m["valor"] for m in metricas if m["valor"] is not None), default=0.0)
+    maximo = max(m["valor"] if m["valor"] is not None else m["cota"] for m in metricas)
+    return _franja(minimo) == _franja(maximo)
+
+
+def _resolver_cascada(metricas):
+    """
+    Recorre la cascada hasta que el veredicto queda determinado.
+    
+    Returns:
+        str: Nivel de la cascada en el que se resolvió
+    """
+    # Nivel 1: longitudes
+    for metrica in metricas:
+        metrica["cota"] = _cota_longitud(metrica["a"], metrica["b"])
+    if _resuelta(metricas):
+        return "longitud"
+    
+    # Nivel 2: real_quick_ratio y quick_ratio (multiconjunto de caracteres, lineal)
+    for metrica in metricas:
+        metrica["matcher"] = SequenceMatcher(None, metrica["a"], metrica["b"])
+        metrica["cota"] = min(
+            metrica["cota"], metrica["matcher"].real_quick_ratio(), metrica["matcher"].quick_ratio()
+        )
+    if _resuelta(metricas):
+        return "quick_ratio"
+    
+    # Nivel 3: la estimación por huellas decide qué ratio() exacto calcular primero
+    # (la métrica que probablemente domina); no se usa para resolver, no es una cota
+    for metrica in metricas:
+        metrica["estimacion"] = min(_estimar_similitud(metrica["a"], metrica["b"]), metrica["cota"])
+    pendientes = sorted(metricas, key=lambda m: -m["estimacion"])
+    
+    # Nivel 4: cálculo exacto, parando en cuanto el veredicto queda determinado
+    for calculadas, metrica in enumerate(pendientes, 1):
+        _calcular_exacta(metrica)
+        if _resuelta(metricas):
+            return "exacto_parcial" if calculadas < len(pendientes) else "exacto"
+    return "exacto"
+
+
+def _valor_informado(metrica):
+    """Valor exacto si se calculó; si no, la estimación limitada por la cota superior."""
+    if metrica["valor"] is not None:
+        return metrica["valor"]
+    if metrica["estimacion"] is None:
+        metrica["estimacion"] = _estimar_similitud(metrica["a"], metrica["b"])
+    return min(metrica["estimacion"], metrica["cota"])
+
+
+def analizar_originalidad(contenido_usuario, contenido_oficial, exacto=False, corpus=None):
+    """
+    Evalúa la originalidad con detalle de cómo se resolvió la cascada.
     
     Args:
         contenido_usuario: Notebook del estudiante en formato JSON
         contenido_oficial: Notebook oficial en formato JSON
+        exacto: Si es True calcula siempre las dos similitudes exactas (sin cascada)
+        corpus: CorpusReferencia opcional; si se pasa, se informa la fuente más parecida
         
     Returns:
-        tuple: (originalidad, similitud_maxima)
-            - originalidad: str ("Copia directa", "Copia modificada", "Inspirado", "Original")
-            - similitud_maxima: float (0.0 a 1.0)
+        dict: {
+            'originalidad': str,
+            'similitud': float,      # similitud máxima (exacta o estimada, ver abajo)
+            'sim_json': float,
+            'sim_codigo': float,
+            'exactas': dict,         # {'json': bool, 'codigo': bool}
+            'similitud_exacta': float | None,  # similitud máxima si las dos son ratio() exactos
+            'nivel': str,            # nivel de NIVELES_CASCADA que resolvió el veredicto
+            'fuente': dict | None    # solo con corpus (ver CorpusReferencia.consultar)
+        }
+        
+    Las similitudes que no hizo falta calcular exactamente se informan con la
+    estimación por huellas limitada por su cota superior, de modo que siempre
+    caen en la misma franja que el veredicto. 'similitud_exacta' es None si la
+    cascada paró antes de calcular los dos ratio(): con una sola métrica exacta
+    el máximo podría quedarse por debajo del real.
     """
     # Método 1: Similitud de JSON completo (detecta copias exactas)
-    str_usuario = json.dumps(contenido_usuario, sort_keys=True)
-    str_oficial = json.dumps(contenido_oficial, sort_keys=True)
-    sim_json = SequenceMatcher(None, str_usuario, str_oficial).ratio()
-    
+    metrica_json = {
+        "etapa": "similitud_json",
+        "a": json.dumps(contenido_usuario, sort_keys=True),
+        "b": json.dumps(contenido_oficial, sort_keys=True),
+    }
     # Método 2: Similitud de código ejecutable
-    codigo_usuario = extraer_codigo_ejecutable(contenido_usuario)
-    codigo_oficial = extraer_codigo_ejecutable(contenido_oficial)
-    sim_codigo = SequenceMatcher(None, codigo_usuario, codigo_oficial).ratio()
+    metrica_codigo = {
+        "etapa": "similitud_codigo",
+        "a": extraer_codigo_ejecutable(contenido_usuario),
+        "b": extraer_codigo_ejecutable(contenido_oficial),
+    }
+    metricas = [metrica_json, metrica_codigo]
+    for metrica in metricas:
+        metrica.update({"cota": 1.0, "valor": None, "estimacion": None, "matcher": None})
+    
+    with span("cascada_originalidad") as registro:
+        if exacto:
+            for metrica in metricas:
+                _calcular_exacta(metrica)
+            nivel = "exacto"
+        else:
+            nivel = _resolver_cascada(metricas)
+        registro["nivel"] = nivel
+    
+    with _lock:
+        _estadisticas_cascada[nivel] += 1
+    
+    sim_json = _valor_informado(metrica_json)
+    sim_codigo = _valor_informado(metrica_codigo)
     
     # Usa la similitud más alta (la que mejor detecte la copia)
     similitud_maxima = max(sim_json, sim_codigo)
     
-    # Determina originalidad
-    if similitud_maxima > 0.95 or sim_codigo > 0.95:
-        originalidad = "Copia directa"
-    elif similitud_maxima > 0.85 or sim_codigo > 0.90:
-        originalidad = "Copia modificada"
-    elif similitud_maxima > 0.7:
-        originalidad = "Inspirado"
-    else:
-        originalidad = "Original"
+    fuente = None
+    if corpus is not None:
+        with span("consulta_corpus", documentos=len(corpus)):
+            fuente = corpus.consultar(contenido_usuario)
     
-    return originalidad, similitud_maxima
+    return {
+        "originalidad": clasificar_originalidad(similitud_maxima, sim_codigo),
+        "similitud": similitud_maxima,
+        "sim_json": sim_json,
+        "sim_codigo": sim_codigo,
+        "exactas": {"json": metrica_json["valor"] is not None, "codigo": metrica_codigo["valor"] is not None},
+        "similitud_exacta": similitud_maxima if all(m["valor"] is not None for m in metricas) else None,
+        "nivel": nivel,
+        "fuente": fuente,
+    }
+
+
+def evaluar_originalidad(contenido_usuario, contenido_oficial, exacto=False):
+    """
+    Evalúa la originalidad de un notebook comparándolo con la solución oficial.
+    
+    Args:
+        contenido_usuario: Notebook del estudiante en formato JSON
+        contenido_oficial: Notebook oficial en formato JSON
+        exacto: Si es True calcula siempre las similitudes exactas (sin cascada)
+        
+    Returns:
+        tuple: (originalidad, similitud_maxima)
+            - originalidad: str ("Copia directa", "Copia modificada", "Inspirado", "Original")
+            - similitud_maxima: float (0.0 a 1.0)
+    """
+    resultado = analizar_originalidad(contenido_usuario, contenido_oficial, exacto)
+    return resultado["originalidad"], resultado["similitud"]
+
+
+def resumen_cascada():
+    """
+    Fracción de evaluaciones resueltas en cada nivel de la cascada (desde el arranque).
+    
+    Returns:
+        dict: {nivel: {'n': int, 'fraccion': float}}
+    """
+    with _lock:
+        conteos = dict(_estadisticas_cascada)
+    total = sum(conteos.values())
+    return {
+        nivel: {"n": conteos.get(nivel, 0), "fraccion": conteos.get(nivel, 0) / total if total else 0.0}
+        for nivel in NIVELES_CASCADA
+    }
+
+
+def reiniciar_estadisticas_cascada():
+    """Pone a cero los contadores de resumen_cascada()."""
+    with _lock:
+        _estadisticas_cascada.clear()
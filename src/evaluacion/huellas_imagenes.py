@@ -0,0 +1,355 @@
+"""
+Huellas perceptuales de las imágenes de salida (image/png)
+Detecta gráficas reutilizadas entre alumnos o copiadas del notebook oficial
+sin comparar cadenas base64: cada imagen se decodifica una sola vez, se reduce
+a un aHash y un dHash de 64 bits y se busca en un índice por capítulo.
+
+Las huellas se guardan por digest del PNG en un JSON (fuera del repositorio),
+así que una misma imagen no se vuelve a decodificar nunca.
+"""
+import os
+import re
+import json
+import base64
+import hashlib
+import logging
+import threading
+import numpy as np
+from utils.png import decodificar_png_gris, ErrorPNG
+from utils.notebook_utils import CARPETA_SOLUCIONES_OFICIALES
+from config.capitulos import cache_capitulo
+
+logger = logging.getLogger(__name__)
+
+RUTA_CACHE_HUELLAS = os.environ.get("HUELLAS_IMAGENES_PATH", os.path.join("cache_huellas", "imagenes.json"))
+
+LADO_HASH = 8
+# Distancia de Hamming máxima (sobre 64 bits) para considerar dos gráficas la misma:
+# el dHash decide y el aHash confirma (evita falsos positivos en gráficas muy simples)
+UMBRAL_HAMMING = 3
+UMBRAL_HAMMING_AHASH = 8
+# Con 4 bandas de 16 bits, dos hashes a distancia <= 3 coinciden en al menos una banda
+BANDAS = 4
+BITS_BANDA = 64 // BANDAS
+_MASCARA_BANDA = (1 << BITS_BANDA) - 1
+
+_lock = threading.Lock()
+_huellas_por_digest = {}
+_estado_cache = {"cargada": False, "pendientes": 0}
+
+
+def _reducir(gris, alto, ancho):
+    """Reduce una imagen a alto x ancho promediando bloques (área)."""
+    if gris.shape[0] < alto or gris.shape[1] < ancho:
+        gris = np.repeat(gris, -(-alto // gris.shape[0]), axis=0)
+        gris = np.repeat(gris, -(-ancho // gris.shape[1]), axis=1)
+    filas = np.linspace(0, gris.shape[0], alto + 1).astype(int)
+    columnas = np.linspace(0, gris.shape[1], ancho + 1).astype(int)
+    sumas = np.add.reduceat(np.add.reduceat(gris.astype(np.float64), filas[:-1], axis=0), columnas[:-1], axis=1)
+    return sumas / np.outer(np.diff(filas), np.diff(columnas))
+
+
+def _bits_a_entero(bits):
+    return int("".join("1" if b else "0" for b in bits.ravel()), 2)
+
+
+def hash_perceptual(gris):
+    """
+    Calcula el aHash y el dHash (64 bits cada uno) de una imagen en escala de grises.
+
+    Args:
+        gris: Matriz (alto, ancho) con valores 0-255
+
+    Returns:
+        tuple: (ahash, dhash) como enteros
+    """
+    media = _reducir(gris, LADO_HASH, LADO_HASH)
+    ahash = _bits_a_entero(media > media.mean())
+    diferencias = _reducir(gris, LADO_HASH, LADO_HASH + 1)
+    dhash = _bits_a_entero(diferencias[:, 1:] > diferencias[:, :-1])
+    return ahash, dhash
+
+
+def _cargar_cache_persistente():
+    if _estado_cache["cargada"]:
+        return
+    _estado_cache["cargada"] = True
+    try:
+        with open(RUTA_CACHE_HUELLAS, encoding="utf-8") as f:
+            for digest, valores in json.load(f).items():
+                _huellas_por_digest[digest] = tuple(valores) if valores else None
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo leer la caché de huellas de imágenes: {e}")
+
+
+def guardar_cache_huellas():
+    """Escribe en disco las huellas calculadas desde la última escritura."""
+    with _lock:
+        if not _estado_cache["pendientes"]:
+            return
+        datos = {d: list(v) if v else None for d, v in _huellas_por_digest.items()}
+        _estado_cache["pendientes"] = 0
+    try:
+        carpeta = os.path.dirname(RUTA_CACHE_HUELLAS)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        temporal = f"{RUTA_CACHE_HUELLAS}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(datos, f)
+        os.replace(temporal, RUTA_CACHE_HUELLAS)
+    except OSError as e:
+        logger.warning(f"No se pudo guardar la caché de huellas de imágenes: {e}")
+
+
+def huella_imagen(datos_base64):
+    """
+    Huella de una salida image/png.
+
+    Args:
+        datos_base64: Contenido base64 de la salida (str o lista de líneas)
+
+    Returns:
+        dict: {'digest': str, 'ahash': int, 'dhash': int}; ahash/dhash son None
+              si el PNG no se pudo decodificar
+    """
+    if isinstance(datos_base64, list):
+        datos_base64 = "".join(datos_base64)
+    datos_base64 = re.sub(r"\s+", "", datos_base64)
+    digest = hashlib.sha1(datos_base64.encode("ascii", "ignore")).hexdigest()
+
+    with _lock:
+        _cargar_cache_persistente()
+        conocida = digest in _huellas_por_digest
+        valores = _huellas_por_digest.get(digest)
+
+    if not conocida:
+        try:
+            valores = hash_perceptual(decodificar_png_gris(base64.b64decode(datos_base64)))
+        except (ErrorPNG, ValueError) as e:
+            logger.info(f"Imagen {digest[:10]} sin huella perceptual: {e}")
+            valores = None
+        with _lock:
+            _huellas_por_digest[digest] = valores
+            _estado_cache["pendientes"] += 1
+
+    ahash, dhash = valores if valores else (None, None)
+    return {"digest": digest, "ahash": ahash, "dhash": dhash}
+
+
+def imagenes_notebook(notebook):
+    """
+    Huellas de todas las salidas image/png de un notebook.
+
+    Args:
+        notebook: Notebook en formato JSON
+
+    Returns:
+        list: [(indice_celda, huella)] en orden de aparición
+    """
+    imagenes = []
+    for indice, celda in enumerate(notebook.get("cells", [])):
+        for salida in celda.get("outputs", []) or []:
+            datos = (salida.get("data") or {}).get("image/png")
+            if datos:
+                imagenes.append((indice, huella_imagen(datos)))
+    return imagenes
+
+
+def _distancia(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _es_trivial(huella):
+    """Imágenes casi uniformes (en blanco) dan hashes degenerados que coinciden con todo."""
+    return huella["dhash"] in (0, (1 << 64) - 1)
+
+
+class IndiceImagenes:
+    """
+    Índice de huellas de imágenes: digest exacto y dHash por bandas.
+
+    Atributos:
+        imagenes: Lista de {'documento', 'tipo', 'celda', 'digest', 'ahash', 'dhash'}
+    """
+
+    def __init__(self):
+        self.imagenes = []
+        self._por_digest = {}
+        self._bandas = [dict() for _ in range(BANDAS)]
+
+    def __len__(self):
+        return len(self.imagenes)
+
+    def agregar(self, documento, tipo, celda, huella):
+        """
+        Añade una imagen al índice.
+
+        Args:
+            documento: Identificador del notebook
+            tipo: 'oficial' o 'companero'
+            celda: Índice de la celda de la imagen
+            huella: Resultado de huella_imagen()
+        """
+        posicion = len(self.imagenes)
+        self.imagenes.append({
+            "documento": documento, "tipo": tipo, "celda": celda,
+            "digest": huella["digest"], "ahash": huella["ahash"], "dhash": huella["dhash"],
+        })
+        # Una gráfica en blanco que comparten muchos alumnos no es una gráfica reutilizada
+        if _es_trivial(huella):
+            return
+        self._por_digest.setdefault(huella["digest"], []).append(posicion)
+        if huella["dhash"] is not None:
+            for banda in range(BANDAS):
+                clave = (huella["dhash"] >> (banda * BITS_BANDA)) & _MASCARA_BANDA
+                self._bandas[banda].setdefault(clave, []).append(posicion)
+
+    def buscar(self, huella, excluir=None):
+        """
+        Imagen indexada igual o perceptualmente casi igual.
+
+        Args:
+            huella: Resultado de huella_imagen()
+            excluir: Función documento -> bool para descartar resultados
+
+        Returns:
+            dict: {'documento', 'tipo', 'celda', 'distancia'} (distancia 0 y
+                  'exacta' True si el PNG es idéntico) o None; nunca para imágenes triviales
+        """
+        if _es_trivial(huella):
+            return None
+        for posicion in self._por_digest.get(huella["digest"], ()):
+            imagen = self.imagenes[posicion]
+            if not (excluir and excluir(imagen["documento"])):
+                return {**self._resultado(imagen), "distancia": 0, "exacta": True}
+
+        if huella["dhash"] is None:
+            return None
+        candidatos = set()
+        for banda in range(BANDAS):
+            clave = (huella["dhash"] >> (banda * BITS_BANDA)) & _MASCARA_BANDA
+            candidatos.update(self._bandas[banda].get(clave, ()))
+
+        mejor = None
+        for posicion in sorted(candidatos):
+            imagen = self.imagenes[posicion]
+            if excluir and excluir(imagen["documento"]):
+                continue
+            distancia = _distancia(huella["dhash"], imagen["dhash"])
+            if distancia > UMBRAL_HAMMING or _distancia(huella["ahash"], imagen["ahash"]) > UMBRAL_HAMMING_AHASH:
+                continue
+            if mejor is None or distancia < mejor["distancia"]:
+                mejor = {**self._resultado(imagen), "distancia": distancia, "exacta": False}
+        return mejor
+
+    @staticmethod
+    def _resultado(imagen):
+        return {"documento": imagen["documento"], "tipo": imagen["tipo"], "celda": imagen["celda"]}
+
+
+def obtener_indice_imagenes(capitulo, repo_dir, notebook_oficial=None):
+    """
+    Índice de imágenes de un capítulo (oficiales y entregas), en la caché del capítulo.
+
+    Solo se procesan los notebooks nuevos o modificados desde la última llamada.
+
+    Args:
+        capitulo: Configuración del capítulo (ver config.capitulos)
+        repo_dir: Directorio del repositorio
+        notebook_oficial: Notebook oficial ya cargado (por si no está en soluciones_oficiales/)
+
+    Returns:
+        IndiceImagenes: Índice del capítulo
+    """
+    cache = cache_capitulo(capitulo["clave"])
+    ficheros = []
+    carpetas = [
+        (os.path.join(repo_dir, CARPETA_SOLUCIONES_OFICIALES), "oficial"),
+        (os.path.join(repo_dir, "soluciones_alumnos", capitulo["carpeta"]), "companero"),
+    ]
+    for raiz, tipo in carpetas:
+        if not os.path.isdir(raiz):
+            continue
+        for nombre in sorted(os.listdir(raiz)):
+            ruta = os.path.join(raiz, nombre)
+            if nombre.endswith(".ipynb") and os.path.isfile(ruta):
+                estado = os.stat(ruta)
+                ficheros.append((ruta, tipo, estado.st_mtime_ns, estado.st_size))
+    version = (tuple(ficheros), notebook_oficial is not None)
+
+    with _lock:
+        if cache.get("imagenes_version") == version:
+            return cache["indice_imagenes"]
+        por_fichero = dict(cache.get("imagenes_por_fichero", {}))
+
+    indice = IndiceImagenes()
+    if notebook_oficial is not None:
+        for celda, huella in imagenes_notebook(notebook_oficial):
+            indice.agregar("notebook oficial", "oficial", celda, huella)
+
+    nuevos = {}
+    for ruta, tipo, mtime, tamano in ficheros:
+        clave = (ruta, mtime, tamano)
+        imagenes = por_fichero.get(clave)
+        if imagenes is None:
+            try:
+                with open(ruta, encoding="utf-8") as f:
+                    imagenes = imagenes_notebook(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"No se pudo leer {ruta}: {e}")
+                continue
+        nuevos[clave] = imagenes
+        for celda, huella in imagenes:
+            indice.agregar(os.path.relpath(ruta, repo_dir), tipo, celda, huella)
+
+    guardar_cache_huellas()
+    with _lock:
+        cache["imagenes_version"] = version
+        cache["imagenes_por_fichero"] = nuevos
+        cache["indice_imagenes"] = indice
+    return indice
+
+
+def analizar_imagenes(contenido_usuario, indice, nombre_alumno=None):
+    """
+    Busca en el índice del capítulo las imágenes de salida del alumno.
+
+    Args:
+        contenido_usuario: Notebook del estudiante en formato JSON
+        indice: IndiceImagenes del capítulo
+        nombre_alumno: Si se indica, se excluyen sus propias entregas
+
+    Returns:
+        dict: {
+            'imagenes': int,
+            'reutilizadas': [{'celda', 'documento', 'tipo', 'celda_fuente', 'distancia', 'exacta'}],
+            'fraccion_reutilizada': float
+        }
+    """
+    excluir = None
+    if nombre_alumno:
+        propio = re.compile(rf"{re.escape(nombre_alumno)}_\d{{4}}-\d{{2}}-\d{{2}}\.ipynb$")
+        excluir = lambda documento: propio.match(os.path.basename(documento)) is not None
+
+    imagenes = imagenes_notebook(contenido_usuario)
+    guardar_cache_huellas()
+    reutilizadas = []
+    for celda, huella in imagenes:
+        coincidencia = indice.buscar(huella, excluir)
+        if coincidencia:
+            reutilizadas.append({
+                "celda": celda,
+                "documento": coincidencia["documento"],
+                "tipo": coincidencia["tipo"],
+                "celda_fuente": coincidencia["celda"],
+                "distancia": coincidencia["distancia"],
+                "exacta": coincidencia["exacta"],
+            })
+
+    return {
+        "imagenes": len(imagenes),
+        "reutilizadas": reutilizadas,
+        "fraccion_reutilizada": len(reutilizadas) / len(imagenes) if imagenes else 0.0,
+    }
@@ -0,0 +1,376 @@
+"""
+Reevaluación de un capítulo con la API de lotes del proveedor
+En lugar de una petición síncrona por alumno, se escribe un JSONL con una
+petición por entrega (el mismo cuerpo que evaluacion_ia), se sube con la API
+de lotes compatible con OpenAI (/files y /batches) y se consulta hasta que
+termina. Los lotes no cuentan para los límites por minuto y cuestan menos.
+
+Cada paso (preparado, enviado, descargado, ingerido) se anota en un fichero
+de control en DIRECTORIO_LOTES, así que un proceso interrumpido se reanuda
+sin volver a enviar nada. Los resultados se escriben de una vez en
+evaluacion_originalidad.csv sobre la última fila de cada alumno.
+
+Uso manual (desde src/), sin commit ni push:
+    python -m evaluacion.lote_ia enviar <capitulo> [repo_dir]
+    python -m evaluacion.lote_ia reanudar <fichero de control> [repo_dir]
+    python -m evaluacion.lote_ia reintentar <fichero de control> [repo_dir]   (nuevo lote con las fallidas)
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime
+import httpx
+import pandas as pd
+from config.settings import LLM_BACKENDS, EJECUCION_NOTEBOOKS
+from config.capitulos import obtener_capitulo
+from core.asincrono import cliente_http, ejecutar, en_hilo
+from core.git_manager import commit_y_push_async
+from data.data_manager import actualizar_evaluaciones
+from evaluacion.ejecucion_notebooks import verificar_ejecuciones, resumen_ejecucion
+from evaluacion.evaluacion_ia import (
+    COMPONENTES, ORIGEN_IA, ORIGEN_TRIAJE, ORIGEN_COPIA, construir_prompt, cuerpo_peticion
+)
+from evaluacion.plantillas_prompt import version_prompt
+from evaluacion.recalificacion import ultimas_entregas
+from evaluacion.respuesta_json import extraer_evaluacion
+from evaluacion.triaje import triaje_estatico, limitar_evaluacion
+from utils.trazas import span
+from utils.telemetria_llm import registrar_llamada, OK, RESPUESTA_NO_VALIDA, ERROR_HTTP
+
+logger = logging.getLogger(__name__)
+
+# Ficheros de control y JSONL de entrada y salida de cada lote
+DIRECTORIO_LOTES = os.environ.get("LOTES_PATH", "lotes")
+VENTANA_LOTE = "24h"
+# Segundos entre dos consultas del estado del lote
+INTERVALO_CONSULTA = 30.0
+MAX_TOKENS_LOTE = 1000
+
+# Estados del fichero de control
+PREPARADO = "preparado"
+ENVIADO = "enviado"
+DESCARGADO = "descargado"
+INGERIDO = "ingerido"
+FALLIDO = "fallido"
+
+# Estados finales del lote en el proveedor
+_FINALES = {"completed", "failed", "expired", "cancelled"}
+
+
+def _url_api(backend, ruta):
+    """URL de la API de lotes a partir de la de /chat/completions del backend."""
+    return backend["url"].rsplit("/chat/completions", 1)[0] + ruta
+
+
+def _autorizacion(backend):
+    return {"Authorization": f"Bearer {backend['clave']}"}
+
+
+def entregas_capitulo(repo_dir, capitulo):
+    """
+    Última entrega de cada alumno del capítulo con nota de la IA (sin copias ni triaje).
+
+    Args:
+        repo_dir: Directorio del repositorio
+        capitulo: Configuración del capítulo (ver config.capitulos)
+
+    Returns:
+        list: [{'indice', 'nombre', 'capitulo', 'ruta', 'enunciado'}]
+    """
+    def seleccionar(ultimas):
+        origen = ultimas.get("Origen", pd.Series(None, index=ultimas.index))
+        return (
+            (ultimas["Capítulo"] == capitulo["nombre"])
+            & (ultimas["Originalidad"] != "Copia directa")
+            & ~origen.isin([ORIGEN_TRIAJE, ORIGEN_COPIA])
+        )
+    return ultimas_entregas(repo_dir, seleccionar)
+
+
+def _guardar_control(control):
+    """Escritura atómica del fichero de control (un corte no deja un JSON a medias)."""
+    temporal = control["ruta_control"] + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(control, f, ensure_ascii=False, indent=1)
+    os.replace(temporal, control["ruta_control"])
+
+
+def cargar_control(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def preparar_lote(repo_dir, capitulo, directorio=DIRECTORIO_LOTES, indices=None):
+    """
+    Escribe el JSONL del lote con una petición por entrega y su fichero de control.
+
+    Args:
+        repo_dir: Directorio del repositorio
+        capitulo: Configuración del capítulo (ver config.capitulos)
+        directorio: Carpeta de los ficheros del lote
+        indices: Si se indica, solo las entregas con estas filas del CSV (p. ej. las fallidas de otro lote)
+
+    Returns:
+        dict: Fichero de control (estado 'preparado'), o None si no hay entregas que evaluar
+    """
+    entregas = {}
+    lineas = []
+    for entrega in entregas_capitulo(repo_dir, capitulo):
+        if indices is not None and entrega["indice"] not in indices:
+            continue
+        try:
+            with open(entrega["ruta"], encoding="utf-8") as f:
+                notebook = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer la entrega {entrega['ruta']}: {e}")
+            continue
+        id_peticion = f"fila-{entrega['indice']}"
+        entregas[id_peticion] = {"indice": int(entrega["indice"]), "nombre": entrega["nombre"], "ruta": entrega["ruta"]}
+        lineas.append(json.dumps({
+            "custom_id": id_peticion,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": cuerpo_peticion(construir_prompt(notebook, entrega["enunciado"]), MAX_TOKENS_LOTE, streaming=False),
+        }, ensure_ascii=False))
+    if not lineas:
+        return None
+
+    os.makedirs(directorio, exist_ok=True)
+    nombre = f"{capitulo['carpeta']}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}"
+    ruta_entrada = os.path.join(directorio, f"{nombre}.jsonl")
+    with open(ruta_entrada, "w", encoding="utf-8") as f:
+        f.write("\n".join(lineas) + "\n")
+
+    control = {
+        "estado": PREPARADO,
+        "capitulo": capitulo["nombre"],
+        "clave_capitulo": capitulo["clave"],
+        "version_prompt": version_prompt(capitulo["enunciado"]),
+        "ruta_control": os.path.join(directorio, f"{nombre}.control.json"),
+        "ruta_entrada": ruta_entrada,
+        "ruta_salida": os.path.join(directorio, f"{nombre}.salida.jsonl"),
+        "id_fichero": None,
+        "id_lote": None,
+        "estado_proveedor": None,
+        "entregas": entregas,
+        "fallidas": [],
+    }
+    _guardar_control(control)
+    return control
+
+
+async def _enviar(control, backend):
+    if control["id_fichero"] is None:
+        with open(control["ruta_entrada"], "rb") as f:
+            datos = f.read()
+        with span("subir_lote", bytes=len(datos)):
+            response = await cliente_http().post(
+                _url_api(backend, "/files"), headers=_autorizacion(backend), timeout=120,
+                data={"purpose": "batch"},
+                files={"file": (os.path.basename(control["ruta_entrada"]), datos, "application/jsonl")},
+            )
+        response.raise_for_status()
+        control["id_fichero"] = response.json()["id"]
+        _guardar_control(control)
+
+    response = await cliente_http().post(
+        _url_api(backend, "/batches"), headers=_autorizacion(backend), timeout=60,
+        json={"input_file_id": control["id_fichero"], "endpoint": "/v1/chat/completions",
+              "completion_window": VENTANA_LOTE},
+    )
+    response.raise_for_status()
+    control.update({"id_lote": response.json()["id"], "estado": ENVIADO})
+    _guardar_control(control)
+    logger.info(f"Lote {control['id_lote']} enviado con {len(control['entregas'])} entregas")
+
+
+async def _esperar(control, backend, intervalo):
+    while True:
+        response = await cliente_http().get(
+            _url_api(backend, f"/batches/{control['id_lote']}"), headers=_autorizacion(backend), timeout=60
+        )
+        response.raise_for_status()
+        lote = response.json()
+        control["estado_proveedor"] = lote["status"]
+        if lote["status"] in _FINALES:
+            break
+        await asyncio.sleep(intervalo)
+
+    if not lote.get("output_file_id"):
+        # failed/expired/cancelled sin resultados: las entregas conservan su nota
+        control["estado"] = FALLIDO
+        _guardar_control(control)
+        return
+
+    with span("descargar_lote") as registro:
+        response = await cliente_http().get(
+            _url_api(backend, f"/files/{lote['output_file_id']}/content"), headers=_autorizacion(backend), timeout=120
+        )
+        response.raise_for_status()
+        registro["bytes"] = len(response.content)
+    with open(control["ruta_salida"], "wb") as f:
+        f.write(response.content)
+    control["estado"] = DESCARGADO
+    _guardar_control(control)
+
+
+def _evaluacion_de_linea(resultado, llamada):
+    """
+    Evaluación de una línea del JSONL de salida, o None si la petición falló o el JSON no es válido.
+
+    Anota en `llamada` (registro de telemetría) el estado, el consumo de tokens y el resultado.
+    """
+    respuesta = resultado.get("response") or {}
+    llamada["estado"] = respuesta.get("status_code")
+    if respuesta.get("status_code") != 200:
+        llamada["resultado"] = ERROR_HTTP
+        return None
+    cuerpo = respuesta.get("body") or {}
+    uso = cuerpo.get("usage") or {}
+    llamada.update(modelo=cuerpo.get("model"), tokens_prompt=uso.get("prompt_tokens"),
+                   tokens_respuesta=uso.get("completion_tokens"))
+    try:
+        contenido = respuesta["body"]["choices"][0]["message"]["content"]
+        evaluacion = extraer_evaluacion(contenido, COMPONENTES)
+    except (KeyError, IndexError, TypeError, ValueError):
+        llamada["resultado"] = RESPUESTA_NO_VALIDA
+        return None
+    llamada["resultado"] = OK
+    # La nota total es siempre la suma de los componentes (como en solicitar_evaluacion_async)
+    evaluacion["nota_total"] = round(sum(evaluacion[componente] for componente in COMPONENTES), 1)
+    return evaluacion
+
+
+def ingerir_resultados(control, repo_dir):
+    """
+    Aplica los resultados del lote a evaluacion_originalidad.csv en una sola escritura.
+
+    Se aplica la nota máxima del triaje estático, como en la app (con
+    EJECUCION_NOTEBOOKS, tras ejecutar todos los notebooks en paralelo). Las
+    entregas cuya petición falló conservan su nota y se anotan en control['fallidas'].
+
+    Args:
+        control: Fichero de control en estado 'descargado'
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        int: Evaluaciones actualizadas
+    """
+    resultados = {}
+    with open(control["ruta_salida"], encoding="utf-8") as f:
+        for linea in f:
+            if linea.strip():
+                resultado = json.loads(linea)
+                resultados[resultado.get("custom_id")] = resultado
+
+    evaluadas = []
+    fallidas = []
+    extras = {"Origen": ORIGEN_IA, "Version_Prompt": control["version_prompt"], "Reevaluacion": "lote"}
+    for id_peticion, entrega in control["entregas"].items():
+        llamada = {"momento": time.time(), "tipo": "lote", "id_lote": control["id_lote"],
+                   "alumno": entrega["nombre"], "capitulo": control["capitulo"]}
+        evaluacion = _evaluacion_de_linea(resultados.get(id_peticion, {}), llamada)
+        registrar_llamada(llamada)
+        if evaluacion is None:
+            fallidas.append(entrega["nombre"])
+            continue
+        with open(entrega["ruta"], encoding="utf-8") as f:
+            evaluadas.append((entrega, evaluacion, json.load(f)))
+
+    cambios = []
+    notebooks = [notebook for _, _, notebook in evaluadas]
+    ejecuciones = verificar_ejecuciones(notebooks) if EJECUCION_NOTEBOOKS else [None] * len(notebooks)
+    for (entrega, evaluacion, notebook), ejecucion in zip(evaluadas, ejecuciones):
+        extras_entrega = {**extras, "Ejecucion": resumen_ejecucion(ejecucion)} if EJECUCION_NOTEBOOKS else extras
+        triaje = triaje_estatico(notebook, ejecucion)
+        cambios.append((entrega["indice"], limitar_evaluacion(evaluacion, triaje), extras_entrega))
+
+    if cambios:
+        actualizar_evaluaciones(cambios, repo_dir)
+    control.update({"estado": INGERIDO, "fallidas": fallidas, "actualizadas": len(cambios)})
+    _guardar_control(control)
+    return len(cambios)
+
+
+async def avanzar_lote_async(control, repo_dir, repo=None, intervalo=INTERVALO_CONSULTA):
+    """
+    Lleva un lote desde su estado actual hasta 'ingerido' (o 'fallido').
+
+    Args:
+        control: Fichero de control (ver preparar_lote y cargar_control)
+        repo_dir: Directorio del repositorio
+        repo: Repositorio git para subir las notas (None = no se hace commit)
+        intervalo: Segundos entre dos consultas del estado del lote
+
+    Returns:
+        dict: Fichero de control actualizado
+
+    Raises:
+        RuntimeError: Si no hay API keys configuradas
+        httpx.HTTPError: Si falla una petición a la API de lotes (se puede reanudar)
+    """
+    if not LLM_BACKENDS:
+        raise RuntimeError("No hay API keys de Groq configuradas")
+    # El lote y sus ficheros pertenecen a la clave con la que se crean
+    backend = LLM_BACKENDS[0]
+
+    if control["estado"] == PREPARADO:
+        await _enviar(control, backend)
+    if control["estado"] == ENVIADO:
+        await _esperar(control, backend, intervalo)
+    if control["estado"] == DESCARGADO:
+        actualizadas = await en_hilo(ingerir_resultados, control, repo_dir)
+        if actualizadas and repo is not None:
+            await commit_y_push_async(repo, f"{control['capitulo']} - Reevaluación por lotes de {actualizadas} entregas")
+    return control
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) < 2 or argv[0] not in ("enviar", "reanudar", "reintentar"):
+        print("Uso: python -m evaluacion.lote_ia "
+              "{enviar <capitulo>|reanudar <fichero de control>|reintentar <fichero de control>} [repo_dir]")
+        return 2
+    repo_dir = argv[2] if len(argv) > 2 else "repo_temp"
+
+    if argv[0] == "reanudar":
+        control = cargar_control(argv[1])
+    else:
+        indices = None
+        if argv[0] == "reintentar":
+            anterior = cargar_control(argv[1])
+            indices = {entrega["indice"] for entrega in anterior["entregas"].values()
+                       if entrega["nombre"] in anterior["fallidas"]}
+            capitulo = obtener_capitulo(anterior["clave_capitulo"])
+        else:
+            capitulo = obtener_capitulo(argv[1])
+            if capitulo is None:
+                print(f"Capítulo desconocido: {argv[1]}")
+                return 2
+        control = preparar_lote(repo_dir, capitulo, indices=indices) if indices != set() else None
+        if control is None:
+            print(f"No hay entregas de {capitulo['nombre']} que evaluar")
+            return 0
+        print(f"Lote preparado con {len(control['entregas'])} entregas; si se interrumpe, se reanuda con:\n"
+              f"    python -m evaluacion.lote_ia reanudar {control['ruta_control']} {repo_dir}")
+
+    try:
+        control = ejecutar(avanzar_lote_async(control, repo_dir))
+    except (httpx.HTTPError, RuntimeError) as e:
+        print(f"Lote interrumpido en estado '{control['estado']}': {e}")
+        return 1
+
+    if control["estado"] == FALLIDO:
+        print(f"El lote {control['id_lote']} terminó sin resultados ({control['estado_proveedor']})")
+        return 1
+    print(f"{control['actualizadas']} de {len(control['entregas'])} evaluaciones actualizadas")
+    if control["fallidas"]:
+        print(f"Sin evaluar (conservan su nota): {', '.join(control['fallidas'])}")
+    return 0 if not control["fallidas"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Plantillas de los prompts de evaluación
+Todo el material fijo de un capítulo (instrucciones, enunciado, criterios,
+reglas y formato JSON) va al principio y el notebook al final, así el prefijo
+es idéntico en todas las entregas del capítulo y el proveedor puede
+reutilizarlo de su caché de prefijos en lugar de procesarlo cada vez.
+
+version_prompt() identifica la rúbrica de un capítulo: cambia si cambian el
+enunciado, los criterios o el texto de las plantillas, y las evaluaciones
+guardadas con otra versión no se reutilizan en las reentregas.
+"""
+import hashlib
+from functools import lru_cache
+from config.settings import ENUNCIADO_EJERCICIO
+from utils.notebook_utils import extraer_contenido_notebook
+
+# Subir al cambiar el texto de las plantillas (forma parte de version_prompt)
+VERSION_PLANTILLAS = 2
+
+# Mensaje de sistema, igual en todas las peticiones
+SISTEMA = "Eres un profesor universitario ESTRICTO de Machine Learning. NO seas condescendiente. Evalúa con rigor académico real."
+
+# Criterios de la rúbrica (un bloque por componente de la nota)
+CRITERIOS = {
+    "exploracion": """1. **Exploración de datos (0-2 puntos)**
+   - 0.0-0.5: Solo carga datos o visualización básica
+   - 0.6-1.0: Análisis descriptivo básico (shape, info, describe)
+   - 1.1-1.5: Análisis de correlaciones, distribuciones y valores faltantes
+   - 1.6-2.0: Análisis profundo con visualizaciones múltiples e insights valiosos""",
+    "preprocesamiento": """2. **Preprocesamiento (0-2 puntos)**
+   - 0.0: No hay preprocesamiento o está incompleto/incorrecto
+   - 0.5-1.0: Train/test split básico solamente
+   - 1.1-1.5: Pipeline básico con manejo de nulos y escalado
+   - 1.6-2.0: Pipeline completo con transformadores personalizados y encoders""",
+    "modelos": """3. **Modelos implementados (0-3 puntos)**
+   - 0.0: No hay modelos implementados
+   - 0.5-1.0: Un solo modelo sin validación cruzada
+   - 1.1-2.0: Al menos 2 modelos con evaluación básica
+   - 2.1-3.0: Múltiples modelos con validación cruzada e hiperparámetros optimizados""",
+    "evaluacion": """4. **Evaluación y análisis (0-2 puntos)**
+   - 0.0: No hay evaluación de modelos
+   - 0.5-1.0: Métricas básicas sin análisis
+   - 1.1-1.5: Comparación de modelos con varias métricas
+   - 1.6-2.0: Análisis profundo de errores y visualizaciones de predicciones""",
+    "documentacion": """5. **Documentación (0-1 punto)**
+   - 0.0-0.3: Sin explicaciones o muy básicas
+   - 0.4-0.6: Explicaciones mínimas de los pasos
+   - 0.7-1.0: Documentación clara con conclusiones y análisis""",
+}
+
+COMPONENTES = tuple(CRITERIOS)
+
+
+def _texto_criterios(componentes):
+    return "\n\n".join(CRITERIOS[c] for c in componentes)
+
+
+@lru_cache(maxsize=64)
+def prefijo_completo(enunciado):
+    """Parte fija del prompt que puntúa los cinco componentes."""
+    return f"""Eres un profesor ESTRICTO y EXIGENTE de Machine Learning evaluando la práctica de un estudiante.
+
+**IMPORTANTE: Sé muy crítico y exigente. Un aprobado (5.0) debe demostrar dominio real de los conceptos.**
+
+**ENUNCIADO DEL EJERCICIO:**
+{enunciado}
+
+**CRITERIOS DE EVALUACIÓN ESTRICTOS:**
+
+{_texto_criterios(COMPONENTES)}
+
+**INSTRUCCIONES CRÍTICAS:**
+- Solo da nota >= 5.0 si hay REALMENTE un modelo de ML implementado y evaluado
+- Si no hay modelos implementados, la nota máxima es 3.0 (solo exploración)
+- Si no hay preprocesamiento adecuado, la nota máxima es 4.0
+- Si el código tiene muchos errores o no se ejecutaría, penaliza fuertemente
+- NO seas paternalista. Si el trabajo está incompleto, debe suspender.
+
+**IMPORTANTE: LA NOTA TOTAL DEBE SER LA SUMA EXACTA DE LOS 5 COMPONENTES**
+
+Devuelve tu respuesta en este formato JSON exacto:
+{{
+    "nota_total": 2.5,
+    "exploracion": 1.2,
+    "preprocesamiento": 0.0,
+    "modelos": 0.0,
+    "evaluacion": 0.0,
+    "documentacion": 0.3,
+    "comentario": "El estudiante solo ha realizado carga y visualización muy básica de datos. No hay preprocesamiento, modelos ni evaluación. Trabajo muy incompleto que no cumple los objetivos mínimos del ejercicio.",
+    "puntos_fuertes": ["Carga correcta de datos"],
+    "areas_mejora": ["Implementar preprocesamiento completo", "Desarrollar e implementar modelos de ML", "Realizar evaluación y análisis de resultados", "Mejorar documentación"]
+}}
+
+RECUERDA:
+- Nota < 3.0 si solo hay carga/exploración básica de datos
+- Nota 3.0-4.0 si hay exploración completa pero sin modelos
+- Nota 5.0+ SOLO si hay modelos implementados y funcionando
+- Nota 7.0+ requiere trabajo excelente en todas las áreas
+- LA NOTA TOTAL = exploracion + preprocesamiento + modelos + evaluacion + documentacion
+
+"""
+
+
+@lru_cache(maxsize=64)
+def prefijo_parcial(enunciado, componentes):
+    """Parte fija del prompt que vuelve a puntuar solo algunos componentes (reentregas)."""
+    formato = ",\n".join(f'    "{c}": 0.0' for c in componentes)
+    return f"""Eres un profesor ESTRICTO y EXIGENTE de Machine Learning evaluando la nueva versión de la práctica de un estudiante.
+
+**IMPORTANTE: El resto de la nota ya está puesta. Evalúa SOLO los criterios indicados abajo.**
+
+**ENUNCIADO DEL EJERCICIO:**
+{enunciado}
+
+**CRITERIOS A EVALUAR:**
+
+{_texto_criterios(componentes)}
+
+Devuelve tu respuesta en este formato JSON exacto (solo estos componentes):
+{{
+{formato},
+    "comentario": "Comentario breve sobre los cambios en estas partes del trabajo.",
+    "puntos_fuertes": [],
+    "areas_mejora": []
+}}
+
+"""
+
+
+@lru_cache(maxsize=64)
+def prefijo_criterio(enunciado, componente):
+    """Parte fija del prompt que puntúa un único criterio."""
+    return f"""Eres un profesor ESTRICTO y EXIGENTE de Machine Learning evaluando UN SOLO criterio de la práctica de un estudiante.
+
+**ENUNCIADO DEL EJERCICIO:**
+{enunciado}
+
+**CRITERIO A EVALUAR:**
+
+{CRITERIOS[componente]}
+
+- Si el código tiene muchos errores o no se ejecutaría, penaliza fuertemente
+- NO seas paternalista. Puntúa solo lo que realmente está hecho.
+
+Devuelve tu respuesta en este formato JSON exacto:
+{{
+    "{componente}": 0.0,
+    "comentario": "Una o dos frases sobre este criterio.",
+    "puntos_fuertes": [],
+    "areas_mejora": []
+}}
+
+"""
+
+
+def prompt_evaluacion(notebook_usuario, enunciado=ENUNCIADO_EJERCICIO, componentes=None):
+    """
+    Prompt de evaluación de un notebook: parte fija del capítulo + notebook.
+
+    Args:
+        notebook_usuario: Notebook del estudiante en formato JSON
+        enunciado: Enunciado y criterios del capítulo
+        componentes: Si se indica, solo se piden estos componentes de COMPONENTES
+
+    Returns:
+        str: Prompt para el modelo
+    """
+    contenido = extraer_contenido_notebook(notebook_usuario)
+    prefijo = prefijo_parcial(enunciado, tuple(componentes)) if componentes else prefijo_completo(enunciado)
+    # Usa TODO el contenido sin limitaciones de tokens
+    return f"""{prefijo}**NOTEBOOK DEL ESTUDIANTE:**
+
+CÓDIGO:
+```python
+{contenido["codigo"]}
+```
+
+EXPLICACIONES (MARKDOWN):
+{contenido["markdown"]}"""
+
+
+def prompt_criterio(celdas, enunciado, componente):
+    """
+    Prompt para puntuar un único criterio con las celdas de su sección.
+
+    Args:
+        celdas: Celdas asignadas al componente (ver reentrega.celdas_por_componente)
+        enunciado: Enunciado y criterios del capítulo
+        componente: Componente de COMPONENTES
+
+    Returns:
+        str: Prompt para el modelo
+    """
+    contenido = extraer_contenido_notebook({"cells": celdas})
+    if componente == "documentacion":
+        seccion = f"EXPLICACIONES (MARKDOWN):\n{contenido['markdown']}"
+    else:
+        seccion = f"CÓDIGO:\n```python\n{contenido['codigo']}\n```"
+    return f"{prefijo_criterio(enunciado, componente)}**PARTE DEL NOTEBOOK CORRESPONDIENTE A ESTE CRITERIO:**\n\n{seccion}"
+
+
+@lru_cache(maxsize=64)
+def version_prompt(enunciado=ENUNCIADO_EJERCICIO):
+    """
+    Versión de la rúbrica de un capítulo (huella del material fijo de sus prompts).
+
+    Args:
+        enunciado: Enunciado y criterios del capítulo
+
+    Returns:
+        str: 12 caracteres hexadecimales, p. ej. para la columna Version_Prompt
+    """
+    material = [str(VERSION_PLANTILLAS), SISTEMA, prefijo_completo(enunciado)]
+    material += [prefijo_criterio(enunciado, componente) for componente in COMPONENTES]
+    return hashlib.sha256("\n".join(material).encode("utf-8")).hexdigest()[:12]
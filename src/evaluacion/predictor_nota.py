@@ -0,0 +1,298 @@
+"""
+Predictor local de la nota para mostrar una nota provisional al instante
+Regresión ridge (solo numpy) entrenada con el histórico de
+evaluaciones/evaluacion_originalidad.csv: a partir de características
+estáticas del notebook (completitud, celdas, métricas, volumen de markdown)
+predice los cinco componentes de la rúbrica en milisegundos, mientras la IA
+termina. La nota de la IA sigue siendo la definitiva; la prevista se guarda
+en la columna Nota_Prevista para medir la concordancia.
+
+Uso manual (desde src/):
+    python -m evaluacion.predictor_nota entrenar [repo_dir]
+    python -m evaluacion.predictor_nota concordancia [repo_dir]
+"""
+import os
+import sys
+import json
+import math
+import logging
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from config.capitulos import cargar_capitulos
+from evaluacion.evaluacion_ia import COMPONENTES, ORIGEN_IA, es_evaluacion_pendiente
+from evaluacion.reentrega import PATRONES_COMPONENTE
+from evaluacion.respuesta_json import PUNTUACION_MAXIMA
+from evaluacion.validador_estricto import analizar_completitud_notebook
+from utils.notebook_utils import extraer_contenido_notebook
+
+logger = logging.getLogger(__name__)
+
+# Fichero del modelo dentro del repositorio de entregas (se versiona con las evaluaciones)
+RUTA_MODELO = os.path.join("modelos", "predictor_nota.json")
+VERSION_MODELO = 1
+ALFA = 1.0
+MIN_MUESTRAS_ENTRENAMIENTO = 10
+
+CARACTERISTICAS = (
+    "celdas_codigo", "fraccion_ejecutadas", "tiene_errores",
+    "tiene_modelos", "tiene_preprocesamiento", "tiene_evaluacion", "tiene_train_test_split",
+    "metricas_detectadas",
+    "patrones_exploracion", "patrones_preprocesamiento", "patrones_modelos", "patrones_evaluacion",
+    "celdas_markdown", "log_caracteres_markdown", "log_caracteres_codigo",
+)
+
+_COLUMNAS = {componente: componente.capitalize() for componente in COMPONENTES}
+
+_lock = threading.Lock()
+_cache = {"ruta": None, "mtime": None, "modelo": None}
+
+
+def caracteristicas(notebook, analisis=None):
+    """
+    Vector de características estáticas de un notebook (orden de CARACTERISTICAS).
+
+    Args:
+        notebook: Notebook en formato JSON
+        analisis: Resultado de analizar_completitud_notebook() si ya se tiene
+
+    Returns:
+        np.ndarray
+    """
+    analisis = analisis or analizar_completitud_notebook(notebook)
+    contenido = extraer_contenido_notebook(notebook)
+    total = analisis["total_celdas"]
+    celdas_markdown = sum(
+        1 for celda in notebook.get("cells", [])
+        if celda.get("cell_type") == "markdown" and "".join(celda.get("source", [])).strip()
+    )
+    patrones = [
+        len({m.casefold() for m in patron.findall(contenido["codigo"])})
+        for patron in PATRONES_COMPONENTE.values()
+    ]
+    return np.array([
+        total,
+        analisis["celdas_ejecutadas"] / total if total else 0.0,
+        analisis["tiene_errores"],
+        analisis["tiene_modelos"],
+        analisis["tiene_preprocesamiento"],
+        analisis["tiene_evaluacion"],
+        analisis["tiene_train_test_split"],
+        len(analisis.get("metricas_detectadas", [])),
+        *patrones,
+        celdas_markdown,
+        math.log1p(len(contenido["markdown"])),
+        math.log1p(len(contenido["codigo"])),
+    ], dtype=float)
+
+
+def _evaluaciones_de_la_ia(repo_dir):
+    """Filas con nota de la IA (sin copias, triaje ni notas provisionales)."""
+    csv_path = os.path.join(repo_dir, "evaluaciones", "evaluacion_originalidad.csv")
+    try:
+        df_eval = pd.read_csv(csv_path)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame()
+    if "Origen" in df_eval:
+        # Las filas anteriores a la columna Origen solo se descartan si son copias o provisionales
+        df_eval = df_eval[df_eval["Origen"].isna() | (df_eval["Origen"] == ORIGEN_IA)]
+    df_eval = df_eval[df_eval["Originalidad"] != "Copia directa"]
+    return df_eval[~df_eval["Comentario"].map(lambda c: es_evaluacion_pendiente({"comentario": c}))]
+
+
+def datos_entrenamiento(repo_dir):
+    """
+    Características y notas de la IA de las entregas guardadas.
+
+    Cada fila se asocia al notebook soluciones_alumnos/<carpeta>/<Nombre>_<Fecha>.ipynb;
+    si un alumno reentregó el mismo día solo queda el último notebook, así que
+    se usa la última fila de ese fichero.
+
+    Args:
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        tuple: (X de forma (n, len(CARACTERISTICAS)), Y de forma (n, len(COMPONENTES)))
+    """
+    df_eval = _evaluaciones_de_la_ia(repo_dir)
+    carpetas = {capitulo["nombre"]: capitulo["carpeta"] for capitulo in cargar_capitulos().values()}
+
+    filas = {}
+    for fila in df_eval.to_dict("records"):
+        carpeta = carpetas.get(fila["Capítulo"])
+        if carpeta is None:
+            continue
+        ruta = os.path.join(repo_dir, "soluciones_alumnos", carpeta, f"{fila['Nombre']}_{fila['Fecha']}.ipynb")
+        filas[ruta] = fila
+
+    X, Y = [], []
+    for ruta, fila in filas.items():
+        try:
+            with open(ruta, encoding="utf-8") as f:
+                notebook = json.load(f)
+        except (OSError, ValueError):
+            continue
+        X.append(caracteristicas(notebook))
+        Y.append([float(fila[columna]) for columna in _COLUMNAS.values()])
+    ancho = len(CARACTERISTICAS)
+    return np.array(X, dtype=float).reshape(-1, ancho), np.array(Y, dtype=float).reshape(-1, len(COMPONENTES))
+
+
+def entrenar(X, Y, alfa=ALFA):
+    """
+    Ajusta una regresión ridge multisalida con las características estandarizadas.
+
+    Args:
+        X: Características (n, d)
+        Y: Notas por componente (n, k)
+        alfa: Regularización
+
+    Returns:
+        dict: Modelo serializable (medias, escalas, pesos, intercepto y error de validación)
+    """
+    media = X.mean(axis=0)
+    escala = X.std(axis=0)
+    escala[escala == 0] = 1.0
+    Z = (X - media) / escala
+    intercepto = Y.mean(axis=0)
+
+    # (ZᵀZ + αI)⁻¹ ZᵀY; con la matriz sombrero se obtiene el error leave-one-out sin reentrenar
+    inversa = np.linalg.inv(Z.T @ Z + alfa * np.eye(Z.shape[1]))
+    pesos = inversa @ Z.T @ (Y - intercepto)
+    apalancamiento = np.einsum("ij,jk,ik->i", Z, inversa, Z)
+    residuos = (Y - intercepto - Z @ pesos) / (1 - apalancamiento - 1 / len(Z))[:, None]
+    error_total = np.abs(residuos.sum(axis=1))
+
+    return {
+        "version": VERSION_MODELO,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "muestras": int(len(X)),
+        "alfa": alfa,
+        "caracteristicas": list(CARACTERISTICAS),
+        "componentes": list(COMPONENTES),
+        "media": media.tolist(),
+        "escala": escala.tolist(),
+        "pesos": pesos.tolist(),
+        "intercepto": intercepto.tolist(),
+        "mae_loo": round(float(error_total.mean()), 3),
+    }
+
+
+def predecir(modelo, notebook, analisis=None):
+    """
+    Nota provisional de un notebook.
+
+    Args:
+        modelo: Resultado de entrenar() (o de obtener_predictor())
+        notebook: Notebook en formato JSON
+        analisis: Resultado de analizar_completitud_notebook() si ya se tiene
+
+    Returns:
+        dict: {componente: nota en su rango, 'nota_total': suma}
+    """
+    z = (caracteristicas(notebook, analisis) - np.array(modelo["media"])) / np.array(modelo["escala"])
+    notas = np.array(modelo["intercepto"]) + z @ np.array(modelo["pesos"])
+    prediccion = {
+        componente: round(min(max(float(nota), 0.0), PUNTUACION_MAXIMA[componente]), 1)
+        for componente, nota in zip(modelo["componentes"], notas)
+    }
+    prediccion["nota_total"] = round(sum(prediccion.values()), 1)
+    return prediccion
+
+
+def guardar_predictor(modelo, repo_dir):
+    ruta = os.path.join(repo_dir, RUTA_MODELO)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(modelo, f, ensure_ascii=False, indent=1)
+    return ruta
+
+
+def obtener_predictor(repo_dir):
+    """
+    Modelo guardado en el repositorio, recargado solo si el fichero cambia.
+
+    Returns:
+        dict: Modelo, o None si no se ha entrenado o es de otra versión
+    """
+    ruta = os.path.join(repo_dir, RUTA_MODELO)
+    try:
+        mtime = os.stat(ruta).st_mtime_ns
+    except OSError:
+        return None
+    with _lock:
+        if _cache["ruta"] != ruta or _cache["mtime"] != mtime:
+            try:
+                with open(ruta, encoding="utf-8") as f:
+                    modelo = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"No se pudo leer el predictor de notas {ruta}: {e}")
+                modelo = None
+            if modelo and (modelo.get("version") != VERSION_MODELO
+                           or modelo.get("caracteristicas") != list(CARACTERISTICAS)):
+                modelo = None
+            _cache.update({"ruta": ruta, "mtime": mtime, "modelo": modelo})
+        return _cache["modelo"]
+
+
+def concordancia(repo_dir):
+    """
+    Concordancia entre la nota prevista y la nota de la IA.
+
+    Args:
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        dict: muestras, mae, dentro_1_punto (fracción con |error| <= 1) y correlacion (None si no hay datos)
+    """
+    df_eval = _evaluaciones_de_la_ia(repo_dir)
+    if df_eval.empty or "Nota_Prevista" not in df_eval:
+        return {"muestras": 0, "mae": None, "dentro_1_punto": None, "correlacion": None}
+    df_eval = df_eval.dropna(subset=["Nota_Prevista"])
+    prevista = df_eval["Nota_Prevista"].to_numpy(dtype=float)
+    real = df_eval["Nota_Total"].to_numpy(dtype=float)
+    if not len(real):
+        return {"muestras": 0, "mae": None, "dentro_1_punto": None, "correlacion": None}
+    error = np.abs(prevista - real)
+    correlacion = None
+    if len(real) > 1 and prevista.std() > 0 and real.std() > 0:
+        correlacion = round(float(np.corrcoef(prevista, real)[0, 1]), 3)
+    return {
+        "muestras": int(len(real)),
+        "mae": round(float(error.mean()), 3),
+        "dentro_1_punto": round(float((error <= 1.0).mean()), 3),
+        "correlacion": correlacion,
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("entrenar", "concordancia"):
+        print("Uso: python -m evaluacion.predictor_nota {entrenar|concordancia} [repo_dir]")
+        return 2
+    repo_dir = argv[1] if len(argv) > 1 else "repo_temp"
+
+    if argv[0] == "concordancia":
+        resultado = concordancia(repo_dir)
+        if not resultado["muestras"]:
+            print("No hay evaluaciones con nota prevista")
+            return 0
+        print(f"{resultado['muestras']} evaluaciones: error medio {resultado['mae']} puntos, "
+              f"{resultado['dentro_1_punto']:.0%} a 1 punto o menos, correlación {resultado['correlacion']}")
+        return 0
+
+    X, Y = datos_entrenamiento(repo_dir)
+    if len(X) < MIN_MUESTRAS_ENTRENAMIENTO:
+        print(f"Hacen falta al menos {MIN_MUESTRAS_ENTRENAMIENTO} evaluaciones de la IA con su notebook "
+              f"(hay {len(X)})")
+        return 1
+    modelo = entrenar(X, Y)
+    ruta = guardar_predictor(modelo, repo_dir)
+    print(f"Predictor entrenado con {modelo['muestras']} entregas (error leave-one-out de la nota total: "
+          f"{modelo['mae_loo']} puntos), guardado en {ruta}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Reevaluación en segundo plano de las entregas pendientes
+Cuando el proveedor de la IA está caído (circuito abierto, ver
+evaluacion_ia.circuito_llm) las entregas se guardan al instante con una nota
+provisional y Origen 'pendiente'. Un recalificador en el bucle asíncrono
+compartido las revisa periódicamente y, en cuanto la IA vuelve a responder,
+las evalúa, actualiza su fila y sube los cambios.
+
+Uso manual (desde src/), sin commit ni push:
+    python -m evaluacion.recalificacion [repo_dir]
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import threading
+import pandas as pd
+from config.settings import MODO_EVALUACION_IA, EJECUCION_NOTEBOOKS
+from config.capitulos import cargar_capitulos
+from core.asincrono import ejecutar, lanzar, en_hilo
+from core.git_manager import commit_y_push_async
+from data.data_manager import actualizar_evaluacion
+from evaluacion.evaluacion_ia import ORIGEN_IA, ORIGEN_PENDIENTE, evaluar_con_groq_async
+from evaluacion.evaluacion_criterios import evaluar_por_criterios_async
+from evaluacion.ejecucion_notebooks import verificar_ejecucion_async, resumen_ejecucion
+from evaluacion.plantillas_prompt import version_prompt
+from evaluacion.triaje import triaje_estatico, limitar_evaluacion
+from utils.telemetria_llm import contexto_llm
+
+logger = logging.getLogger(__name__)
+
+# Segundos entre dos revisiones de las entregas pendientes
+INTERVALO_RECALIFICACION = 60.0
+
+_lock = threading.Lock()
+_estado = {"futuro": None}
+
+
+def ultimas_entregas(repo_dir, seleccionar):
+    """
+    Última entrega de cada alumno y capítulo, con su fila del CSV y su notebook guardado.
+
+    Args:
+        repo_dir: Directorio del repositorio
+        seleccionar: Función DataFrame de últimas filas -> máscara de las que se devuelven
+
+    Returns:
+        list: [{'indice', 'nombre', 'capitulo', 'ruta', 'enunciado'}]
+    """
+    csv_path = os.path.join(repo_dir, "evaluaciones", "evaluacion_originalidad.csv")
+    try:
+        df_eval = pd.read_csv(csv_path)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return []
+
+    # Solo cuenta la última entrega de cada alumno: una reentrega posterior ya tiene su nota
+    clave = [df_eval["Nombre"].astype(str).str.lower(), df_eval["Capítulo"]]
+    ultimas = df_eval.groupby(clave).tail(1)
+    ultimas = ultimas[seleccionar(ultimas)]
+
+    capitulos = {capitulo["nombre"]: capitulo for capitulo in cargar_capitulos().values()}
+    entregas = []
+    for indice, fila in ultimas.iterrows():
+        capitulo = capitulos.get(fila["Capítulo"])
+        if capitulo is None:
+            continue
+        entregas.append({
+            "indice": indice,
+            "nombre": fila["Nombre"],
+            "capitulo": fila["Capítulo"],
+            "ruta": os.path.join(
+                repo_dir, "soluciones_alumnos", capitulo["carpeta"], f"{fila['Nombre']}_{fila['Fecha']}.ipynb"
+            ),
+            "enunciado": capitulo["enunciado"],
+        })
+    return entregas
+
+
+def entregas_pendientes(repo_dir):
+    """
+    Entregas cuya última evaluación es la provisional a la espera de la IA.
+
+    Args:
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        list: [{'indice', 'nombre', 'capitulo', 'ruta', 'enunciado'}] (fila del CSV y notebook guardado)
+    """
+    return ultimas_entregas(
+        repo_dir, lambda ultimas: ultimas.get("Origen", pd.Series(None, index=ultimas.index)) == ORIGEN_PENDIENTE
+    )
+
+
+async def _evaluar(notebook, enunciado):
+    if MODO_EVALUACION_IA == "criterios":
+        return await evaluar_por_criterios_async(notebook, enunciado)
+    return await evaluar_con_groq_async(notebook, enunciado)
+
+
+async def recalificar_pendientes_async(repo_dir, repo=None):
+    """
+    Evalúa con la IA las entregas pendientes y actualiza sus filas.
+
+    Se detiene en el primer fallo: si el proveedor sigue caído, el circuito
+    rechaza la petición al instante y se vuelve a intentar más tarde.
+
+    Args:
+        repo_dir: Directorio del repositorio
+        repo: Repositorio git para subir los cambios (None = no se hace commit)
+
+    Returns:
+        int: Entregas reevaluadas
+    """
+    pendientes = await en_hilo(entregas_pendientes, repo_dir)
+    reevaluadas = 0
+    for entrega in pendientes:
+        try:
+            with open(entrega["ruta"], encoding="utf-8") as f:
+                notebook = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"No se pudo leer la entrega pendiente {entrega['ruta']}: {e}")
+            continue
+
+        with contexto_llm(alumno=entrega["nombre"], capitulo=entrega["capitulo"], origen="recalificacion"):
+            evaluacion = await _evaluar(notebook, entrega["enunciado"])
+        if evaluacion is None:
+            break
+        extras = {"Origen": ORIGEN_IA, "Version_Prompt": version_prompt(entrega["enunciado"])}
+        ejecucion = None
+        if EJECUCION_NOTEBOOKS:
+            # Normalmente ya está guardada: la app la lanzó al recibir la entrega
+            ejecucion = await verificar_ejecucion_async(notebook)
+            extras["Ejecucion"] = resumen_ejecucion(ejecucion)
+        evaluacion = limitar_evaluacion(evaluacion, await en_hilo(triaje_estatico, notebook, ejecucion))
+        await en_hilo(actualizar_evaluacion, entrega["indice"], evaluacion, repo_dir, extras)
+        logger.info(f"Reevaluada {entrega['capitulo']} - {entrega['nombre']}: {evaluacion['nota_total']}/10")
+        reevaluadas += 1
+
+    if reevaluadas and repo is not None:
+        await commit_y_push_async(repo, f"Reevaluación automática de {reevaluadas} entregas pendientes")
+    return reevaluadas
+
+
+async def _bucle_recalificacion(repo_dir, repo, intervalo):
+    while True:
+        try:
+            await recalificar_pendientes_async(repo_dir, repo)
+        except Exception as e:
+            # El recalificador nunca debe pararse por una entrega
+            logger.warning(f"Error al reevaluar entregas pendientes: {e}")
+        await asyncio.sleep(intervalo)
+
+
+def iniciar_recalificador(repo_dir, repo, intervalo=INTERVALO_RECALIFICACION):
+    """
+    Arranca el recalificador en el bucle asíncrono compartido (una vez por proceso).
+
+    Args:
+        repo_dir: Directorio del repositorio
+        repo: Repositorio git para subir las notas actualizadas
+        intervalo: Segundos entre dos revisiones
+
+    Returns:
+        concurrent.futures.Future: Tarea del recalificador
+    """
+    with _lock:
+        if _estado["futuro"] is None or _estado["futuro"].done():
+            _estado["futuro"] = lanzar(_bucle_recalificacion(repo_dir, repo, intervalo))
+        return _estado["futuro"]
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    repo_dir = argv[0] if argv else "repo_temp"
+    pendientes = len(entregas_pendientes(repo_dir))
+    if not pendientes:
+        print("No hay entregas pendientes")
+        return 0
+    reevaluadas = ejecutar(recalificar_pendientes_async(repo_dir))
+    print(f"{reevaluadas} de {pendientes} entregas pendientes reevaluadas")
+    return 0 if reevaluadas == pendientes else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
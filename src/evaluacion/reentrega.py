@@ -0,0 +1,302 @@
+"""
+Reentregas incrementales
+Compara la nueva versión de un notebook con la última entrega guardada del
+mismo alumno mediante hashes de celda. Si no hay cambios se reutiliza la
+evaluación anterior sin llamar a la IA; si solo cambian algunas secciones, se
+vuelven a puntuar únicamente los componentes de la rúbrica afectados y se
+combinan con la nota anterior.
+"""
+import os
+import re
+import json
+import hashlib
+import logging
+from collections import Counter
+from core.asincrono import ejecutar
+from evaluacion.evaluacion_ia import (
+    COMPONENTES, COMENTARIO_SIN_EVALUAR, COMENTARIO_PENDIENTE, ORIGEN_TRIAJE, evaluar_con_groq_async, evaluar_respuestas_ia_async
+)
+
+logger = logging.getLogger(__name__)
+
+MODOS = ("completa", "parcial", "sin_cambios")
+
+# Patrones que asignan una celda de código a un componente de la rúbrica.
+# Las celdas sin coincidencias (gráficas, prints...) pertenecen a la sección anterior.
+PATRONES_COMPONENTE = {
+    "exploracion": re.compile(
+        r"read_csv|load_\w+\(|\.head\(|\.info\(|\.describe\(|\.hist\(|value_counts|\.corr\(|"
+        r"scatter_matrix|\.isnull\(|\.isna\(|\.shape\b"
+    ),
+    "preprocesamiento": re.compile(
+        r"train_test_split|StratifiedShuffleSplit|StandardScaler|MinMaxScaler|Pipeline|ColumnTransformer|"
+        r"SimpleImputer|OneHotEncoder|OrdinalEncoder|LabelEncoder|fit_transform|\.fillna\(|\.dropna\("
+    ),
+    "modelos": re.compile(
+        r"LinearRegression|RandomForest|DecisionTree|GradientBoosting|XGB|LGBM|SVR\(|SVC\(|KNeighbors|"
+        r"GridSearchCV|RandomizedSearchCV|cross_val_score|\.fit\("
+    ),
+    "evaluacion": re.compile(
+        r"mean_squared_error|mean_absolute_error|r2_score|accuracy_score|precision_score|recall_score|"
+        r"f1_score|roc_auc_score|confusion_matrix|classification_report|\.score\(|\.predict\(|rmse",
+        re.IGNORECASE
+    ),
+}
+
+# Columnas de evaluacion_originalidad.csv que no son 'extras'
+_COLUMNAS_EVALUACION = {
+    "Nombre", "Capítulo", "Originalidad", "Similitud", "Nota_Total", "Exploracion", "Preprocesamiento",
+    "Modelos", "Evaluacion", "Documentacion", "Comentario", "Fecha", "Reevaluacion",
+}
+
+
+def _texto_celda(celda):
+    source = celda.get("source", "")
+    return "".join(source) if isinstance(source, list) else str(source)
+
+
+def _normalizar(celda):
+    return " ".join(_texto_celda(celda).split())
+
+
+def celdas_por_componente(notebook):
+    """
+    Reparte las celdas de un notebook entre los componentes de la rúbrica.
+
+    El markdown es documentación; cada celda de código va a los componentes
+    cuyos patrones encuentra o, si no encuentra ninguno, a los de la celda anterior.
+
+    Args:
+        notebook: Notebook en formato JSON
+
+    Returns:
+        dict: {componente: [celdas]} en el orden del notebook
+    """
+    celdas = {componente: [] for componente in COMPONENTES}
+    seccion = ("exploracion",)
+    for celda in notebook.get("cells", []):
+        tipo = celda.get("cell_type")
+        texto = _normalizar(celda)
+        if not texto or tipo not in ("code", "markdown"):
+            continue
+        if tipo == "markdown":
+            celdas["documentacion"].append(celda)
+            continue
+        coincidencias = tuple(c for c, patron in PATRONES_COMPONENTE.items() if patron.search(texto))
+        if coincidencias:
+            seccion = coincidencias
+        for componente in seccion:
+            celdas[componente].append(celda)
+    return celdas
+
+
+def huellas_por_componente(notebook):
+    """
+    Hashes de las celdas de un notebook agrupados por componente de la rúbrica.
+
+    Solo cuenta el contenido (código y markdown, con los espacios colapsados):
+    las salidas y los contadores de ejecución no cambian la nota de la IA.
+
+    Args:
+        notebook: Notebook en formato JSON
+
+    Returns:
+        dict: {componente: Counter de hashes}
+    """
+    huellas = {}
+    for componente, celdas in celdas_por_componente(notebook).items():
+        huellas[componente] = Counter(
+            hashlib.blake2b(f"{celda['cell_type']}\0{_normalizar(celda)}".encode("utf-8"), digest_size=16).hexdigest()
+            for celda in celdas
+        )
+    return huellas
+
+
+def estado_ejecucion(notebook):
+    """
+    Celdas de código ejecutadas y con error, en orden.
+
+    No cambia la nota de la IA, pero sí el triaje estático y la nota máxima
+    sugerida (ver triaje.limitar_evaluacion): ejecutar un notebook incompleto y
+    volver a entregarlo tiene que evaluarse de nuevo.
+
+    Args:
+        notebook: Notebook en formato JSON
+
+    Returns:
+        list: [(ejecutada, con_error)] por celda de código
+    """
+    return [
+        (
+            celda.get("execution_count") is not None,
+            any(salida.get("output_type") == "error" for salida in celda.get("outputs", [])),
+        )
+        for celda in notebook.get("cells", [])
+        if celda.get("cell_type") == "code"
+    ]
+
+
+def comparar_entregas(notebook_anterior, notebook_nuevo):
+    """
+    Compara dos versiones de la entrega de un alumno celda a celda.
+
+    Args:
+        notebook_anterior: Última entrega guardada
+        notebook_nuevo: Nueva entrega
+
+    Returns:
+        dict: {
+            'sin_cambios': bool,     # mismo contenido y mismo estado de ejecución
+            'componentes': [componentes con celdas añadidas, modificadas o eliminadas],
+            'ejecucion_cambiada': bool,  # celdas ejecutadas o con error distintas (ver estado_ejecucion)
+            'celdas_nuevas': int,
+            'celdas_eliminadas': int
+        }
+    """
+    anterior = huellas_por_componente(notebook_anterior)
+    nuevo = huellas_por_componente(notebook_nuevo)
+    componentes = [c for c in COMPONENTES if anterior[c] != nuevo[c]]
+
+    total_anterior = Counter()
+    total_nuevo = Counter()
+    for componente in COMPONENTES:
+        # Una celda puede estar en varios componentes: se cuenta una vez
+        total_anterior |= anterior[componente]
+        total_nuevo |= nuevo[componente]
+    ejecucion_cambiada = estado_ejecucion(notebook_anterior) != estado_ejecucion(notebook_nuevo)
+    return {
+        "sin_cambios": not componentes and not ejecucion_cambiada,
+        "componentes": componentes,
+        "ejecucion_cambiada": ejecucion_cambiada,
+        "celdas_nuevas": sum((total_nuevo - total_anterior).values()),
+        "celdas_eliminadas": sum((total_anterior - total_nuevo).values()),
+    }
+
+
+def ultima_entrega(carpeta_soluciones, nombre):
+    """
+    Última entrega guardada de un alumno ({nombre}_{AAAA-MM-DD}.ipynb).
+
+    Debe llamarse antes de guardar la nueva versión: una reentrega el mismo día
+    sobrescribe el fichero.
+
+    Args:
+        carpeta_soluciones: Carpeta soluciones_alumnos/<capitulo>
+        nombre: Nombre del alumno
+
+    Returns:
+        tuple: (ruta, notebook) o (None, None) si no hay entregas anteriores legibles
+    """
+    propio = re.compile(rf"{re.escape(nombre)}_\d{{4}}-\d{{2}}-\d{{2}}\.ipynb$", re.IGNORECASE)
+    try:
+        ficheros = sorted(f for f in os.listdir(carpeta_soluciones) if propio.match(f))
+    except OSError:
+        return None, None
+    if not ficheros:
+        return None, None
+
+    ruta = os.path.join(carpeta_soluciones, ficheros[-1])
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return ruta, json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"No se pudo leer la entrega anterior {ruta}: {e}")
+        return None, None
+
+
+def evaluacion_desde_fila(fila):
+    """Convierte una fila de evaluacion_originalidad.csv al formato de evaluar_respuestas_ia()."""
+    evaluacion = {componente: float(fila.get(componente.capitalize(), 0)) for componente in COMPONENTES}
+    evaluacion["nota_total"] = float(fila.get("Nota_Total", round(sum(evaluacion.values()), 1)))
+    evaluacion["comentario"] = str(fila.get("Comentario", ""))
+    evaluacion["puntos_fuertes"] = []
+    evaluacion["areas_mejora"] = []
+    return evaluacion
+
+
+def extras_desde_fila(fila):
+    """Columnas adicionales (Originalidad_Prosa, Graficas_Reutilizadas...) de una fila guardada."""
+    return {columna: valor for columna, valor in fila.items() if columna not in _COLUMNAS_EVALUACION}
+
+
+def planificar_reentrega(notebook_nuevo, notebook_anterior, fila_anterior, version_prompt=None):
+    """
+    Decide cuánto hay que volver a evaluar en una entrega.
+
+    Solo se reutiliza una evaluación anterior válida: no si fue una copia
+    directa, si la IA no pudo evaluarla o si se puso con otra versión de la
+    rúbrica (columna Version_Prompt; las filas sin ella se dan por buenas).
+    Una nota del triaje estático nunca se reutiliza ni se combina con notas de
+    la IA: se evalúa todo otra vez. Tampoco si solo cambian las celdas
+    ejecutadas o los errores: la nota guardada ya lleva el límite del triaje.
+
+    Args:
+        notebook_nuevo: Notebook recién subido
+        notebook_anterior: Última entrega guardada del alumno (o None)
+        fila_anterior: Última fila de evaluación del alumno (ver cargar_ultima_evaluacion)
+        version_prompt: Versión actual de la rúbrica del capítulo (ver plantillas_prompt.version_prompt)
+
+    Returns:
+        dict: {
+            'modo': 'completa' | 'parcial' | 'sin_cambios',
+            'componentes': [componentes a volver a puntuar],
+            'cambios': resultado de comparar_entregas() o None
+        }
+    """
+    columnas = [componente.capitalize() for componente in COMPONENTES]
+    reutilizable = (
+        notebook_anterior is not None
+        and fila_anterior is not None
+        and fila_anterior.get("Originalidad") != "Copia directa"
+        and fila_anterior.get("Comentario") not in (COMENTARIO_SIN_EVALUAR, COMENTARIO_PENDIENTE)
+        and all(columna in fila_anterior for columna in columnas)
+        and (version_prompt is None or fila_anterior.get("Version_Prompt", version_prompt) == version_prompt)
+    )
+    if not reutilizable:
+        return {"modo": "completa", "componentes": list(COMPONENTES), "cambios": None}
+
+    cambios = comparar_entregas(notebook_anterior, notebook_nuevo)
+    if fila_anterior.get("Origen") == ORIGEN_TRIAJE or cambios["ejecucion_cambiada"]:
+        modo = "completa"
+    elif cambios["sin_cambios"]:
+        modo = "sin_cambios"
+    elif len(cambios["componentes"]) == len(COMPONENTES):
+        modo = "completa"
+    else:
+        modo = "parcial"
+    componentes = list(COMPONENTES) if modo == "completa" else cambios["componentes"]
+    return {"modo": modo, "componentes": componentes, "cambios": cambios}
+
+
+async def reevaluar_componentes_async(notebook_usuario, enunciado, evaluacion_anterior, componentes):
+    """
+    Vuelve a puntuar solo algunos componentes y los combina con la evaluación anterior.
+
+    Si la IA falla se hace la evaluación completa (con su evaluación por defecto).
+
+    Args:
+        notebook_usuario: Nueva entrega
+        enunciado: Enunciado y criterios del capítulo
+        evaluacion_anterior: Evaluación anterior (ver evaluacion_desde_fila)
+        componentes: Componentes a volver a puntuar
+
+    Returns:
+        dict: Evaluación completa con nota_total = suma de componentes
+    """
+    parcial = await evaluar_con_groq_async(notebook_usuario, enunciado, componentes)
+    if not parcial:
+        return await evaluar_respuestas_ia_async(notebook_usuario, enunciado)
+
+    evaluacion = dict(evaluacion_anterior)
+    for componente in componentes:
+        evaluacion[componente] = parcial.get(componente, evaluacion_anterior[componente])
+    evaluacion["nota_total"] = round(sum(evaluacion[c] for c in COMPONENTES), 1)
+    evaluacion["comentario"] = parcial.get("comentario") or evaluacion_anterior["comentario"]
+    evaluacion["puntos_fuertes"] = parcial.get("puntos_fuertes", [])
+    evaluacion["areas_mejora"] = parcial.get("areas_mejora", [])
+    return evaluacion
+
+
+def reevaluar_componentes(notebook_usuario, enunciado, evaluacion_anterior, componentes):
+    """Versión síncrona de reevaluar_componentes_async."""
+    return ejecutar(reevaluar_componentes_async(notebook_usuario, enunciado, evaluacion_anterior, componentes))
@@ -0,0 +1,283 @@
+"""
+Lectura tolerante de las respuestas JSON del LLM
+Repara los fallos habituales del modelo (bloques ```json, comas finales,
+comillas simples, NaN/None/True, texto antes o después del objeto, respuesta
+cortada por max_tokens) y valida el resultado contra el esquema de la
+rúbrica, para no repetir una petición completa por un JSON mal formado.
+"""
+import re
+import json
+import math
+
+# Puntuación máxima de cada componente de la rúbrica
+PUNTUACION_MAXIMA = {
+    "exploracion": 2.0,
+    "preprocesamiento": 2.0,
+    "modelos": 3.0,
+    "evaluacion": 2.0,
+    "documentacion": 1.0,
+}
+
+# Cortes hacia atrás (en comas) que se prueban al completar una respuesta truncada
+MAX_RECORTES = 8
+
+_PATRON_BLOQUE = re.compile(r"```(?:json|JSON)?\s*(.*?)(?:```|$)", re.DOTALL)
+_PATRON_PALABRA = re.compile(r"[A-Za-z_]+")
+_PATRON_DOS_PUNTOS = re.compile(r"\s*:")
+_LITERALES = {
+    "NaN": "null", "Infinity": "null", "None": "null", "undefined": "null",
+    "True": "true", "False": "false",
+}
+# Coma o dos puntos colgantes y, dentro de un objeto, una clave sin valor
+_PATRON_COLGANTE = re.compile(r'[,:]\s*$')
+_PATRON_CLAVE_COLGANTE = re.compile(r'(?:[,:]\s*|,\s*"(?:[^"\\]|\\.)*"\s*:?\s*)$')
+# Número al final sin delimitador detrás: max_tokens pudo cortarlo (2.5 -> 2)
+_PATRON_NUMERO_CORTADO = re.compile(r'([:\[,]\s*)-?(?:\d[\d.eE+-]*)?$')
+
+
+def _normalizar(texto):
+    """
+    Recorre el objeto JSON desde la primera llave: comillas simples a dobles,
+    literales de Python/JavaScript a JSON y sin comas antes de } o ].
+
+    Returns:
+        tuple: (texto normalizado, cierres pendientes si la respuesta está truncada, dentro de cadena)
+    """
+    salida = []
+    pila = []
+    comilla = None
+    escape = False
+    i = texto.find("{")
+    if i == -1:
+        raise ValueError("No se encontró JSON en la respuesta")
+
+    while i < len(texto):
+        c = texto[i]
+        if comilla:
+            if escape:
+                escape = False
+                # \' no es un escape válido en JSON
+                salida.append("'" if c == "'" else "\\" + c)
+            elif c == "\\":
+                escape = True
+            elif c == comilla:
+                comilla = None
+                salida.append('"')
+            elif c == '"':
+                salida.append('\\"')
+            elif c == "\n":
+                salida.append("\\n")
+            else:
+                salida.append(c)
+        elif c in "\"'":
+            comilla = c
+            salida.append('"')
+        elif c in "{[":
+            pila.append("}" if c == "{" else "]")
+            salida.append(c)
+        elif c in "}]":
+            while salida and (salida[-1].isspace() or salida[-1] == ","):
+                salida.pop()
+            salida.append(c)
+            if pila:
+                pila.pop()
+            if not pila:
+                # Fin del objeto: se ignora el texto que venga después
+                break
+        elif c.isalpha() or c == "_":
+            palabra = _PATRON_PALABRA.match(texto, i).group()
+            i += len(palabra)
+            if _PATRON_DOS_PUNTOS.match(texto, i):
+                # Clave sin comillas
+                salida.append(f'"{palabra}"')
+            else:
+                salida.append(_LITERALES.get(palabra, palabra))
+            continue
+        elif c == "-" and texto.startswith("-Infinity", i):
+            salida.append("null")
+            i += len("-Infinity")
+            continue
+        else:
+            salida.append(c)
+        i += 1
+
+    if escape:
+        salida.append("\\\\")
+    return "".join(salida), "".join(reversed(pila)), comilla is not None
+
+
+def _completar(texto, cierres, en_cadena):
+    """Cierra una respuesta truncada (cadena abierta, número cortado, clave o coma colgante y llaves pendientes)."""
+    if en_cadena:
+        texto += '"'
+    else:
+        # El número se descarta como una clave colgante: el componente falta y se pide de nuevo
+        texto = _PATRON_NUMERO_CORTADO.sub(r"\1", texto)
+    patron = _PATRON_CLAVE_COLGANTE if cierres.startswith("}") else _PATRON_COLGANTE
+    return patron.sub("", texto.rstrip()) + cierres
+
+
+def reparar_json(texto):
+    """
+    Convierte la respuesta del modelo en un dict, reparándola si hace falta.
+
+    Args:
+        texto: Contenido del mensaje del modelo
+
+    Returns:
+        dict: Objeto JSON de la respuesta
+
+    Raises:
+        ValueError: Si no se puede recuperar un objeto JSON
+    """
+    bloque = _PATRON_BLOQUE.search(texto)
+    if bloque and "{" in bloque.group(1):
+        texto = bloque.group(1)
+
+    # Camino rápido: la respuesta ya es JSON válido
+    inicio = texto.find("{")
+    fin = texto.rfind("}") + 1
+    if inicio != -1 and fin > inicio:
+        try:
+            datos = json.loads(texto[inicio:fin])
+            if isinstance(datos, dict):
+                return datos
+        except ValueError:
+            pass
+
+    normalizado, cierres, en_cadena = _normalizar(texto)
+    for _ in range(MAX_RECORTES):
+        try:
+            datos = json.loads(_completar(normalizado, cierres, en_cadena) if cierres else normalizado)
+        except ValueError:
+            # Se descarta el último elemento incompleto y se vuelve a cerrar
+            corte = normalizado.rfind(",")
+            if corte <= 0 or not cierres:
+                break
+            normalizado, cierres, en_cadena = _normalizar(normalizado[:corte])
+            continue
+        if isinstance(datos, dict):
+            return datos
+        break
+    raise ValueError("JSON irrecuperable en la respuesta")
+
+
+def _puntuacion(valor, componente):
+    if isinstance(valor, str):
+        valor = valor.strip().replace(",", ".")
+    try:
+        valor = float(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{componente}' no es un número: {valor!r}")
+    if math.isnan(valor):
+        raise ValueError(f"'{componente}' no es un número")
+    # Fuera de rango se ajusta al límite: la nota es válida aunque el modelo se pase
+    return min(max(valor, 0.0), PUNTUACION_MAXIMA[componente])
+
+
+def _lista_textos(valor):
+    if valor is None:
+        return []
+    if isinstance(valor, str):
+        return [valor] if valor.strip() else []
+    if isinstance(valor, list):
+        return [str(v) for v in valor if v is not None and str(v).strip()]
+    return [str(valor)]
+
+
+def validar_evaluacion(datos, componentes):
+    """
+    Valida una evaluación contra el esquema de la rúbrica y la normaliza.
+
+    Args:
+        datos: dict devuelto por reparar_json()
+        componentes: Componentes que debe puntuar la respuesta
+
+    Returns:
+        dict: Evaluación con los componentes (float en su rango), comentario,
+            puntos_fuertes y areas_mejora
+
+    Raises:
+        ValueError: Si falta un componente o su nota no es un número
+    """
+    faltan = [componente for componente in componentes if componente not in datos]
+    if faltan:
+        raise ValueError(f"Faltan componentes: {', '.join(faltan)}")
+
+    evaluacion = dict(datos)
+    for componente in componentes:
+        evaluacion[componente] = _puntuacion(datos[componente], componente)
+    comentario = datos.get("comentario")
+    evaluacion["comentario"] = "" if comentario is None else str(comentario)
+    evaluacion["puntos_fuertes"] = _lista_textos(datos.get("puntos_fuertes"))
+    evaluacion["areas_mejora"] = _lista_textos(datos.get("areas_mejora"))
+    return evaluacion
+
+
+def extraer_evaluacion(texto, componentes):
+    """
+    Repara y valida la respuesta del modelo.
+
+    Args:
+        texto: Contenido del mensaje del modelo
+        componentes: Componentes que debe puntuar la respuesta
+
+    Returns:
+        dict: Evaluación validada (ver validar_evaluacion)
+
+    Raises:
+        ValueError: Si la respuesta no se puede recuperar o no cumple el esquema
+    """
+    return validar_evaluacion(reparar_json(texto), componentes)
+
+
+class LectorJSONIncremental:
+    """
+    Acumula los fragmentos de una respuesta en streaming y detecta cuándo se
+    cierra el objeto JSON raíz, para dejar de leer sin esperar al final.
+    """
+
+    def __init__(self):
+        self._partes = []
+        self._profundidad = 0
+        self._comilla = None
+        self._escape = False
+        self.completo = False
+
+    @property
+    def texto(self):
+        return "".join(self._partes)
+
+    def agregar(self, fragmento):
+        """
+        Añade un fragmento de la respuesta.
+
+        Args:
+            fragmento: Texto recibido
+
+        Returns:
+            bool: True si con este fragmento se ha cerrado el objeto raíz
+        """
+        self._partes.append(fragmento)
+        for c in fragmento:
+            if self._comilla:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == self._comilla:
+                    self._comilla = None
+            elif not self._profundidad:
+                # Texto antes del objeto (explicaciones, ```json...)
+                if c == "{":
+                    self._profundidad = 1
+            elif c in "\"'":
+                self._comilla = c
+            elif c in "{[":
+                self._profundidad += 1
+            elif c in "}]":
+                self._profundidad -= 1
+                if not self._profundidad:
+                    self.completo = True
+                    return True
+        return False
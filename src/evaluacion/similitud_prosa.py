@@ -0,0 +1,257 @@
+"""
+Similitud de la prosa (celdas markdown)
+La documentación es un criterio de la rúbrica, pero extraer_codigo_ejecutable
+descarta el markdown y la similitud del JSON lo mezcla con las salidas. Aquí se
+mide aparte: shingles de palabras, firmas MinHash y un índice LSH con la
+solución oficial y las entregas anteriores del capítulo.
+"""
+import os
+import re
+import json
+import zlib
+import logging
+import threading
+import unicodedata
+import numpy as np
+from utils.notebook_utils import extraer_contenido_notebook, CARPETA_SOLUCIONES_OFICIALES
+from config.capitulos import cache_capitulo
+
+logger = logging.getLogger(__name__)
+
+PALABRAS_POR_SHINGLE = 4
+NUM_PERMUTACIONES = 128
+# 32 bandas de 4 filas: pares con Jaccard ~0.4 ya coinciden en alguna banda con probabilidad > 0.5
+BANDAS_LSH = 32
+FILAS_POR_BANDA = NUM_PERMUTACIONES // BANDAS_LSH
+
+# Hashing multiplicativo (a*x + b mod 2^64) >> 32 con a impar: una "permutación" por columna
+_generador = np.random.default_rng(20251124)
+_COEF_A = _generador.integers(0, 2 ** 64, size=NUM_PERMUTACIONES, dtype=np.uint64) | np.uint64(1)
+_COEF_B = _generador.integers(0, 2 ** 64, size=NUM_PERMUTACIONES, dtype=np.uint64)
+_DESPLAZAMIENTO = np.uint64(32)
+
+_PATRON_PALABRA = re.compile(r"[^\W\d_]+|\d+")
+_lock = threading.Lock()
+
+
+def shingles_prosa(notebook):
+    """
+    Shingles de palabras del markdown de un notebook.
+
+    Se ignoran mayúsculas, acentos y la sintaxis de markdown (#, *, enlaces...).
+
+    Args:
+        notebook: Notebook en formato JSON
+
+    Returns:
+        set: Conjunto de shingles (cadenas de PALABRAS_POR_SHINGLE palabras)
+    """
+    texto = extraer_contenido_notebook(notebook)["markdown"]
+    texto = unicodedata.normalize("NFKD", texto)
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    palabras = _PATRON_PALABRA.findall(texto)
+    if len(palabras) < PALABRAS_POR_SHINGLE:
+        return {" ".join(palabras)} if palabras else set()
+    return {
+        " ".join(palabras[i:i + PALABRAS_POR_SHINGLE])
+        for i in range(len(palabras) - PALABRAS_POR_SHINGLE + 1)
+    }
+
+
+def firma_minhash(shingles):
+    """
+    Firma MinHash de un conjunto de shingles.
+
+    Args:
+        shingles: Conjunto de shingles
+
+    Returns:
+        np.ndarray: Vector uint64 de NUM_PERMUTACIONES valores (None si no hay shingles)
+    """
+    if not shingles:
+        return None
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles)
+    )
+    # El desbordamiento de uint64 es intencionado (aritmética módulo 2^64)
+    permutados = (hashes[:, None] * _COEF_A + _COEF_B) >> _DESPLAZAMIENTO
+    return permutados.min(axis=0)
+
+
+def similitud_firmas(firma_a, firma_b):
+    """Estimación de Jaccard: fracción de posiciones iguales en las dos firmas."""
+    if firma_a is None or firma_b is None:
+        return 0.0
+    return float(np.mean(firma_a == firma_b))
+
+
+class IndiceProsa:
+    """
+    Índice LSH de firmas MinHash de la prosa de varios notebooks.
+
+    Atributos:
+        documentos: Lista de {'nombre', 'tipo', 'firma'}
+    """
+
+    def __init__(self):
+        self.documentos = []
+        self._cubetas = [dict() for _ in range(BANDAS_LSH)]
+
+    def __len__(self):
+        return len(self.documentos)
+
+    def agregar(self, nombre, tipo, firma):
+        """
+        Añade una firma al índice (las firmas vacías se ignoran).
+
+        Args:
+            nombre: Identificador del documento
+            tipo: 'oficial', 'cohorte' o 'companero'
+            firma: Firma MinHash (ver firma_minhash)
+        """
+        if firma is None:
+            return
+        posicion = len(self.documentos)
+        self.documentos.append({"nombre": nombre, "tipo": tipo, "firma": firma})
+        for banda, cubetas in enumerate(self._cubetas):
+            clave = firma[banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA].tobytes()
+            cubetas.setdefault(clave, []).append(posicion)
+
+    def consultar(self, firma, excluir=None):
+        """
+        Documento más parecido entre los que comparten alguna banda con la firma.
+
+        Args:
+            firma: Firma MinHash de la consulta
+            excluir: Función nombre -> bool para descartar documentos (p. ej. del mismo alumno)
+
+        Returns:
+            dict: {'documento': str, 'tipo': str, 'similitud': float} o None
+        """
+        if firma is None:
+            return None
+        candidatos = set()
+        for banda, cubetas in enumerate(self._cubetas):
+            clave = firma[banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA].tobytes()
+            candidatos.update(cubetas.get(clave, ()))
+
+        mejor = None
+        for posicion in sorted(candidatos):
+            documento = self.documentos[posicion]
+            if excluir and excluir(documento["nombre"]):
+                continue
+            similitud = similitud_firmas(firma, documento["firma"])
+            if mejor is None or similitud > mejor["similitud"]:
+                mejor = {"documento": documento["nombre"], "tipo": documento["tipo"], "similitud": similitud}
+        return mejor
+
+
+def _ficheros_prosa(repo_dir, carpeta_capitulo):
+    """(ruta, tipo) de los notebooks contra los que se compara la prosa de un capítulo."""
+    carpetas = [
+        (os.path.join(repo_dir, CARPETA_SOLUCIONES_OFICIALES), "oficial"),
+        (os.path.join(repo_dir, "cohortes_anteriores"), "cohorte"),
+        (os.path.join(repo_dir, "soluciones_alumnos", carpeta_capitulo), "companero"),
+    ]
+    ficheros = []
+    for raiz, tipo in carpetas:
+        for directorio, subdirectorios, nombres in os.walk(raiz):
+            subdirectorios.sort()
+            for nombre in sorted(nombres):
+                if nombre.endswith(".ipynb"):
+                    ficheros.append((os.path.join(directorio, nombre), tipo))
+    return ficheros
+
+
+def obtener_indice_prosa(capitulo, repo_dir):
+    """
+    Índice LSH de la prosa para un capítulo, guardado en la caché del capítulo.
+
+    Solo se calculan las firmas de los notebooks nuevos o modificados desde la
+    última llamada; las demás se reutilizan.
+
+    Args:
+        capitulo: Configuración del capítulo (ver config.capitulos)
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        IndiceProsa: Índice del capítulo
+    """
+    cache = cache_capitulo(capitulo["clave"])
+    ficheros = []
+    for ruta, tipo in _ficheros_prosa(repo_dir, capitulo["carpeta"]):
+        try:
+            estado = os.stat(ruta)
+        except OSError:
+            continue
+        ficheros.append((ruta, tipo, estado.st_mtime_ns, estado.st_size))
+    version = tuple(ficheros)
+
+    with _lock:
+        if cache.get("prosa_version") == version:
+            return cache["indice_prosa"]
+        firmas = dict(cache.get("prosa_firmas", {}))
+
+    indice = IndiceProsa()
+    firmas_nuevas = {}
+    for ruta, tipo, mtime, tamano in ficheros:
+        clave = (ruta, mtime, tamano)
+        if clave in firmas:
+            firma = firmas[clave]
+        else:
+            try:
+                with open(ruta, encoding="utf-8") as f:
+                    firma = firma_minhash(shingles_prosa(json.load(f)))
+            except (OSError, ValueError) as e:
+                logger.warning(f"No se pudo leer {ruta}: {e}")
+                continue
+        firmas_nuevas[clave] = firma
+        indice.agregar(os.path.relpath(ruta, repo_dir), tipo, firma)
+
+    with _lock:
+        cache["prosa_version"] = version
+        cache["prosa_firmas"] = firmas_nuevas
+        cache["indice_prosa"] = indice
+    return indice
+
+
+def analizar_prosa(contenido_usuario, contenido_oficial, indice=None, nombre_alumno=None):
+    """
+    Similitud de la prosa del alumno con la oficial y con las entregas indexadas.
+
+    Args:
+        contenido_usuario: Notebook del estudiante en formato JSON
+        contenido_oficial: Notebook oficial en formato JSON
+        indice: IndiceProsa del capítulo (opcional)
+        nombre_alumno: Si se indica, se excluyen del índice sus propias entregas
+
+    Returns:
+        dict: {
+            'shingles': int,                 # 0 si el notebook no tiene markdown
+            'similitud_oficial': float,      # Jaccard estimado con el oficial
+            'fuente': dict | None,           # entrega indexada más parecida
+            'similitud_prosa': float,        # máximo de las anteriores
+            'originalidad_prosa': float|None # 1 - similitud_prosa (None sin markdown)
+        }
+    """
+    shingles = shingles_prosa(contenido_usuario)
+    firma = firma_minhash(shingles)
+    similitud_oficial = similitud_firmas(firma, firma_minhash(shingles_prosa(contenido_oficial)))
+
+    fuente = None
+    if indice is not None and firma is not None:
+        excluir = None
+        if nombre_alumno:
+            # Las entregas se guardan como {nombre}_{AAAA-MM-DD}.ipynb
+            propio = re.compile(rf"{re.escape(nombre_alumno)}_\d{{4}}-\d{{2}}-\d{{2}}\.ipynb$")
+            excluir = lambda nombre: propio.match(os.path.basename(nombre)) is not None
+        fuente = indice.consultar(firma, excluir)
+
+    similitud_prosa = max(similitud_oficial, fuente["similitud"] if fuente else 0.0)
+    return {
+        "shingles": len(shingles),
+        "similitud_oficial": similitud_oficial,
+        "fuente": fuente,
+        "similitud_prosa": similitud_prosa,
+        "originalidad_prosa": 1.0 - similitud_prosa if shingles else None,
+    }
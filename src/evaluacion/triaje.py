@@ -0,0 +1,177 @@
+"""
+Triaje estático antes de la evaluación con IA
+El análisis de completitud de validador_estricto se hace en local antes de
+llamar al LLM. Los notebooks claramente incompletos (sin modelos, sin
+preprocesamiento o con menos del 30% de celdas ejecutadas) reciben una nota
+determinista al instante sin gastar una petición; al resto se le aplica la
+nota máxima sugerida sobre la nota de la IA.
+
+Uso manual (desde src/), peticiones ahorradas por capítulo:
+    python -m evaluacion.triaje [repo_dir]
+"""
+import os
+import sys
+import pandas as pd
+from evaluacion.evaluacion_ia import ORIGEN_TRIAJE
+from evaluacion.reentrega import PATRONES_COMPONENTE
+from evaluacion.validador_estricto import (
+    analizar_completitud_notebook, aplicar_penalizaciones, generar_informe_completitud
+)
+from utils.notebook_utils import extraer_contenido_notebook
+
+# Por debajo de esta fracción de celdas de código ejecutadas no se llama a la IA
+MIN_FRACCION_EJECUTADAS = 0.3
+
+# Nota estática por componente: (coincidencias mínimas, puntos), de mayor a menor.
+# Es conservadora: sin la IA no se puede valorar la calidad, solo la presencia.
+ESCALAS_ESTATICAS = {
+    "exploracion": ((6, 1.5), (3, 1.0), (1, 0.5)),
+    "preprocesamiento": ((4, 1.5), (2, 1.0), (1, 0.5)),
+    "modelos": ((2, 1.0), (1, 0.5)),
+    "evaluacion": ((2, 1.0), (1, 0.5)),
+}
+# Celdas de markdown con texto
+ESCALA_DOCUMENTACION = ((3, 0.5), (1, 0.3))
+
+
+def _puntos(coincidencias, escala):
+    for minimo, puntos in escala:
+        if coincidencias >= minimo:
+            return puntos
+    return 0.0
+
+
+def motivos_sin_ia(analisis):
+    """
+    Motivos por los que un notebook no necesita la IA (lista vacía si sí la necesita).
+
+    Args:
+        analisis: Resultado de analizar_completitud_notebook()
+
+    Returns:
+        list: Motivos legibles
+    """
+    motivos = []
+    if not analisis["tiene_modelos"]:
+        motivos.append("Sin modelos de ML implementados")
+    if not analisis["tiene_preprocesamiento"]:
+        motivos.append("Sin preprocesamiento adecuado")
+    total = analisis["total_celdas"]
+    if total and analisis["celdas_ejecutadas"] / total < MIN_FRACCION_EJECUTADAS:
+        motivos.append(f"Menos del {MIN_FRACCION_EJECUTADAS:.0%} de celdas ejecutadas")
+    return motivos
+
+
+def evaluacion_estatica(notebook, analisis, motivos):
+    """
+    Nota determinista de un notebook a partir de lo que se detecta en su código.
+
+    Args:
+        notebook: Notebook en formato JSON
+        analisis: Resultado de analizar_completitud_notebook()
+        motivos: Resultado de motivos_sin_ia()
+
+    Returns:
+        dict: Evaluación con el formato de evaluar_respuestas_ia(), limitada a la nota máxima sugerida
+    """
+    contenido = extraer_contenido_notebook(notebook)
+    evaluacion = {}
+    for componente, escala in ESCALAS_ESTATICAS.items():
+        coincidencias = {m.casefold() for m in PATRONES_COMPONENTE[componente].findall(contenido["codigo"])}
+        evaluacion[componente] = _puntos(len(coincidencias), escala)
+    if not analisis["tiene_modelos"]:
+        evaluacion["modelos"] = 0.0
+    if not analisis["tiene_preprocesamiento"]:
+        evaluacion["preprocesamiento"] = 0.0
+    if not analisis["tiene_evaluacion"]:
+        evaluacion["evaluacion"] = 0.0
+
+    celdas_markdown = sum(
+        1 for celda in notebook.get("cells", [])
+        if celda.get("cell_type") == "markdown" and "".join(celda.get("source", [])).strip()
+    )
+    evaluacion["documentacion"] = _puntos(celdas_markdown, ESCALA_DOCUMENTACION)
+
+    evaluacion["nota_total"] = round(sum(evaluacion.values()), 1)
+    evaluacion["comentario"] = (
+        f"Evaluación automática sin IA: el notebook está incompleto ({'; '.join(motivos)}). "
+        "Complétalo y vuelve a entregarlo para que lo evalúe la IA."
+    )
+    evaluacion["puntos_fuertes"] = []
+    evaluacion["areas_mejora"] = list(motivos)
+    return aplicar_penalizaciones(evaluacion, analisis)
+
+
+def triaje_estatico(notebook, ejecucion=None):
+    """
+    Decide si un notebook necesita la IA.
+
+    Args:
+        notebook: Notebook en formato JSON
+        ejecucion: Resultado de ejecucion_notebooks.verificar_ejecucion_async() si se ha verificado
+
+    Returns:
+        dict: {
+            'analisis': resultado de analizar_completitud_notebook(),
+            'motivos': [motivos para no llamar a la IA],
+            'evaluacion': evaluación estática si no hace falta la IA, o None,
+            'informe': texto de generar_informe_completitud()
+        }
+    """
+    analisis = analizar_completitud_notebook(notebook, ejecucion)
+    motivos = motivos_sin_ia(analisis)
+    return {
+        "analisis": analisis,
+        "motivos": motivos,
+        "evaluacion": evaluacion_estatica(notebook, analisis, motivos) if motivos else None,
+        "informe": generar_informe_completitud(analisis),
+    }
+
+
+def limitar_evaluacion(evaluacion, triaje):
+    """Aplica la nota máxima sugerida por el análisis estático a una evaluación de la IA."""
+    return aplicar_penalizaciones(evaluacion, triaje["analisis"])
+
+
+def peticiones_ahorradas(repo_dir):
+    """
+    Evaluaciones resueltas por el triaje (sin petición a la IA) por capítulo.
+
+    Las reentregas sin cambios no cuentan: tampoco habrían llamado a la IA.
+
+    Args:
+        repo_dir: Directorio del repositorio
+
+    Returns:
+        pd.DataFrame: Columnas Capítulo, Evaluaciones, Sin_IA (una fila por capítulo)
+    """
+    csv_path = os.path.join(repo_dir, "evaluaciones", "evaluacion_originalidad.csv")
+    try:
+        df_eval = pd.read_csv(csv_path)
+    except (FileNotFoundError, pd.errors.EmptyDataError):
+        return pd.DataFrame(columns=["Capítulo", "Evaluaciones", "Sin_IA"])
+
+    origen = df_eval["Origen"] if "Origen" in df_eval else pd.Series("", index=df_eval.index)
+    reevaluacion = df_eval["Reevaluacion"] if "Reevaluacion" in df_eval else pd.Series("", index=df_eval.index)
+    df_eval["Sin_IA"] = (origen == ORIGEN_TRIAJE) & (reevaluacion != "sin_cambios")
+    return (
+        df_eval.groupby("Capítulo")
+        .agg(Evaluaciones=("Nombre", "size"), Sin_IA=("Sin_IA", "sum"))
+        .reset_index()
+    )
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    repo_dir = argv[0] if argv else "repo_temp"
+    resumen = peticiones_ahorradas(repo_dir)
+    if resumen.empty:
+        print("No hay evaluaciones")
+        return 0
+    for fila in resumen.itertuples(index=False):
+        print(f"{fila[0]}: {fila.Sin_IA} de {fila.Evaluaciones} evaluaciones sin petición a la IA")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
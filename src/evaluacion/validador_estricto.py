@@ -4,12 +4,15 @@ Sistema de validación y penalización estricta para notebooks
 import re
 
 
-def analizar_completitud_notebook(notebook):
+def analizar_completitud_notebook(notebook, ejecucion=None):
     """
     Analiza la completitud real del notebook y aplica penalizaciones.
     
     Args:
         notebook: Notebook en formato JSON
+        ejecucion: Resultado de ejecucion_notebooks.verificar_ejecucion_async(); si se
+            indica, las celdas ejecutadas y los errores salen de la ejecución real y no
+            de las salidas guardadas en el notebook
         
     Returns:
         dict: {
@@ -18,6 +21,8 @@ def analizar_completitud_notebook(notebook):
             'tiene_evaluacion': bool,
             'celdas_ejecutadas': int,
             'tiene_errores': bool,
+            'ejecucion_verificada': bool,
+            'tiempos_celdas': list (segundos por celda, solo con ejecución verificada),
             'nota_maxima_sugerida': float,
             'razones': list
         }
@@ -30,6 +35,8 @@ def analizar_completitud_notebook(notebook):
         'celdas_ejecutadas': 0,
         'total_celdas': 0,
         'tiene_errores': False,
+        'ejecucion_verificada': False,
+        'tiempos_celdas': [],
         'nota_maxima_sugerida': 10.0,
         'razones': []
     }
@@ -54,6 +61,27 @@ def analizar_completitud_notebook(notebook):
     
     codigo_texto = '\n'.join(codigo_completo)
     
+    # Ejecución real: sustituye a lo que declaran las salidas guardadas. Si faltan
+    # módulos en el entorno de ejecución el resultado no es concluyente y no se usa
+    if ejecucion and ejecucion['total_celdas'] == analisis['total_celdas']:
+        if ejecucion['modulos_ausentes']:
+            analisis['razones'].append(
+                f"Ejecución no verificada: faltan módulos ({', '.join(ejecucion['modulos_ausentes'])})"
+            )
+        else:
+            salidas_sin_errores = not analisis['tiene_errores']
+            analisis['ejecucion_verificada'] = True
+            analisis['celdas_ejecutadas'] = ejecucion['celdas_ok']
+            analisis['tiene_errores'] = not ejecucion['ok']
+            analisis['tiempos_celdas'] = [celda['segundos'] or 0.0 for celda in ejecucion['celdas']]
+            if ejecucion['primer_error']:
+                primer_error = ejecucion['primer_error']
+                analisis['razones'].append(
+                    f"No se ejecuta: celda {primer_error['celda'] + 1} ({primer_error['error']})"
+                )
+                if salidas_sin_errores:
+                    analisis['razones'].append("Las salidas guardadas no coinciden con la ejecución real")
+    
     # Detectar modelos de ML
     patrones_modelos = [
         r'LinearRegression\(',
@@ -252,7 +280,15 @@ def generar_informe_completitud(analisis):
     if analisis['total_celdas'] > 0:
         porcentaje = (analisis['celdas_ejecutadas'] / analisis['total_celdas']) * 100
         informe += f"\n📈 Celdas ejecutadas: {analisis['celdas_ejecutadas']}/{analisis['total_celdas']} ({porcentaje:.0f}%)\n"
-    
+
+    if analisis.get('ejecucion_verificada'):
+        tiempos = analisis['tiempos_celdas']
+        informe += f"🧪 Ejecución verificada en un entorno aislado ({sum(tiempos):.1f} s"
+        if tiempos:
+            lenta = max(range(len(tiempos)), key=tiempos.__getitem__)
+            informe += f"; celda más lenta: {lenta + 1}, {tiempos[lenta]:.1f} s"
+        informe += ")\n"
+
     if analisis['tiene_errores']:
         informe += "⚠️ Se detectaron errores de ejecución en el código\n"
     
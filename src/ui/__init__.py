@@ -1,16 +1,30 @@
 """Componentes de interfaz de usuario"""
 from .ui_components import (
     mostrar_header,
+    mostrar_header_capitulos,
+    mostrar_plazo,
     mostrar_resultado_originalidad,
+    mostrar_alineacion_celdas,
+    mostrar_originalidad_prosa,
+    mostrar_imagenes_reutilizadas,
     mostrar_evaluacion_ia,
     mostrar_tabla_entregas,
+    obtener_tabla_entregas,
+    preparar_tabla_entregas,
     mostrar_mensaje_exito
 )
 
 __all__ = [
     'mostrar_header',
+    'mostrar_header_capitulos',
+    'mostrar_plazo',
     'mostrar_resultado_originalidad',
+    'mostrar_alineacion_celdas',
+    'mostrar_originalidad_prosa',
+    'mostrar_imagenes_reutilizadas',
     'mostrar_evaluacion_ia',
     'mostrar_tabla_entregas',
+    'obtener_tabla_entregas',
+    'preparar_tabla_entregas',
     'mostrar_mensaje_exito',
 ]
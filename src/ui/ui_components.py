@@ -3,10 +3,18 @@ Componentes de la interfaz de usuario con Streamlit
 Versión actualizada con soporte para emojis del Hall of Fame
 CORREGIDA: Sin st.stop() en mostrar_header
 """
+import threading
 import streamlit as st
 from datetime import datetime
 import pytz
 
+# Filas de la tabla de entregas que se envían al navegador de una vez
+FILAS_POR_PAGINA = 50
+MAX_TABLAS_CACHE = 8
+
+_lock_tablas = threading.Lock()
+_cache_tablas = {}
+
 
 def mostrar_header(capitulo, fecha_limite):
     """
@@ -16,12 +24,38 @@ def mostrar_header(capitulo, fecha_limite):
         capitulo: Nombre del capítulo
         fecha_limite: Fecha límite de entrega
     """
+    st.title(f"Subida de prácticas - {capitulo}")
+    mostrar_plazo(fecha_limite)
+
+
+def mostrar_header_capitulos(capitulos):
+    """
+    Muestra el encabezado cuando hay uno o varios capítulos abiertos.
+    
+    Args:
+        capitulos: Lista de configuraciones de capítulo (ver config.capitulos)
+    """
+    if len(capitulos) == 1:
+        mostrar_header(capitulos[0]["nombre"], capitulos[0]["fecha_limite"])
+        return
+    
+    st.title("Subida de prácticas")
+    for capitulo in capitulos:
+        st.markdown(f"**{capitulo['nombre']}** (`{capitulo['clave']}-nombre.zip`)")
+        mostrar_plazo(capitulo["fecha_limite"])
+
+
+def mostrar_plazo(fecha_limite):
+    """
+    Muestra el contador de días hasta la fecha límite.
+    
+    Args:
+        fecha_limite: Fecha límite de entrega
+    """
     madrid_tz = pytz.timezone('Europe/Madrid')
     hoy = datetime.now(madrid_tz)
     dias_restantes = (fecha_limite - hoy).days
     
-    st.title(f"Subida de prácticas - {capitulo}")
-    
     if dias_restantes > 1:
         st.info(f"Quedan **{dias_restantes} días** para entregar la práctica.")
     elif dias_restantes == 1:
@@ -36,23 +70,186 @@ def mostrar_header(capitulo, fecha_limite):
 
 
 
-def mostrar_resultado_originalidad(originalidad, similitud):
+def _texto_similitud(similitud):
+    """" (Similitud: x%)" o nada si no se calculó exacta (None, o NaN leído del CSV)."""
+    if similitud is None or similitud != similitud:
+        return ""
+    return f" (Similitud: {similitud*100:.1f}%)"
+
+
+def mostrar_resultado_originalidad(originalidad, similitud, alineacion=None, fuente=None):
     """
     Muestra el resultado de la evaluación de originalidad.
     
     Args:
         originalidad: Nivel de originalidad
-        similitud: Puntuación de similitud (0.0 a 1.0)
+        similitud: Puntuación de similitud (0.0 a 1.0, o None si no se calculó exacta)
+        alineacion: Alineación por celdas (ver evaluacion.alineacion_celdas), opcional
+        fuente: Fuente más parecida del corpus de referencia, opcional
     """
     if originalidad == "Copia directa":
-        st.error(f"🚫 **COPIA DIRECTA DETECTADA** (Similitud: {similitud*100:.1f}%)")
+        st.error(f"🚫 **COPIA DIRECTA DETECTADA**{_texto_similitud(similitud)}")
         st.warning("Tu notebook es idéntico al oficial. No se evaluará.")
     elif originalidad == "Copia modificada":
-        st.warning(f"⚠️ **Copia con modificaciones** (Similitud: {similitud*100:.1f}%)")
+        st.warning(f"⚠️ **Copia con modificaciones**{_texto_similitud(similitud)}")
     elif originalidad == "Inspirado":
-        st.info(f"💡 **Trabajo inspirado** (Similitud: {similitud*100:.1f}%)")
+        st.info(f"💡 **Trabajo inspirado**{_texto_similitud(similitud)}")
+    else:
+        st.success(f"🎉 **Trabajo original**{_texto_similitud(similitud)}")
+    
+    if fuente:
+        tipo = "solución oficial" if fuente["tipo"] == "oficial" else "entrega de otra cohorte"
+        st.caption(
+            f"📚 Fuente más parecida del corpus: `{fuente['documento']}` ({tipo}), "
+            f"{fuente['similitud']*100:.1f}% de huellas compartidas"
+        )
+    
+    if alineacion:
+        mostrar_alineacion_celdas(alineacion)
+
+
+def mostrar_originalidad_prosa(prosa):
+    """
+    Muestra la originalidad de la prosa (celdas markdown).
+    
+    Args:
+        prosa: Resultado de analizar_prosa()
+    """
+    if prosa["originalidad_prosa"] is None:
+        st.caption("📝 El notebook no tiene celdas de texto: no se puede medir la originalidad de la documentación.")
+        return
+    
+    mensaje = f"📝 Originalidad de la documentación: **{prosa['originalidad_prosa']*100:.0f}%**"
+    fuente = prosa["fuente"]
+    if fuente and fuente["similitud"] >= prosa["similitud_oficial"]:
+        mensaje += f" (texto más parecido: `{fuente['documento']}`, {fuente['similitud']*100:.0f}%)"
+    elif prosa["similitud_oficial"] > 0:
+        mensaje += f" ({prosa['similitud_oficial']*100:.0f}% coincide con el notebook oficial)"
+    
+    if prosa["originalidad_prosa"] < 0.5:
+        st.warning(mensaje)
     else:
-        st.success(f"🎉 **Trabajo original** (Similitud: {similitud*100:.1f}%)")
+        st.caption(mensaje)
+
+
+def mostrar_imagenes_reutilizadas(imagenes):
+    """
+    Muestra las gráficas de salida que coinciden con otras ya entregadas o con las oficiales.
+    
+    Args:
+        imagenes: Resultado de analizar_imagenes()
+    """
+    reutilizadas = imagenes["reutilizadas"]
+    if not reutilizadas:
+        if imagenes["imagenes"]:
+            st.caption(f"🖼️ Ninguna de las {imagenes['imagenes']} gráficas coincide con otras ya entregadas.")
+        return
+    
+    st.warning(
+        f"🖼️ {len(reutilizadas)} de {imagenes['imagenes']} gráficas coinciden con gráficas ya existentes"
+    )
+    with st.expander("🔎 Ver gráficas coincidentes"):
+        filas = [
+            {
+                "Celda": r["celda"] + 1,
+                "Coincide con": r["documento"],
+                "Celda origen": r["celda_fuente"] + 1,
+                "Tipo": "Idéntica" if r["exacta"] else f"Casi idéntica ({r['distancia']} bits)",
+            }
+            for r in reutilizadas
+        ]
+        st.dataframe(filas, use_container_width=True, hide_index=True)
+
+
+def mostrar_reentrega(plan):
+    """
+    Indica qué se ha vuelto a evaluar en una reentrega.
+    
+    Args:
+        plan: Resultado de planificar_reentrega()
+    """
+    cambios = plan["cambios"]
+    if cambios is None:
+        return
+    if plan["modo"] == "sin_cambios":
+        st.info("♻️ El notebook no ha cambiado respecto a tu entrega anterior: se mantiene la evaluación.")
+        return
+    
+    detalle = f"{cambios['celdas_nuevas']} celdas nuevas o modificadas, {cambios['celdas_eliminadas']} eliminadas"
+    if cambios["ejecucion_cambiada"]:
+        detalle += ", cambia la ejecución"
+    if plan["modo"] == "parcial":
+        st.info(f"♻️ Reentrega ({detalle}): se vuelve a evaluar solo {', '.join(plan['componentes'])}.")
+    else:
+        st.caption(f"♻️ Reentrega ({detalle}): evaluación completa.")
+
+
+def mostrar_triaje(triaje):
+    """
+    Indica que la nota se ha calculado sin la IA porque el notebook está incompleto.
+    
+    Args:
+        triaje: Resultado de triaje_estatico()
+    """
+    st.warning(f"⚡ Notebook incompleto ({'; '.join(triaje['motivos'])}): nota calculada sin IA.")
+    with st.expander("📋 Ver análisis de completitud"):
+        st.markdown(triaje["informe"])
+
+
+def mostrar_nota_provisional(prediccion):
+    """
+    Muestra la nota estimada por el predictor local mientras responde la IA.
+    
+    Args:
+        prediccion: Resultado de predictor_nota.predecir() (o None)
+        
+    Returns:
+        Contenedor de Streamlit para quitar el aviso cuando llegue la nota de la IA (None si no hay predicción)
+    """
+    if not prediccion:
+        return None
+    aviso = st.empty()
+    aviso.info(
+        f"🔮 Nota provisional estimada: **{prediccion['nota_total']:.1f}/10**. "
+        "La nota definitiva es la de la IA, que se mostrará en cuanto termine."
+    )
+    return aviso
+
+
+def mostrar_evaluacion_pendiente():
+    """Indica que la IA no está disponible y la nota es provisional."""
+    st.warning(
+        "⏳ La IA no está disponible ahora mismo. Tu entrega se ha guardado con una nota provisional "
+        "y se volverá a evaluar automáticamente en cuanto la IA responda."
+    )
+
+
+def mostrar_alineacion_celdas(alineacion):
+    """
+    Muestra qué celdas son idénticas, modificadas o nuevas respecto al oficial.
+    
+    Args:
+        alineacion: Resultado de alinear_celdas()
+    """
+    resumen = alineacion["resumen"]
+    st.caption(
+        f"Celdas: 🟥 {resumen['identica']} idénticas · 🟧 {resumen['modificada']} modificadas · "
+        f"🟩 {resumen['nueva']} nuevas ({alineacion['fraccion_copiada']*100:.0f}% procedentes del oficial)"
+    )
+    
+    etiquetas = {"identica": "🟥 Idéntica", "modificada": "🟧 Modificada", "nueva": "🟩 Nueva"}
+    with st.expander("🔎 Ver detalle por celda"):
+        filas = [
+            {
+                "Celda": celda["indice"] + 1,
+                "Tipo": "Código" if celda["tipo"] == "code" else "Markdown",
+                "Estado": etiquetas[celda["estado"]],
+                "Celda oficial": "" if celda["celda_oficial"] is None else celda["celda_oficial"] + 1,
+                "Similitud": f"{celda['similitud']*100:.0f}%",
+            }
+            for celda in alineacion["celdas"]
+        ]
+        st.dataframe(filas, use_container_width=True, hide_index=True)
 
 
 def mostrar_evaluacion_ia(evaluacion_ia, originalidad):
@@ -119,52 +316,122 @@ def mostrar_evaluacion_ia(evaluacion_ia, originalidad):
         st.warning("⚠️ El trabajo necesita mejoras significativas.")
 
 
-def mostrar_tabla_entregas(df, columna, hall):
+def _marcar_entrega(nombre, estado, hall):
+    """
+    Determina el emoji a mostrar según el estado y Hall of Fame.
+    
+    Prioridad:
+    1. Si ya tiene emoji especial del cierre (🏆📝🔍🤖), mantenerlo
+    2. Si aún no se cerró, usar Hall of Fame temporal
+    3. Si no está en Hall of Fame, usar ✅ o ❌
+    """
+    # Si ya tiene emoji especial del cierre, lo mantine
+    emojis_especiales = ["🏆", "📝", "🔍", "🤖"]
+    if estado in emojis_especiales:
+        return estado
+    
+    # Si no está cerrado aún, usa la lógica temporal del Hall of Fame
+    if estado == "✅":
+        # Verificar si está en el Hall of Fame temporal
+        if hall.get("mejor") == nombre:
+            return "🏆"
+        elif hall.get("documentado") == nombre:
+            return "📝"
+        elif hall.get("explorador") == nombre:
+            return "🔍"
+        elif hall.get("modelador") == nombre:
+            return "🤖"
+        else:
+            return "✅"
+    return "❌"
+
+
+def preparar_tabla_entregas(df, halls, indice=None):
+    """
+    Genera la tabla de entregas ya decorada con los emojis del Hall of Fame.
+    
+    Args:
+        df: DataFrame con el registro de entregas (no se modifica)
+        halls: Diccionario {columna del capítulo: Hall of Fame del capítulo}
+        indice: IndiceNombres del registro (opcional, reutiliza los nombres ya normalizados)
+        
+    Returns:
+        pd.DataFrame: Tabla lista para mostrar
+    """
+    # fillna ya devuelve un DataFrame nuevo: no hace falta copiar antes
+    df_show = df.fillna("❌")
+    if indice is not None:
+        claves = indice.claves
+    else:
+        claves = [str(n).lower() for n in df_show["Nombre"]]
+    for columna, hall in halls.items():
+        df_show[columna] = [
+            _marcar_entrega(clave, estado, hall)
+            for clave, estado in zip(claves, df_show[columna])
+        ]
+    return df_show
+
+
+def obtener_tabla_entregas(df, halls, indice=None, version=None):
+    """
+    Devuelve la tabla decorada, reutilizándola mientras no cambie su versión.
+    
+    La caché es compartida entre sesiones: con el registro y las evaluaciones
+    sin cambios, cada recarga de la página solo cuesta una búsqueda en ella.
+    
+    Args:
+        df: DataFrame con el registro de entregas
+        halls: Diccionario {columna: Hall of Fame} o función sin argumentos que lo
+            calcula (solo se llama si la tabla no está en caché)
+        indice: IndiceNombres del registro (opcional)
+        version: Clave de la caché, p. ej. (versión del registro, versión de las
+            evaluaciones, columnas). Si es None no se usa caché.
+            
+    Returns:
+        pd.DataFrame: Tabla lista para mostrar (no modificar, puede estar compartida)
+    """
+    if version is not None:
+        with _lock_tablas:
+            tabla = _cache_tablas.get(version)
+        if tabla is not None:
+            return tabla
+    
+    if callable(halls):
+        halls = halls()
+    tabla = preparar_tabla_entregas(df, halls, indice)
+    
+    if version is not None:
+        with _lock_tablas:
+            _cache_tablas[version] = tabla
+            while len(_cache_tablas) > MAX_TABLAS_CACHE:
+                _cache_tablas.pop(next(iter(_cache_tablas)))
+    return tabla
+
+
+def mostrar_tabla_entregas(df, halls, indice=None, version=None):
     """
     Muestra la tabla de entregas con emojis según el Hall of Fame.
+    Con muchos miembros se pagina para no enviar el registro entero al navegador.
     
     Args:
         df: DataFrame con el registro de entregas
-        columna: Columna del capítulo actual
-        hall: Diccionario del Hall of Fame
+        halls: Diccionario {columna del capítulo: Hall of Fame del capítulo}
+            o función sin argumentos que lo calcula
+        indice: IndiceNombres del registro (opcional, reutiliza los nombres ya normalizados)
+        version: Clave de caché de la tabla (ver obtener_tabla_entregas)
     """
-    def marcar_entrega(nombre, estado):
-        """
-        Determina el emoji a mostrar según el estado y Hall of Fame.
-        
-        Prioridad:
-        1. Si ya tiene emoji especial del cierre (🏆📝🔍🤖), mantenerlo
-        2. Si aún no se cerró, usar Hall of Fame temporal
-        3. Si no está en Hall of Fame, usar ✅ o ❌
-        """
-        # Si ya tiene emoji especial del cierre, lo mantine
-        emojis_especiales = ["🏆", "📝", "🔍", "🤖"]
-        if estado in emojis_especiales:
-            return estado
-        
-        # Si no está cerrado aún, usa la lógica temporal del Hall of Fame
-        nombre = nombre.lower()
-        if estado == "✅":
-            # Verificar si está en el Hall of Fame temporal
-            if hall.get("mejor") == nombre:
-                return "🏆"
-            elif hall.get("documentado") == nombre:
-                return "📝"
-            elif hall.get("explorador") == nombre:
-                return "🔍"
-            elif hall.get("modelador") == nombre:
-                return "🤖"
-            else:
-                return "✅"
-        return "❌"
-    
-    df_show = df.copy().fillna("❌")
-    df_show[columna] = df_show.apply(
-        lambda row: marcar_entrega(row["Nombre"], row[columna]), 
-        axis=1
-    )
+    df_show = obtener_tabla_entregas(df, halls, indice, version)
     
     st.subheader("Listado de miembros y estado de entregas")
+    
+    total_paginas = max(1, -(-len(df_show) // FILAS_POR_PAGINA))
+    if total_paginas > 1:
+        pagina = st.number_input(
+            f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1, step=1
+        )
+        inicio = (pagina - 1) * FILAS_POR_PAGINA
+        df_show = df_show.iloc[inicio:inicio + FILAS_POR_PAGINA]
+    
     st.dataframe(df_show, use_container_width=True)
     
     # Leyenda de emojis
@@ -192,15 +459,16 @@ def mostrar_mensaje_exito(archivo_nombre, archivo_autor, similitud):
     Args:
         archivo_nombre: Nombre del archivo subido
         archivo_autor: Autor del archivo
-        similitud: Puntuación de similitud
+        similitud: Puntuación de similitud (None si no se calculó exacta)
     """
+    texto_similitud = f"{similitud*100:.1f}%" if similitud is not None and similitud == similitud else "no calculada"
     st.markdown("---")
     st.markdown(f"""
     ### 🎉 Entrega completada
     
     - **Archivo:** `{archivo_nombre}`  
     - **Autor:** `{archivo_autor}`  
-    - **Similitud:** `{similitud*100:.1f}%`
+    - **Similitud:** `{texto_similitud}`
     - **Estado:** ✅ Registro actualizado
     
     🙌 ¡Gracias por tu participación en nuestra comunidad!
@@ -1,12 +1,18 @@
 """Utilidades generales"""
 from .notebook_utils import (
     descargar_notebook_oficial,
+    descargar_notebook_oficial_async,
+    obtener_notebook_oficial,
+    ruta_oficial_local,
     extraer_contenido_notebook,
     extraer_codigo_ejecutable
 )
 
 __all__ = [
     'descargar_notebook_oficial',
+    'descargar_notebook_oficial_async',
+    'obtener_notebook_oficial',
+    'ruta_oficial_local',
     'extraer_contenido_notebook',
     'extraer_codigo_ejecutable',
 ]
@@ -1,48 +1,107 @@
 """
 Funciones para descargar y procesar notebooks oficiales
 """
-import urllib.request
-import ssl
+import os
 import json
+import httpx
+from config.capitulos import cache_capitulo
+from core.asincrono import cliente_http, ejecutar
 
+# Carpeta del repositorio con los notebooks oficiales (también forma parte del corpus de referencia)
+CARPETA_SOLUCIONES_OFICIALES = "soluciones_oficiales"
 
-def descargar_notebook_oficial(url):
+
+async def descargar_notebook_oficial_async(url, alternativas=()):
     """
     Descarga el notebook oficial desde la URL proporcionada.
     
     Args:
         url: URL del notebook oficial
+        alternativas: URLs de respaldo que se prueban en orden si la principal falla
         
     Returns:
         dict: Notebook en formato JSON o None si falla
     """
-    ctx = ssl.create_default_context()
-    ctx.check_hostname = False
-    ctx.verify_mode = ssl.CERT_NONE
-    
-    urls_alternativas = [
-        url,
-        "https://raw.githubusercontent.com/ageron/handson-ml3/main/02_end_to_end_machine_learning_project.ipynb",
-    ]
+    urls_alternativas = [url, *alternativas]
     
     for url_intento in urls_alternativas:
         try:
-            req = urllib.request.Request(
+            response = await cliente_http().get(
                 url_intento,
-                headers={'User-Agent': 'Mozilla/5.0'}
+                headers={'User-Agent': 'Mozilla/5.0'},
+                timeout=30
             )
-            
-            with urllib.request.urlopen(req, context=ctx, timeout=30) as response:
-                contenido = response.read()
-                contenido_str = contenido.decode("utf-8")
-                notebook = json.loads(contenido_str)
-                return notebook
-        except:
+            response.raise_for_status()
+            return json.loads(response.content.decode("utf-8"))
+        except (httpx.HTTPError, ValueError):
             continue
     
     return None
 
 
+def descargar_notebook_oficial(url, alternativas=()):
+    """Versión síncrona de descargar_notebook_oficial_async."""
+    return ejecutar(descargar_notebook_oficial_async(url, alternativas))
+
+
+def ruta_oficial_local(capitulo, repo_dir=None):
+    """
+    Ruta local del notebook oficial de un capítulo, si existe.
+
+    Se usa 'solucion_oficial_local' y, si no, un fichero de soluciones_oficiales/
+    con el mismo nombre que el de la URL (02_end_to_end_machine_learning_project.ipynb...).
+
+    Args:
+        capitulo: Configuración del capítulo (ver config.capitulos)
+        repo_dir: Directorio del repositorio donde buscar soluciones_oficiales/
+
+    Returns:
+        str: Ruta local o None
+    """
+    candidatas = [capitulo.get("solucion_oficial_local")]
+    nombre = os.path.basename(capitulo.get("solucion_oficial_url", "").split("?", 1)[0])
+    if repo_dir and nombre.endswith(".ipynb"):
+        candidatas.append(os.path.join(repo_dir, CARPETA_SOLUCIONES_OFICIALES, nombre))
+    for ruta in candidatas:
+        if ruta and os.path.exists(ruta):
+            return ruta
+    return None
+
+
+def obtener_notebook_oficial(capitulo, repo_dir=None):
+    """
+    Devuelve el notebook oficial de un capítulo, descargándolo solo la primera vez.
+
+    Usa la copia local si existe (ver ruta_oficial_local) y si no la URL del
+    capítulo y sus 'solucion_oficial_alternativas'.
+    El resultado se guarda en la caché del capítulo (compartida entre sesiones).
+
+    Args:
+        capitulo: Configuración del capítulo (ver config.capitulos)
+        repo_dir: Directorio del repositorio (para buscar en soluciones_oficiales/)
+
+    Returns:
+        dict: Notebook en formato JSON o None si falla
+    """
+    cache = cache_capitulo(capitulo["clave"])
+    if cache.get("notebook_oficial"):
+        return cache["notebook_oficial"]
+
+    notebook = None
+    ruta_local = ruta_oficial_local(capitulo, repo_dir)
+    if ruta_local:
+        with open(ruta_local, encoding="utf-8") as f:
+            notebook = json.load(f)
+    else:
+        notebook = descargar_notebook_oficial(
+            capitulo["solucion_oficial_url"], capitulo.get("solucion_oficial_alternativas", ())
+        )
+
+    if notebook:
+        cache["notebook_oficial"] = notebook
+    return notebook
+
+
 def extraer_contenido_notebook(notebook):
     """
     Extrae el código y markdown de un notebook.
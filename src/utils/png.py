@@ -0,0 +1,211 @@
+"""
+Decodificador PNG mínimo (zlib + numpy) para las salidas image/png de los notebooks
+Solo lo necesario para calcular huellas perceptuales: devuelve la imagen en
+escala de grises. Sin dependencias de Pillow ni matplotlib.
+"""
+import zlib
+import struct
+import numpy as np
+
+FIRMA_PNG = b"\x89PNG\r\n\x1a\n"
+
+# Imágenes más grandes se descartan para no bloquear la entrega
+MAX_PIXELES = 6_000_000
+
+# Canales por tipo de color (0 gris, 2 RGB, 3 paleta, 4 gris+alfa, 6 RGBA)
+_CANALES = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+class ErrorPNG(ValueError):
+    """El PNG no es válido o usa una variante no soportada."""
+
+
+def _leer_chunks(datos):
+    if not datos.startswith(FIRMA_PNG):
+        raise ErrorPNG("No es un PNG")
+    posicion = len(FIRMA_PNG)
+    cabecera, paleta, transparencia, idat = None, None, None, []
+    while posicion + 8 <= len(datos):
+        longitud, tipo = struct.unpack(">I4s", datos[posicion:posicion + 8])
+        contenido = datos[posicion + 8:posicion + 8 + longitud]
+        posicion += 12 + longitud
+        if tipo == b"IHDR":
+            cabecera = struct.unpack(">IIBBBBB", contenido)
+        elif tipo == b"PLTE":
+            paleta = np.frombuffer(contenido, dtype=np.uint8).reshape(-1, 3)
+        elif tipo == b"tRNS":
+            transparencia = contenido
+        elif tipo == b"IDAT":
+            idat.append(contenido)
+        elif tipo == b"IEND":
+            break
+    if cabecera is None or not idat:
+        raise ErrorPNG("PNG sin IHDR o IDAT")
+    return cabecera, paleta, transparencia, b"".join(idat)
+
+
+def _paeth_fila(crudo, arriba, bpp):
+    """
+    Deshace el filtro Paeth de una fila.
+
+    Donde arriba[i] == arriba[i-bpp] el predictor elige siempre el byte de la
+    izquierda, es decir, se comporta como el filtro Sub (una suma acumulada).
+    Solo se recorre en Python las posiciones donde la fila anterior cambia.
+    """
+    resultado = np.empty_like(crudo)
+    for canal in range(bpp):
+        r = crudo[canal::bpp].astype(np.int64)
+        b = arriba[canal::bpp].astype(np.int64)
+        c = np.concatenate(([0], b[:-1]))
+        acumulado = np.cumsum(r)
+        # Posiciones donde el predictor puede no ser "izquierda" (la primera siempre)
+        especiales = np.flatnonzero(b != c)
+        if not len(especiales) or especiales[0] != 0:
+            especiales = np.concatenate(([0], especiales))
+
+        valores = []
+        anterior_pos, anterior_val = -1, 0
+        acumulado_lista = acumulado.tolist()
+        r_lista = r.tolist()
+        c_lista = c[especiales].tolist()
+        b_menos_c = (b - c)[especiales].tolist()
+        pa_lista = np.abs(b - c)[especiales].tolist()
+        for j, cj, bc, pa in zip(especiales.tolist(), c_lista, b_menos_c, pa_lista):
+            if j == anterior_pos + 1:
+                a = anterior_val
+            else:
+                # Entre dos posiciones especiales, la fila es una suma acumulada
+                a = (anterior_val + acumulado_lista[j - 1] - acumulado_lista[anterior_pos]) & 0xFF
+            # Con p = a + b - c: |p-a| = |b-c|, |p-b| = |a-c|, |p-c| = |(a-c) + (b-c)|
+            d = a - cj
+            pb = d if d >= 0 else -d
+            e = d + bc
+            pc = e if e >= 0 else -e
+            if pa <= pb and pa <= pc:
+                prediccion = a
+            elif pb <= pc:
+                prediccion = cj + bc
+            else:
+                prediccion = cj
+            anterior_val = (r_lista[j] + prediccion) & 0xFF
+            anterior_pos = j
+            valores.append(anterior_val)
+        valores = np.array(valores, dtype=np.int64)
+
+        # Cada posición toma el valor de la última especial más la suma acumulada desde ella
+        ultima = np.zeros(len(r), dtype=np.int64)
+        ultima[especiales] = np.arange(len(especiales))
+        ultima = np.maximum.accumulate(ultima)
+        origen = especiales[ultima]
+        resultado[canal::bpp] = ((valores[ultima] + acumulado - acumulado[origen]) & 0xFF).astype(np.uint8)
+    return resultado
+
+
+def _media_fila(crudo, arriba, bpp):
+    """Deshace el filtro Average (poco frecuente en las figuras de matplotlib)."""
+    fila = bytearray(crudo.tobytes())
+    b = arriba.tobytes()
+    for i in range(len(fila)):
+        a = fila[i - bpp] if i >= bpp else 0
+        fila[i] = (fila[i] + ((a + b[i]) >> 1)) & 0xFF
+    return np.frombuffer(bytes(fila), dtype=np.uint8)
+
+
+def _deshacer_filtros(datos, alto, bytes_fila, bpp):
+    filas = np.frombuffer(datos, dtype=np.uint8)
+    if len(filas) < alto * (bytes_fila + 1):
+        raise ErrorPNG("IDAT truncado")
+    filas = filas[:alto * (bytes_fila + 1)].reshape(alto, bytes_fila + 1)
+    tipos = filas[:, 0]
+    crudos = filas[:, 1:]
+
+    imagen = np.empty((alto, bytes_fila), dtype=np.uint8)
+    arriba = np.zeros(bytes_fila, dtype=np.uint8)
+    for y in range(alto):
+        tipo, crudo = tipos[y], crudos[y]
+        if tipo == 0:
+            fila = crudo
+        elif tipo == 1:
+            fila = (np.cumsum(crudo.reshape(-1, bpp), axis=0, dtype=np.int64) & 0xFF).astype(np.uint8).ravel()
+        elif tipo == 2:
+            fila = crudo + arriba
+        elif tipo == 3:
+            fila = _media_fila(crudo, arriba, bpp)
+        elif tipo == 4:
+            fila = _paeth_fila(crudo, arriba, bpp)
+        else:
+            raise ErrorPNG(f"Filtro PNG desconocido: {tipo}")
+        imagen[y] = fila
+        arriba = imagen[y]
+    return imagen
+
+
+def decodificar_png_gris(datos):
+    """
+    Decodifica un PNG a escala de grises (0-255), con la transparencia sobre fondo blanco.
+
+    Soporta los tipos de color habituales con profundidad de 8 bits (y paleta de
+    1/2/4/8 bits). Las imágenes entrelazadas (Adam7) no se soportan.
+
+    Args:
+        datos: Bytes del fichero PNG
+
+    Returns:
+        np.ndarray: Matriz float32 (alto, ancho)
+
+    Raises:
+        ErrorPNG: Si el PNG no es válido, no está soportado o es demasiado grande
+    """
+    (ancho, alto, profundidad, tipo_color, _, _, entrelazado), paleta, transparencia, idat = _leer_chunks(datos)
+    if entrelazado:
+        raise ErrorPNG("PNG entrelazado no soportado")
+    if tipo_color not in _CANALES:
+        raise ErrorPNG(f"Tipo de color no soportado: {tipo_color}")
+    if ancho * alto > MAX_PIXELES:
+        raise ErrorPNG(f"Imagen demasiado grande: {ancho}x{alto}")
+    if profundidad != 8 and not (tipo_color == 3 and profundidad in (1, 2, 4)):
+        raise ErrorPNG(f"Profundidad no soportada: {profundidad} bits")
+
+    canales = _CANALES[tipo_color]
+    bits_fila = ancho * canales * profundidad
+    bytes_fila = (bits_fila + 7) // 8
+    bpp = max(1, canales * profundidad // 8)
+    # Se descomprime como mucho lo que ocupa la imagen según IHDR: un IDAT que da más es una bomba de deflate
+    descompresor = zlib.decompressobj()
+    try:
+        descomprimido = descompresor.decompress(idat, alto * (bytes_fila + 1))
+    except zlib.error as e:
+        raise ErrorPNG(f"IDAT corrupto: {e}") from e
+    if descompresor.unconsumed_tail:
+        raise ErrorPNG("IDAT más largo que la imagen declarada")
+    imagen = _deshacer_filtros(descomprimido, alto, bytes_fila, bpp)
+
+    if tipo_color == 3:
+        if paleta is None:
+            raise ErrorPNG("PNG con paleta sin PLTE")
+        if profundidad < 8:
+            indices = np.unpackbits(imagen, axis=1)[:, :ancho * profundidad]
+            indices = indices.reshape(alto, ancho, profundidad)
+            pesos = 1 << np.arange(profundidad - 1, -1, -1)
+            indices = (indices * pesos).sum(axis=2)
+        else:
+            indices = imagen[:, :ancho]
+        indices = np.minimum(indices, len(paleta) - 1)
+        rgb = paleta[indices].astype(np.float32)
+        alfa = None
+        if transparencia:
+            tabla = np.full(len(paleta), 255, dtype=np.float32)
+            tabla[:len(transparencia)] = np.frombuffer(transparencia, dtype=np.uint8)[:len(paleta)]
+            alfa = tabla[indices]
+    else:
+        pixeles = imagen.reshape(alto, ancho, canales).astype(np.float32)
+        if tipo_color in (0, 4):
+            rgb = np.repeat(pixeles[:, :, :1], 3, axis=2)
+        else:
+            rgb = pixeles[:, :, :3]
+        alfa = pixeles[:, :, -1] if tipo_color in (4, 6) else None
+
+    gris = rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+    if alfa is not None:
+        gris = (gris * alfa + 255.0 * (255.0 - alfa)) / 255.0
+    return gris
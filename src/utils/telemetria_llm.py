@@ -0,0 +1,241 @@
+"""
+Telemetría de las llamadas al LLM
+Un registro por petición (modelo, clave, tokens de prompt y respuesta, espera
+en cola, primer byte, latencia total, intento y resultado) en un JSONL
+rotativo, para ver el consumo de tokens por alumno y los percentiles de
+latencia antes de una fecha límite.
+
+Resumen desde la línea de comandos (ejecutar desde src/):
+    python -m utils.telemetria_llm [ruta_jsonl]
+"""
+import os
+import sys
+import json
+import math
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import defaultdict
+from contextlib import contextmanager
+from utils.trazas import traza_actual
+
+logger = logging.getLogger(__name__)
+
+# Junto a las trazas, fuera de repo_temp
+RUTA_TELEMETRIA = os.environ.get("TELEMETRIA_LLM_PATH", os.path.join("trazas", "llm.jsonl"))
+# Al superar este tamaño el fichero pasa a .1 (y .1 a .2...); se conservan COPIAS_TELEMETRIA
+MAX_BYTES_TELEMETRIA = 5 * 1024 * 1024
+COPIAS_TELEMETRIA = 3
+# Caracteres por token para estimar cuando el proveedor no devuelve 'usage' (streaming cortado)
+CARACTERES_POR_TOKEN = 4
+CUANTILES = (0.5, 0.95, 0.99)
+
+# Resultados de una llamada
+OK = "ok"
+RESPUESTA_NO_VALIDA = "respuesta_no_valida"
+ERROR_HTTP = "error_http"
+TIMEOUT = "timeout"
+CANCELADA = "cancelada"
+EXCEPCION = "excepcion"
+
+_contexto = contextvars.ContextVar("contexto_llm", default={})
+_lock = threading.Lock()
+
+
+@contextmanager
+def contexto_llm(**campos):
+    """
+    Añade campos (p. ej. alumno y capitulo) a las llamadas al LLM lanzadas dentro del bloque.
+
+    Las tareas del bucle asíncrono copian el contexto al crearse (ver core.asincrono.lanzar).
+    """
+    token = _contexto.set({**_contexto.get(), **campos})
+    try:
+        yield
+    finally:
+        _contexto.reset(token)
+
+
+def estimar_tokens(texto):
+    return len(texto or "") // CARACTERES_POR_TOKEN
+
+
+@contextmanager
+def llamada_llm(**campos):
+    """
+    Mide una llamada al LLM y la registra al terminar.
+
+    El diccionario devuelto se completa dentro del bloque (tokens_prompt,
+    tokens_respuesta, estado, primer_byte_s, espera_cola_s, resultado...). Si
+    el bloque termina con una excepción, el resultado es 'timeout',
+    'cancelada' (p. ej. la petición perdedora de una petición cubierta) o
+    'excepcion'.
+
+    Yields:
+        dict: Registro de la llamada
+    """
+    llamada = {"momento": time.time(), "traza": traza_actual(), **_contexto.get(), **campos}
+    inicio = time.perf_counter()
+    try:
+        yield llamada
+    except asyncio.CancelledError:
+        llamada["resultado"] = CANCELADA
+        raise
+    except BaseException as e:
+        llamada["resultado"] = TIMEOUT if "Timeout" in type(e).__name__ else EXCEPCION
+        llamada["error"] = type(e).__name__
+        raise
+    finally:
+        llamada["latencia_s"] = round(time.perf_counter() - inicio, 3)
+        registrar_llamada(llamada)
+
+
+def _rotar():
+    """Desplaza llm.jsonl -> llm.jsonl.1 -> ... y descarta la copia más antigua."""
+    for numero in range(COPIAS_TELEMETRIA - 1, 0, -1):
+        anterior = f"{RUTA_TELEMETRIA}.{numero}"
+        if os.path.exists(anterior):
+            os.replace(anterior, f"{RUTA_TELEMETRIA}.{numero + 1}")
+    os.replace(RUTA_TELEMETRIA, f"{RUTA_TELEMETRIA}.1")
+
+
+def registrar_llamada(llamada):
+    """
+    Añade un registro al JSONL de telemetría (rotándolo si es necesario).
+
+    Args:
+        llamada: Diccionario de la llamada (ver llamada_llm)
+    """
+    with _lock:
+        try:
+            carpeta = os.path.dirname(RUTA_TELEMETRIA)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            if os.path.exists(RUTA_TELEMETRIA) and os.path.getsize(RUTA_TELEMETRIA) >= MAX_BYTES_TELEMETRIA:
+                _rotar()
+            with open(RUTA_TELEMETRIA, "a", encoding="utf-8") as f:
+                f.write(json.dumps(llamada, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            # La telemetría nunca debe romper una evaluación
+            logger.warning(f"No se pudo escribir la telemetría del LLM: {e}")
+
+
+def cargar_llamadas(ruta=None):
+    """
+    Lee los registros guardados, de la copia más antigua a la más reciente.
+
+    Args:
+        ruta: Ruta al JSONL (por defecto RUTA_TELEMETRIA)
+
+    Returns:
+        list: Registros (dict)
+    """
+    ruta = ruta or RUTA_TELEMETRIA
+    llamadas = []
+    for fichero in [f"{ruta}.{numero}" for numero in range(COPIAS_TELEMETRIA, 0, -1)] + [ruta]:
+        try:
+            with open(fichero, encoding="utf-8") as f:
+                for linea in f:
+                    linea = linea.strip()
+                    if linea:
+                        try:
+                            llamadas.append(json.loads(linea))
+                        except json.JSONDecodeError:
+                            continue
+        except OSError:
+            continue
+    return llamadas
+
+
+def _percentiles(valores):
+    """p50/p95/p99 por el método del rango más cercano."""
+    ordenados = sorted(valores)
+    resumen = {"n": len(ordenados)}
+    for q in CUANTILES:
+        valor = ordenados[max(0, math.ceil(q * len(ordenados)) - 1)] if ordenados else 0.0
+        resumen[f"p{int(q * 100)}"] = round(valor, 3)
+    return resumen
+
+
+def resumir_llamadas(llamadas):
+    """
+    Resumen de la telemetría: totales, percentiles de latencia y tokens por alumno.
+
+    Los percentiles solo usan las peticiones síncronas que terminaron (no los
+    lotes ni las cancelaciones).
+
+    Args:
+        llamadas: Registros (ver cargar_llamadas)
+
+    Returns:
+        dict: {
+            'llamadas', 'reintentos', 'duplicadas', 'resultados': {resultado: n},
+            'tokens_prompt', 'tokens_respuesta',
+            'latencia_s' / 'primer_byte_s' / 'espera_cola_s': {'n', 'p50', 'p95', 'p99'},
+            'por_backend': {backend: {'llamadas', 'latencia_s': percentiles}},
+            'por_alumno': {(capitulo, alumno): {'llamadas', 'tokens_prompt', 'tokens_respuesta'}}
+        }
+    """
+    resultados = defaultdict(int)
+    medidas = defaultdict(list)
+    por_backend = defaultdict(list)
+    por_alumno = defaultdict(lambda: {"llamadas": 0, "tokens_prompt": 0, "tokens_respuesta": 0})
+    for llamada in llamadas:
+        resultados[llamada.get("resultado", "desconocido")] += 1
+        alumno = por_alumno[(llamada.get("capitulo"), llamada.get("alumno"))]
+        alumno["llamadas"] += 1
+        alumno["tokens_prompt"] += llamada.get("tokens_prompt") or 0
+        alumno["tokens_respuesta"] += llamada.get("tokens_respuesta") or 0
+        if llamada.get("tipo") == "lote" or llamada.get("resultado") == CANCELADA:
+            continue
+        por_backend[llamada.get("backend")].append(llamada["latencia_s"])
+        for medida in ("latencia_s", "primer_byte_s", "espera_cola_s"):
+            if llamada.get(medida) is not None:
+                medidas[medida].append(llamada[medida])
+
+    return {
+        "llamadas": len(llamadas),
+        "reintentos": sum(1 for llamada in llamadas if (llamada.get("intento") or 1) > 1),
+        "duplicadas": sum(1 for llamada in llamadas if llamada.get("duplicada")),
+        "resultados": dict(resultados),
+        "tokens_prompt": sum(alumno["tokens_prompt"] for alumno in por_alumno.values()),
+        "tokens_respuesta": sum(alumno["tokens_respuesta"] for alumno in por_alumno.values()),
+        **{medida: _percentiles(medidas[medida]) for medida in ("latencia_s", "primer_byte_s", "espera_cola_s")},
+        "por_backend": {
+            backend: {"llamadas": len(valores), "latencia_s": _percentiles(valores)}
+            for backend, valores in por_backend.items()
+        },
+        "por_alumno": dict(por_alumno),
+    }
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    resumen = resumir_llamadas(cargar_llamadas(argv[0] if argv else None))
+    if not resumen["llamadas"]:
+        print("No hay llamadas al LLM registradas")
+        return
+
+    resultados = ", ".join(f"{resultado} {n}" for resultado, n in sorted(resumen["resultados"].items()))
+    print(f"{resumen['llamadas']} llamadas ({resultados}); {resumen['reintentos']} reintentos, "
+          f"{resumen['duplicadas']} duplicadas")
+    print(f"Tokens: {resumen['tokens_prompt']} de prompt, {resumen['tokens_respuesta']} de respuesta\n")
+
+    print(f"{'medida':<22}{'n':>7}{'p50 s':>10}{'p95 s':>10}{'p99 s':>10}")
+    filas = [(medida, resumen[medida]) for medida in ("latencia_s", "primer_byte_s", "espera_cola_s")]
+    filas += [(f"latencia {backend}", datos["latencia_s"]) for backend, datos in sorted(resumen["por_backend"].items())]
+    for nombre, valores in filas:
+        print(f"{nombre:<22}{valores['n']:>7}{valores['p50']:>10}{valores['p95']:>10}{valores['p99']:>10}")
+
+    print(f"\n{'capítulo':<14}{'alumno':<24}{'llamadas':>9}{'tokens prompt':>15}{'tokens respuesta':>18}")
+    alumnos = sorted(resumen["por_alumno"].items(),
+                     key=lambda item: item[1]["tokens_prompt"] + item[1]["tokens_respuesta"], reverse=True)
+    for (capitulo, alumno), datos in alumnos:
+        print(f"{str(capitulo or '-'):<14}{str(alumno or '-'):<24}{datos['llamadas']:>9}"
+              f"{datos['tokens_prompt']:>15}{datos['tokens_respuesta']:>18}")
+
+
+if __name__ == "__main__":
+    main()
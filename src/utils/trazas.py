@@ -0,0 +1,264 @@
+"""
+Trazas ligeras del pipeline de entregas
+Registra la duración y el tamaño de cada etapa (spans), los guarda en JSONL
+y expone percentiles por etapa en formato de texto de Prometheus.
+
+Resumen desde la línea de comandos (ejecutar desde src/):
+    python -m utils.trazas [ruta_jsonl]
+"""
+import os
+import sys
+import json
+import math
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Fuera de repo_temp para que las trazas no se suban al repositorio
+RUTA_TRAZAS = os.environ.get("TRAZAS_PATH", os.path.join("trazas", "spans.jsonl"))
+MAX_SPANS_POR_ETAPA = 2000
+CUANTILES = (0.5, 0.95, 0.99)
+
+_traza_actual = contextvars.ContextVar("traza_actual", default=None)
+_lock = threading.Lock()
+_duraciones = defaultdict(lambda: deque(maxlen=MAX_SPANS_POR_ETAPA))
+_totales = defaultdict(lambda: {"count": 0, "suma": 0.0, "bytes": 0, "errores": 0})
+_servidor = {"httpd": None}
+
+
+@contextmanager
+def traza(nombre=None):
+    """
+    Agrupa los spans de una misma entrega bajo un identificador común.
+
+    Args:
+        nombre: Identificador legible (p. ej. 'cap2-ana_e'); se le añade un sufijo único
+    """
+    identificador = f"{nombre}-{uuid.uuid4().hex[:8]}" if nombre else uuid.uuid4().hex[:12]
+    token = _traza_actual.set(identificador)
+    try:
+        yield identificador
+    finally:
+        _traza_actual.reset(token)
+
+
+def traza_actual():
+    """Identificador de la traza en curso (None fuera de traza())."""
+    return _traza_actual.get()
+
+
+@contextmanager
+def span(etapa, **atributos):
+    """
+    Mide la duración de una etapa del pipeline.
+
+    El diccionario devuelto se puede completar dentro del bloque, por ejemplo
+    con el tamaño procesado: ``registro["bytes"] = len(datos)``.
+
+    Args:
+        etapa: Nombre de la etapa (guardar_zip, extraer_zip, peticion_llm...)
+        **atributos: Atributos adicionales que se guardan con el span
+
+    Yields:
+        dict: Registro del span
+    """
+    registro = {"etapa": etapa, "traza": _traza_actual.get(), "bytes": 0, **atributos}
+    inicio = time.perf_counter()
+    registro["inicio"] = time.time()
+    try:
+        yield registro
+        registro.setdefault("ok", True)
+    except BaseException as e:
+        registro["ok"] = False
+        registro["error"] = type(e).__name__
+        raise
+    finally:
+        registro["duracion_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+        registrar_span(registro)
+
+
+def registrar_span(registro):
+    """
+    Guarda un span ya medido en memoria y en el fichero JSONL.
+
+    Args:
+        registro: Diccionario con al menos 'etapa' y 'duracion_ms'
+    """
+    etapa = registro["etapa"]
+    segundos = registro["duracion_ms"] / 1000
+
+    with _lock:
+        _duraciones[etapa].append(segundos)
+        totales = _totales[etapa]
+        totales["count"] += 1
+        totales["suma"] += segundos
+        totales["bytes"] += int(registro.get("bytes") or 0)
+        if not registro.get("ok", True):
+            totales["errores"] += 1
+
+        try:
+            carpeta = os.path.dirname(RUTA_TRAZAS)
+            if carpeta:
+                os.makedirs(carpeta, exist_ok=True)
+            with open(RUTA_TRAZAS, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        except OSError as e:
+            # Las trazas nunca deben romper una entrega
+            logger.warning(f"No se pudo escribir la traza: {e}")
+
+
+def _percentil(valores_ordenados, q):
+    """Percentil por el método del rango más cercano."""
+    if not valores_ordenados:
+        return 0.0
+    posicion = max(0, math.ceil(q * len(valores_ordenados)) - 1)
+    return valores_ordenados[posicion]
+
+
+def percentiles_por_etapa(duraciones=None):
+    """
+    Calcula p50/p95/p99 (en milisegundos) de cada etapa.
+
+    Args:
+        duraciones: {etapa: [segundos]} (por defecto, los spans en memoria)
+
+    Returns:
+        dict: {etapa: {'n': int, 'p50': float, 'p95': float, 'p99': float}}
+    """
+    if duraciones is None:
+        with _lock:
+            duraciones = {etapa: list(valores) for etapa, valores in _duraciones.items()}
+
+    resumen = {}
+    for etapa, valores in duraciones.items():
+        ordenados = sorted(valores)
+        resumen[etapa] = {"n": len(ordenados)}
+        for q in CUANTILES:
+            resumen[etapa][f"p{int(q * 100)}"] = round(_percentil(ordenados, q) * 1000, 2)
+    return resumen
+
+
+def exportar_prometheus():
+    """
+    Exporta las métricas en formato de texto de Prometheus.
+
+    Returns:
+        str: Métricas (summary de duración por etapa, bytes y errores)
+    """
+    with _lock:
+        duraciones = {etapa: sorted(valores) for etapa, valores in _duraciones.items()}
+        totales = {etapa: dict(valores) for etapa, valores in _totales.items()}
+
+    lineas = [
+        "# HELP entregas_etapa_duracion_segundos Duración de cada etapa del pipeline de entregas",
+        "# TYPE entregas_etapa_duracion_segundos summary",
+    ]
+    for etapa in sorted(duraciones):
+        for q in CUANTILES:
+            valor = _percentil(duraciones[etapa], q)
+            lineas.append(f'entregas_etapa_duracion_segundos{{etapa="{etapa}",quantile="{q}"}} {valor:.6f}')
+        lineas.append(f'entregas_etapa_duracion_segundos_sum{{etapa="{etapa}"}} {totales[etapa]["suma"]:.6f}')
+        lineas.append(f'entregas_etapa_duracion_segundos_count{{etapa="{etapa}"}} {totales[etapa]["count"]}')
+
+    lineas += [
+        "# HELP entregas_etapa_bytes_total Bytes procesados por etapa",
+        "# TYPE entregas_etapa_bytes_total counter",
+    ]
+    for etapa in sorted(totales):
+        lineas.append(f'entregas_etapa_bytes_total{{etapa="{etapa}"}} {totales[etapa]["bytes"]}')
+
+    lineas += [
+        "# HELP entregas_etapa_errores_total Spans terminados con excepción",
+        "# TYPE entregas_etapa_errores_total counter",
+    ]
+    for etapa in sorted(totales):
+        lineas.append(f'entregas_etapa_errores_total{{etapa="{etapa}"}} {totales[etapa]["errores"]}')
+
+    return "\n".join(lineas) + "\n"
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        cuerpo = exportar_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, format, *args):
+        return
+
+
+def iniciar_servidor_metricas(puerto, host="0.0.0.0"):
+    """
+    Arranca (una sola vez por proceso) un servidor HTTP con /metrics.
+
+    Args:
+        puerto: Puerto TCP
+        host: Interfaz de escucha
+
+    Returns:
+        bool: True si el servidor está en marcha
+    """
+    with _lock:
+        if _servidor["httpd"] is not None:
+            return True
+        try:
+            httpd = ThreadingHTTPServer((host, int(puerto)), _ManejadorMetricas)
+        except OSError as e:
+            logger.warning(f"No se pudo arrancar el servidor de métricas en {puerto}: {e}")
+            return False
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, daemon=True, name="metricas").start()
+        _servidor["httpd"] = httpd
+        logger.info(f"Métricas disponibles en http://{host}:{puerto}/metrics")
+        return True
+
+
+def cargar_spans(ruta=None):
+    """
+    Lee los spans guardados en el fichero JSONL.
+
+    Args:
+        ruta: Ruta al JSONL (por defecto RUTA_TRAZAS)
+
+    Returns:
+        list: Lista de spans (dict)
+    """
+    spans = []
+    with open(ruta or RUTA_TRAZAS, encoding="utf-8") as f:
+        for linea in f:
+            linea = linea.strip()
+            if linea:
+                try:
+                    spans.append(json.loads(linea))
+                except json.JSONDecodeError:
+                    continue
+    return spans
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    ruta = argv[0] if argv else RUTA_TRAZAS
+    duraciones = defaultdict(list)
+    for registro in cargar_spans(ruta):
+        duraciones[registro["etapa"]].append(registro["duracion_ms"] / 1000)
+
+    print(f"{'etapa':<22}{'n':>7}{'p50 ms':>12}{'p95 ms':>12}{'p99 ms':>12}")
+    for etapa, valores in sorted(percentiles_por_etapa(duraciones).items()):
+        print(f"{etapa:<22}{valores['n']:>7}{valores['p50']:>12}{valores['p95']:>12}{valores['p99']:>12}")
+
+
+if __name__ == "__main__":
+    main()